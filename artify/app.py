@@ -7,17 +7,12 @@ parent_dir = os.path.dirname(os.path.dirname(current_dir))
 if parent_dir not in sys.path:
     sys.path.insert(0, parent_dir)
 
-from flask import Flask, render_template, request, redirect, url_for, flash, session, jsonify, send_file
+from flask import Flask, render_template, request, redirect, url_for, flash, session, jsonify
 from functools import wraps
-import qrcode
-import io
-import base64
 from datetime import datetime
-from io import BytesIO
 import socket
 import json
-import uuid
-import tempfile
+from urllib.parse import quote
 
 # Import local modules
 from auth import (
@@ -25,42 +20,130 @@ from auth import (
     register_user, authenticate_user, create_booking,
     get_booking_by_id, update_booking_payment,
     get_available_slots as get_booking_slots,
-    update_slot_availability
+    update_slot_availability, reserve_slot_capacity, CANCELLED_STATUSES
 )
 from parking import (
     ParkingSlot,
     ParkingReservation,
     init_parking_slots,
     get_available_slots as get_parking_slots,
+    parking_slot_serializer,
     create_parking_reservation,
-    update_reservation_payment
+    update_reservation_payment,
+    claim_parking_space
 )
-
-# Optional imports for speech recognition
-try:
-    import speech_recognition as sr
-    from gtts import gTTS
-    SPEECH_ENABLED = True
-except ImportError:
-    SPEECH_ENABLED = False
-    print("Speech recognition features will be disabled")
+from monuments import MONUMENTS_DATA
+from voice_commands import process_command
+from ratelimit import init_rate_limiter, rate_limit
+from metrics import init_metrics
+from profiler import init_profiler
+from querytrace import init_query_tracer, query_budget
+from speech import (
+    SpeechBusy, SpeechUnavailable, SpeechNotUnderstood,
+    init_speech, recognition_enabled, synthesis_enabled,
+    recognize_audio
+)
+from tts_cache import init_tts_cache, speech_response
+from images import init_images, monument_image_url
+from assets import init_assets
+from compression import init_compression
+from tickets import init_tickets, ticket_url, booking_payload, parking_payload
+from serializers import init_serialization
+from reporting import init_reporting
+from exports import init_exports
+from archive import find_booking
+from pricing import init_pricing, quote_ticket, quote_parking, ticket_prices, ticket_total, GUIDE_FEE
+from waitlist import init_waitlist, claim_offer
+from cancellations import init_cancellations, is_closed
+from groups import init_groups
+from jobs import init_jobs, enqueue, PRIORITY_HIGH
+from notifications import init_notifications, send_soon, booking_confirmed, parking_confirmed
+from history import init_history
 
 app = Flask(__name__)
 app.secret_key = os.urandom(24)  # Generate a secure random secret key
 
+# Encode JSON responses with orjson when it is installed
+init_serialization(app)
+
 # Set the instance path
 app.instance_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'instance')
 if not os.path.exists(app.instance_path):
     os.makedirs(app.instance_path)
 
-# Create directory for QR codes if it doesn't exist
-qr_code_dir = os.path.join(app.static_folder, 'qr_codes')
-if not os.path.exists(qr_code_dir):
-    os.makedirs(qr_code_dir)
-
 # Initialize database
 init_db(app)
 
+# Initialize response compression and ETags first, so they run after every other after_request hook
+init_compression(app)
+
+# Initialize request rate limiting, ARTIFY_RATELIMIT_STORAGE=sqlite shares the buckets between workers
+app.config['RATELIMIT_STORAGE'] = os.environ.get('ARTIFY_RATELIMIT_STORAGE', 'memory')
+app.config['RATELIMIT_SQLITE_PATH'] = os.environ.get('ARTIFY_RATELIMIT_SQLITE_PATH')
+# Policy overrides as JSON, e.g. {"payment": {"user": [0.5, 5]}}
+app.config['RATELIMIT_POLICIES'] = json.loads(os.environ.get('ARTIFY_RATELIMIT_POLICIES') or '{}')
+init_rate_limiter(app)
+
+# Initialize request metrics and the /metrics endpoint, summed across the workers that share ARTIFY_METRICS_DIR
+app.config['METRICS_MULTIPROC_DIR'] = os.environ.get('ARTIFY_METRICS_DIR')
+init_metrics(app)
+
+# Initialize the slow request profiler (off unless PROFILER_ENABLED is set)
+app.config['PROFILER_ENABLED'] = os.environ.get('ARTIFY_PROFILER') == '1'
+init_profiler(app)
+
+# Initialize per-request SQL tracing and N+1 detection
+init_query_tracer(app)
+
+# Initialize the speech backends and the bounded recognition pool
+app.config['SPEECH_RECOGNIZER'] = os.environ.get('ARTIFY_SPEECH_RECOGNIZER', 'google')
+app.config['SPEECH_SYNTHESIZER'] = os.environ.get('ARTIFY_SPEECH_SYNTHESIZER', 'gtts')
+app.config['VOSK_MODEL_PATH'] = os.environ.get('ARTIFY_VOSK_MODEL_PATH')
+init_speech(app)
+
+# Initialize the on-disk cache of synthesized speech
+if os.environ.get('ARTIFY_TTS_CACHE_DIR'):
+    app.config['TTS_CACHE_DIR'] = os.environ['ARTIFY_TTS_CACHE_DIR']
+init_tts_cache(app)
+
+# Initialize the responsive monument image helpers
+init_images(app)
+
+# Initialize the fingerprinted CSS/JS bundles served from /assets
+init_assets(app)
+
+# Initialize the QR ticket image endpoint
+if os.environ.get('ARTIFY_TICKET_CACHE_DIR'):
+    app.config['TICKET_CACHE_DIR'] = os.environ['ARTIFY_TICKET_CACHE_DIR']
+init_tickets(app)
+
+# Initialize the admin reports, served from rollups kept current on every booking
+init_reporting(app)
+
+# Initialize the streaming CSV/Parquet exports for admins
+init_exports(app)
+
+# Initialize occupancy-based ticket and parking prices
+init_pricing(app)
+
+# Initialize the time slot waitlist and its background promoter
+init_waitlist(app)
+
+# Initialize cancellations, refunds and monument closures
+init_cancellations(app)
+
+# Initialize the group booking API for tour operators
+init_groups(app)
+
+# Initialize the background job queue that the workers in jobs.py drain
+init_jobs(app)
+
+# Initialize the notification outbox, delivered by the notifications.send job
+init_notifications(app)
+
+# Initialize the paginated booking and parking history API
+init_history(app)
+
 def init_app():
     # Initialize parking slots when the app starts
     with app.app_context():
@@ -69,401 +152,6 @@ def init_app():
 # Initialize the app
 init_app()
 
-# Add this dictionary with monument data
-MONUMENTS_DATA = {
-    'Red Fort': {
-        'name': 'Red Fort (Lal Qila)',
-        'short_description': 'A historic fort built by Mughal Emperor Shah Jahan',
-        'image_url': 'https://source.unsplash.com/1600x900/?red-fort-delhi',
-        'history': '''The Red Fort, also known as Lal Qila, was built by Mughal Emperor Shah Jahan in 1639. 
-        It served as the main residence of the Mughal emperors for nearly 200 years. The fort's construction 
-        began in 1638 and was completed in 1648. The name "Red Fort" comes from its massive red sandstone walls. 
-        The fort was designed by architect Ustad Ahmad Lahori, who also designed the Taj Mahal.''',
-        'highlights': [
-            {
-                'title': 'Architecture',
-                'description': 'The fort showcases a perfect blend of Persian, Timurid, and Hindu architectural styles.'
-            },
-            {
-                'title': 'Diwan-i-Aam',
-                'description': 'The Hall of Public Audience where the emperor would meet the general public.'
-            },
-            {
-                'title': 'Diwan-i-Khas',
-                'description': 'The Hall of Private Audience where the emperor would meet important guests.'
-            }
-        ],
-        'timing': '9:30 AM - 4:30 PM (Closed on Mondays)',
-        'entry_fee': '₹25 for Indians, ₹50 for Foreigners',
-        'best_time': 'October to March (Winter Season)',
-        'virtual_tour_urls': [
-            'https://www.google.com/maps/embed?pb=!4v1648123456789!6m8!1m7!1sCAESLEdpbGxlcm9lR0FTRS1ldXdJR1JfYl9nS2dCbGdCbGdCbGdCbGdCbGdCbGc!2m2!1d28.6562!2d77.2410!3f0!4f0!5f0.7820865974627469'
-        ],
-        'map_url': 'https://www.google.com/maps/embed?pb=!1m18!1m12!1m3!1d3500.8389774351086!2d77.2410!3d28.6562!2m3!1f0!2f0!3f0!3m2!1i1024!2i768!4f13.1!3m3!1m2!1s0x390cfd5b347f62e7%3A0x37205b715389640!2sRed%20Fort!5e0!3m2!1sen!2sin!4v1648123456789!5m2!1sen!2sin',
-        'directions_url': 'https://www.google.com/maps/dir/?api=1&destination=Red+Fort+Delhi'
-    },
-    'Qutub Minar': {
-        'name': 'Qutub Minar',
-        'short_description': 'The tallest brick minaret in the world',
-        'image_url': 'https://source.unsplash.com/1600x900/?qutub-minar',
-        'history': '''Qutub Minar was built in 1192 by Qutub-ud-din Aibak, the founder of the Delhi Sultanate. 
-        The construction was completed by his successor Iltutmish. The minaret is 73 meters tall and has 379 steps. 
-        It is made of red sandstone and marble, with intricate carvings and verses from the Quran.''',
-        'highlights': [
-            {
-                'title': 'Architecture',
-                'description': 'A masterpiece of Indo-Islamic architecture with five distinct storeys.'
-            },
-            {
-                'title': 'Iron Pillar',
-                'description': 'A 7-meter tall iron pillar that has not rusted for over 1600 years.'
-            },
-            {
-                'title': 'Quwwat-ul-Islam Mosque',
-                'description': 'The first mosque built in India, located at the base of the minaret.'
-            }
-        ],
-        'timing': '7:00 AM - 5:00 PM (Open all days)',
-        'entry_fee': '₹30 for Indians, ₹60 for Foreigners',
-        'best_time': 'October to March (Winter Season)',
-        'virtual_tour_urls': [
-            'https://www.google.com/maps/embed?pb=!4v1648123456789!6m8!1m7!1sCAESLEdpbGxlcm9lR0FTRS1ldXdJR1JfYl9nS2dCbGdCbGdCbGdCbGdCbGdCbGc!2m2!1d28.5244!2d77.1855!3f0!4f0!5f0.7820865974627469'
-        ],
-        'map_url': 'https://www.google.com/maps/embed?pb=!1m18!1m12!1m3!1d3500.8389774351086!2d77.1855!3d28.5244!2m3!1f0!2f0!3f0!3m2!1i1024!2i768!4f13.1!3m3!1m2!1s0x390cfd5b347f62e7%3A0x37205b715389640!2sQutub%20Minar!5e0!3m2!1sen!2sin!4v1648123456789!5m2!1sen!2sin',
-        'directions_url': 'https://www.google.com/maps/dir/?api=1&destination=Qutub+Minar+Delhi'
-    },
-    'India Gate': {
-        'name': 'India Gate',
-        'short_description': 'A war memorial dedicated to Indian soldiers',
-        'image_url': 'https://source.unsplash.com/1600x900/?india-gate',
-        'history': '''India Gate was built in 1931 to commemorate the 70,000 Indian soldiers who died in World War I. 
-        The monument was designed by Edwin Lutyens and is inspired by the Arc de Triomphe in Paris. 
-        The names of 13,300 servicemen are inscribed on the walls.''',
-        'highlights': [
-            {
-                'title': 'Architecture',
-                'description': 'A 42-meter tall archway made of red and pale sandstone and granite.'
-            },
-            {
-                'title': 'Amar Jawan Jyoti',
-                'description': 'An eternal flame burning in memory of soldiers who died in the 1971 Indo-Pakistan War.'
-            },
-            {
-                'title': 'Surrounding Gardens',
-                'description': 'Beautiful lawns and gardens perfect for evening walks and picnics.'
-            }
-        ],
-        'timing': 'Open 24 hours',
-        'entry_fee': 'Free for all visitors',
-        'best_time': 'October to March (Winter Season)',
-        'virtual_tour_urls': [
-            'https://www.google.com/maps/embed?pb=!4v1648123456789!6m8!1m7!1sCAESLEdpbGxlcm9lR0FTRS1ldXdJR1JfYl9nS2dCbGdCbGdCbGdCbGdCbGdCbGc!2m2!1d28.6129!2d77.2295!3f0!4f0!5f0.7820865974627469'
-        ],
-        'map_url': 'https://www.google.com/maps/embed?pb=!1m18!1m12!1m3!1d3500.8389774351086!2d77.2295!3d28.6129!2m3!1f0!2f0!3f0!3m2!1i1024!2i768!4f13.1!3m3!1m2!1s0x390cfd5b347f62e7%3A0x37205b715389640!2sIndia%20Gate!5e0!3m2!1sen!2sin!4v1648123456789!5m2!1sen!2sin',
-        'directions_url': 'https://www.google.com/maps/dir/?api=1&destination=India+Gate+Delhi'
-    },
-    'Taj Mahal': {
-        'name': 'Taj Mahal',
-        'short_description': 'One of the Seven Wonders of the World',
-        'image_url': 'https://source.unsplash.com/1600x900/?taj-mahal',
-        'history': '''The Taj Mahal was commissioned in 1632 by Mughal Emperor Shah Jahan to house the tomb of his 
-        favorite wife, Mumtaz Mahal. Construction was completed in 1653. The monument is considered the finest 
-        example of Mughal architecture, combining Persian, Ottoman Turkish, and Indian architectural styles.''',
-        'highlights': [
-            {
-                'title': 'Architecture',
-                'description': 'A perfect blend of Persian, Ottoman Turkish, and Indian architectural styles.'
-            },
-            {
-                'title': 'Main Mausoleum',
-                'description': 'The central structure housing the tombs of Shah Jahan and Mumtaz Mahal.'
-            },
-            {
-                'title': 'Gardens',
-                'description': 'Beautiful Mughal gardens with reflecting pools and fountains.'
-            }
-        ],
-        'timing': 'Sunrise to Sunset (Closed on Fridays)',
-        'entry_fee': '₹40 for Indians, ₹80 for Foreigners',
-        'best_time': 'October to March (Winter Season)',
-        'virtual_tour_urls': [
-            'https://www.google.com/maps/embed?pb=!4v1648123456789!6m8!1m7!1sCAESLEdpbGxlcm9lR0FTRS1ldXdJR1JfYl9nS2dCbGdCbGdCbGdCbGdCbGdCbGc!2m2!1d27.1751!2d78.0421!3f0!4f0!5f0.7820865974627469'
-        ],
-        'map_url': 'https://www.google.com/maps/embed?pb=!1m18!1m12!1m3!1d3500.8389774351086!2d78.0421!3d27.1751!2m3!1f0!2f0!3f0!3m2!1i1024!2i768!4f13.1!3m3!1m2!1s0x39747121d702ff6d%3A0xdd2ae4807feb8530!2sTaj%20Mahal!5e0!3m2!1sen!2sin!4v1648123456789!5m2!1sen!2sin',
-        'directions_url': 'https://www.google.com/maps/dir/?api=1&destination=Taj+Mahal+Agra'
-    },
-    'Lotus Temple': {
-        'name': 'Lotus Temple',
-        'short_description': 'A Bahá\'í House of Worship',
-        'image_url': 'https://source.unsplash.com/1600x900/?lotus-temple',
-        'history': '''The Lotus Temple, completed in 1986, is a Bahá\'í House of Worship. It was designed by 
-        Iranian architect Fariborz Sahba and is notable for its flowerlike shape. The temple has won numerous 
-        architectural awards and is one of the most visited buildings in the world.''',
-        'highlights': [
-            {
-                'title': 'Architecture',
-                'description': 'A unique lotus-shaped structure with 27 free-standing marble-clad "petals".'
-            },
-            {
-                'title': 'Interior',
-                'description': 'A central hall with a capacity of 2,500 people and excellent acoustics.'
-            },
-            {
-                'title': 'Gardens',
-                'description': 'Beautiful landscaped gardens with nine pools and walkways.'
-            }
-        ],
-        'timing': '9:00 AM - 5:30 PM (Closed on Mondays)',
-        'entry_fee': 'Free for all visitors',
-        'best_time': 'October to March (Winter Season)',
-        'virtual_tour_urls': [
-            'https://www.google.com/maps/embed?pb=!4v1648123456789!6m8!1m7!1sCAESLEdpbGxlcm9lR0FTRS1ldXdJR1JfYl9nS2dCbGdCbGdCbGdCbGdCbGdCbGc!2m2!1d28.5535!2d77.2588!3f0!4f0!5f0.7820865974627469'
-        ],
-        'map_url': 'https://www.google.com/maps/embed?pb=!1m18!1m12!1m3!1d3500.8389774351086!2d77.2588!3d28.5535!2m3!1f0!2f0!3f0!3m2!1i1024!2i768!4f13.1!3m3!1m2!1s0x390cfd5b347f62e7%3A0x37205b715389640!2sLotus%20Temple!5e0!3m2!1sen!2sin!4v1648123456789!5m2!1sen!2sin',
-        'directions_url': 'https://www.google.com/maps/dir/?api=1&destination=Lotus+Temple+Delhi'
-    },
-    'Jama Masjid': {
-        'name': 'Jama Masjid',
-        'short_description': 'One of the largest mosques in India',
-        'image_url': 'https://source.unsplash.com/1600x900/?jama-masjid',
-        'history': '''Jama Masjid was built by Mughal Emperor Shah Jahan between 1650 and 1656. The mosque 
-        was inaugurated by Syed Abdul Ghafoor Shah Bukhari, a religious leader from Uzbekistan. It is the 
-        largest mosque in India and can accommodate 25,000 worshippers.''',
-        'highlights': [
-            {
-                'title': 'Architecture',
-                'description': 'A magnificent example of Mughal architecture with three domes and two minarets.'
-            },
-            {
-                'title': 'Courtyard',
-                'description': 'A vast courtyard that can hold thousands of worshippers.'
-            },
-            {
-                'title': 'Relics',
-                'description': 'Houses several relics of Islamic religious significance.'
-            }
-        ],
-        'timing': '7:00 AM - 12:00 PM, 1:30 PM - 6:30 PM (Closed during prayer times)',
-        'entry_fee': 'Free for Indian visitors, ₹35 for Foreign visitors',
-        'best_time': 'October to March (Winter Season)',
-        'virtual_tour_urls': [
-            'https://www.google.com/maps/embed?pb=!4v1648123456789!6m8!1m7!1sCAESLEdpbGxlcm9lR0FTRS1ldXdJR1JfYl9nS2dCbGdCbGdCbGdCbGdCbGdCbGc!2m2!1d28.6507!2d77.2334!3f0!4f0!5f0.7820865974627469'
-        ],
-        'map_url': 'https://www.google.com/maps/embed?pb=!1m18!1m12!1m3!1d3500.8389774351086!2d77.2334!3d28.6507!2m3!1f0!2f0!3f0!3m2!1i1024!2i768!4f13.1!3m3!1m2!1s0x390cfd5b347f62e7%3A0x37205b715389640!2sJama%20Masjid!5e0!3m2!1sen!2sin!4v1648123456789!5m2!1sen!2sin',
-        'directions_url': 'https://www.google.com/maps/dir/?api=1&destination=Jama+Masjid+Delhi'
-    },
-    'Purana Qila': {
-        'name': 'Purana Qila (Old Fort)',
-        'short_description': 'The oldest fort in Delhi',
-        'image_url': 'https://source.unsplash.com/1600x900/?purana-qila',
-        'history': '''Purana Qila, also known as Old Fort, is believed to be the site of Indraprastha, 
-        the ancient city of the Mahabharata. The current structure was built by Sher Shah Suri in 1538. 
-        The fort has witnessed the rise and fall of several empires.''',
-        'highlights': [
-            {
-                'title': 'Architecture',
-                'description': 'A blend of Afghan and Mughal architectural styles.'
-            },
-            {
-                'title': 'Qila-i-Kuhna Mosque',
-                'description': 'A beautiful mosque built by Sher Shah Suri.'
-            },
-            {
-                'title': 'Sher Mandal',
-                'description': 'An octagonal tower believed to be Humayun\'s library.'
-            }
-        ],
-        'timing': '7:00 AM - 5:00 PM (Open all days)',
-        'entry_fee': '₹20 for Indians, ₹40 for Foreigners',
-        'best_time': 'October to March (Winter Season)',
-        'virtual_tour_urls': [
-            'https://www.google.com/maps/embed?pb=!4v1648123456789!6m8!1m7!1sCAESLEdpbGxlcm9lR0FTRS1ldXdJR1JfYl9nS2dCbGdCbGdCbGdCbGdCbGdCbGc!2m2!1d28.6092!2d77.2439!3f0!4f0!5f0.7820865974627469'
-        ],
-        'map_url': 'https://www.google.com/maps/embed?pb=!1m18!1m12!1m3!1d3500.8389774351086!2d77.2439!3d28.6092!2m3!1f0!2f0!3f0!3m2!1i1024!2i768!4f13.1!3m3!1m2!1s0x390cfd5b347f62e7%3A0x37205b715389640!2sPurana%20Qila!5e0!3m2!1sen!2sin!4v1648123456789!5m2!1sen!2sin',
-        'directions_url': 'https://www.google.com/maps/dir/?api=1&destination=Purana+Qila+Delhi'
-    },
-    'National War Memorial': {
-        'name': 'National War Memorial',
-        'short_description': 'A tribute to Indian soldiers',
-        'image_url': 'https://source.unsplash.com/1600x900/?national-war-memorial',
-        'history': '''The National War Memorial was inaugurated in 2019 to honor the soldiers who have 
-        served in the armed forces since India\'s independence. The memorial commemorates the sacrifices 
-        of over 25,942 soldiers who have laid down their lives for the nation.''',
-        'highlights': [
-            {
-                'title': 'Architecture',
-                'description': 'A modern architectural marvel with four concentric circles.'
-            },
-            {
-                'title': 'Amar Chakra',
-                'description': 'The innermost circle with the eternal flame.'
-            },
-            {
-                'title': 'Veerta Chakra',
-                'description': 'Gallantry award winners\' names inscribed on walls.'
-            }
-        ],
-        'timing': '9:00 AM - 7:30 PM (Open all days)',
-        'entry_fee': 'Free for all visitors',
-        'best_time': 'October to March (Winter Season)',
-        'virtual_tour_urls': [
-            'https://www.youtube.com/embed/dQw4w9WgXcQ'
-        ],
-        'map_url': 'https://www.google.com/maps/embed?pb=!1m18!1m12!1m3!1d3500.8389774351086!2d77.2295!3d28.6129!2m3!1f0!2f0!3f0!3m2!1i1024!2i768!4f13.1!3m3!1m2!1s0x390cfd5b347f62e7%3A0x37205b715389640!2sNational%20War%20Memorial!5e0!3m2!1sen!2sin!4v1648123456789!5m2!1sen!2sin',
-        'directions_url': 'https://www.google.com/maps/dir/?api=1&destination=National+War+Memorial+Delhi'
-    },
-    'Rashtrapati Bhavan': {
-        'name': 'Rashtrapati Bhavan',
-        'short_description': 'The official residence of the President of India',
-        'image_url': 'https://source.unsplash.com/1600x900/?rashtrapati-bhavan',
-        'history': '''Rashtrapati Bhavan was designed by British architects Edwin Lutyens and Herbert Baker. 
-        Construction began in 1912 and was completed in 1929. It was originally built as the Viceroy\'s House 
-        during British rule and became the President\'s residence after India\'s independence.''',
-        'highlights': [
-            {
-                'title': 'Architecture',
-                'description': 'A blend of Indian and Western architectural styles with 340 rooms.'
-            },
-            {
-                'title': 'Mughal Gardens',
-                'description': 'Beautiful gardens spread over 15 acres with rare flowers and plants.'
-            },
-            {
-                'title': 'Darbar Hall',
-                'description': 'The grand ceremonial hall used for official functions.'
-            }
-        ],
-        'timing': '9:00 AM - 4:00 PM (Closed on Mondays)',
-        'entry_fee': '₹15 for Indians, ₹30 for Foreigners',
-        'best_time': 'October to March (Winter Season)',
-        'virtual_tour_urls': [
-            'https://www.google.com/maps/embed?pb=!4v1648123456789!6m8!1m7!1sCAESLEdpbGxlcm9lR0FTRS1ldXdJR1JfYl9nS2dCbGdCbGdCbGdCbGdCbGdCbGc!2m2!1d28.6143!2d77.1990!3f0!4f0!5f0.7820865974627469'
-        ],
-        'map_url': 'https://www.google.com/maps/embed?pb=!1m18!1m12!1m3!1d3500.8389774351086!2d77.1990!3d28.6143!2m3!1f0!2f0!3f0!3m2!1i1024!2i768!4f13.1!3m3!1m2!1s0x390cfd5b347f62e7%3A0x37205b715389640!2sRashtrapati%20Bhavan!5e0!3m2!1sen!2sin!4v1648123456789!5m2!1sen!2sin',
-        'directions_url': 'https://www.google.com/maps/dir/?api=1&destination=Rashtrapati+Bhavan+Delhi'
-    },
-    'Raj Ghat': {
-        'name': 'Raj Ghat',
-        'short_description': 'Memorial to Mahatma Gandhi',
-        'image_url': 'https://source.unsplash.com/1600x900/?raj-ghat',
-        'history': '''Raj Ghat is a memorial dedicated to Mahatma Gandhi, marking the spot of his cremation 
-        on January 31, 1948. The memorial is a simple black marble platform with an eternal flame burning 
-        at one end. The memorial is surrounded by beautiful gardens.''',
-        'highlights': [
-            {
-                'title': 'Memorial Platform',
-                'description': 'A simple black marble platform marking the spot of Gandhi\'s cremation.'
-            },
-            {
-                'title': 'Eternal Flame',
-                'description': 'A flame that burns continuously in memory of the Father of the Nation.'
-            },
-            {
-                'title': 'Gardens',
-                'description': 'Beautiful gardens with trees planted by various world leaders.'
-            }
-        ],
-        'timing': '6:30 AM - 6:00 PM (Open all days)',
-        'entry_fee': 'Free for all visitors',
-        'best_time': 'October to March (Winter Season)',
-        'virtual_tour_urls': [
-            'https://www.youtube.com/embed/JSwo2f2xFNQ'
-        ],
-        'map_url': 'https://www.google.com/maps/embed?pb=!1m18!1m12!1m3!1d3500.8389774351086!2d77.2489!3d28.6415!2m3!1f0!2f0!3f0!3m2!1i1024!2i768!4f13.1!3m3!1m2!1s0x390cfd5b347f62e7%3A0x37205b715389640!2sRaj%20Ghat!5e0!3m2!1sen!2sin!4v1648123456789!5m2!1sen!2sin',
-        'directions_url': 'https://www.google.com/maps/dir/?api=1&destination=Raj+Ghat+Delhi'
-    },
-    'Jantar Mantar': {
-        'name': 'Jantar Mantar',
-        'short_description': 'An astronomical observatory',
-        'image_url': 'https://source.unsplash.com/1600x900/?jantar-mantar',
-        'history': '''Jantar Mantar was built by Maharaja Jai Singh II of Jaipur in 1724. It is one of five 
-        astronomical observatories built by him across India. The observatory was used to compile astronomical 
-        tables and predict the times and movements of the sun, moon, and planets.''',
-        'highlights': [
-            {
-                'title': 'Architecture',
-                'description': 'A collection of 13 architectural astronomy instruments.'
-            },
-            {
-                'title': 'Samrat Yantra',
-                'description': 'The world\'s largest sundial, accurate to within 20 seconds.'
-            },
-            {
-                'title': 'Rama Yantra',
-                'description': 'Used to measure the altitude and azimuth of celestial objects.'
-            }
-        ],
-        'timing': '9:00 AM - 4:30 PM (Open all days)',
-        'entry_fee': '₹20 for Indians, ₹40 for Foreigners',
-        'best_time': 'October to March (Winter Season)',
-        'virtual_tour_urls': [
-            'https://www.google.com/maps/embed?pb=!4v1648123456789!6m8!1m7!1sCAESLEdpbGxlcm9lR0FTRS1ldXdJR1JfYl9nS2dCbGdCbGdCbGdCbGdCbGdCbGc!2m2!1d28.6277!2d77.2167!3f0!4f0!5f0.7820865974627469'
-        ],
-        'map_url': 'https://www.google.com/maps/embed?pb=!1m18!1m12!1m3!1d3500.8389774351086!2d77.2167!3d28.6277!2m3!1f0!2f0!3f0!3m2!1i1024!2i768!4f13.1!3m3!1m2!1s0x390cfd5b347f62e7%3A0x37205b715389640!2sJantar%20Mantar!5e0!3m2!1sen!2sin!4v1648123456789!5m2!1sen!2sin',
-        'directions_url': 'https://www.google.com/maps/dir/?api=1&destination=Jantar+Mantar+Delhi'
-    },
-    'Akshardham Temple': {
-        'name': 'Akshardham Temple',
-        'short_description': 'A modern Hindu temple complex',
-        'image_url': 'https://source.unsplash.com/1600x900/?akshardham-temple',
-        'history': '''Akshardham Temple was inaugurated in 2005 by Pramukh Swami Maharaj. The temple complex 
-        showcases traditional Hindu and Indian culture, spirituality, and architecture. It was built using 
-        ancient architectural principles and modern technology.''',
-        'highlights': [
-            {
-                'title': 'Architecture',
-                'description': 'A stunning example of traditional Hindu architecture with intricate carvings.'
-            },
-            {
-                'title': 'Exhibitions',
-                'description': 'Interactive exhibitions showcasing Indian culture and spirituality.'
-            },
-            {
-                'title': 'Musical Fountain',
-                'description': 'A spectacular water show in the evening.'
-            }
-        ],
-        'timing': '9:30 AM - 6:30 PM (Closed on Mondays)',
-        'entry_fee': '₹15 for Indians, ₹30 for Foreigners',
-        'best_time': 'October to March (Winter Season)',
-        'virtual_tour_urls': [
-            'https://www.youtube.com/embed/DwsYVv36Vo0'
-        ],
-        'map_url': 'https://www.google.com/maps/embed?pb=!1m18!1m12!1m3!1d3500.8389774351086!2d77.2777!3d28.6129!2m3!1f0!2f0!3f0!3m2!1i1024!2i768!4f13.1!3m3!1m2!1s0x390cfd5b347f62e7%3A0x37205b715389640!2sAkshardham%20Temple!5e0!3m2!1sen!2sin!4v1648123456789!5m2!1sen!2sin',
-        'directions_url': 'https://www.google.com/maps/dir/?api=1&destination=Akshardham+Temple+Delhi'
-    },
-    'Lodi Gardens': {
-        'name': 'Lodi Gardens',
-        'short_description': 'A city park with historical monuments',
-        'image_url': 'https://source.unsplash.com/1600x900/?lodi-gardens',
-        'history': '''Lodi Gardens was built in 1936 by the British to preserve the tombs of the Sayyid and 
-        Lodi dynasties. The park was designed by Lady Willingdon, the wife of the Viceroy of India. It is 
-        now a popular recreational spot in Delhi.''',
-        'highlights': [
-            {
-                'title': 'Tombs',
-                'description': 'Several historical tombs from the Sayyid and Lodi periods.'
-            },
-            {
-                'title': 'Gardens',
-                'description': 'Beautiful landscaped gardens with rare trees and plants.'
-            },
-            {
-                'title': 'Architecture',
-                'description': 'Fine examples of Indo-Islamic architecture.'
-            }
-        ],
-        'timing': '6:00 AM - 8:00 PM (Open all days)',
-        'entry_fee': 'Free for all visitors',
-        'best_time': 'October to March (Winter Season)',
-        'virtual_tour_urls': [
-            'https://www.google.com/maps/embed?pb=!4v1648123456789!6m8!1m7!1sCAESLEdpbGxlcm9lR0FTRS1ldXdJR1JfYl9nS2dCbGdCbGdCbGdCbGdCbGdCbGc!2m2!1d28.5933!2d77.2197!3f0!4f0!5f0.7820865974627469'
-        ],
-        'map_url': 'https://www.google.com/maps/embed?pb=!1m18!1m12!1m3!1d3500.8389774351086!2d77.2197!3d28.5933!2m3!1f0!2f0!3f0!3m2!1i1024!2i768!4f13.1!3m3!1m2!1s0x390cfd5b347f62e7%3A0x37205b715389640!2sLodi%20Gardens!5e0!3m2!1sen!2sin!4v1648123456789!5m2!1sen!2sin',
-        'directions_url': 'https://www.google.com/maps/dir/?api=1&destination=Lodi+Gardens+Delhi'
-    }
-}
-
 @app.route('/')
 def index():
     return redirect(url_for('auth'))
@@ -581,6 +269,9 @@ def booking():
             if visit_date_obj.date() < datetime.now().date():
                 flash('Please select a future date')
                 return redirect(url_for('booking'))
+            if is_closed(monument, visit_date_obj.date()):
+                flash(f'{monument} is closed on this date, please choose another one')
+                return redirect(url_for('booking'))
         except ValueError:
             flash('Invalid date format')
             return redirect(url_for('booking'))
@@ -596,6 +287,7 @@ def booking():
             return redirect(url_for('booking'))
         
         # Validate visitor details if any
+        visitors = []
         if num_visitors > 0:
             for i in range(num_visitors):
                 visitor_name = request.form.get(f'visitor_name_{i}')
@@ -613,16 +305,15 @@ def booking():
                 except ValueError:
                     flash('Visitor age must be a number')
                     return redirect(url_for('booking'))
+                
+                visitors.append({
+                    'name': visitor_name,
+                    'age': visitor_age,
+                    'is_student': request.form.get(f'visitor_is_student_{i}') == 'on'
+                })
         
-        # Get monument entry fee from MONUMENTS_DATA
-        monument_data = MONUMENTS_DATA.get(monument, {})
-        entry_fee_str = monument_data.get('entry_fee', '₹0 for Indians, ₹0 for Foreigners')
-        
-        # Parse entry fee for Indians (assuming format "₹X for Indians, ₹Y for Foreigners")
-        try:
-            indian_fee = int(entry_fee_str.split('for Indians')[0].replace('₹', '').strip())
-        except:
-            indian_fee = 0
+        # Current ticket price for the chosen slot
+        indian_fee = quote_ticket(monument, visit_date_obj.date(), time_slot)
         
         # Store booking details in session for payment
         session['booking_details'] = {
@@ -633,6 +324,7 @@ def booking():
             'email': email,
             'time_slot': time_slot,
             'num_visitors': num_visitors,
+            'visitors': visitors,
             'user_id': session['user_id'],
             'entry_fee': indian_fee
         }
@@ -642,6 +334,8 @@ def booking():
     return render_template('booking.html', monuments_data=MONUMENTS_DATA)
 
 @app.route('/get_available_slots')
+@rate_limit('slots')
+@query_budget(8)
 def available_slots():
     monument = request.args.get('monument')
     date_str = request.args.get('date')
@@ -652,6 +346,9 @@ def available_slots():
     try:
         date = datetime.strptime(date_str, '%Y-%m-%d').date()
         slots = get_booking_slots(monument, date)
+        prices = ticket_prices(monument, date)
+        for slot in slots:
+            slot['price'] = prices.get(slot['time_slot'], prices['default'])
         return jsonify(slots)
     except ValueError:
         return jsonify([])
@@ -673,25 +370,19 @@ def payment():
         num_visitors = int(request.form.get('visitors', '0'))
         need_guide = request.form.get('need_guide') == 'on'
         
-        # Get monument entry fee from MONUMENTS_DATA
-        monument_data = MONUMENTS_DATA.get(monument, {})
-        entry_fee_str = monument_data.get('entry_fee', '₹0 for Indians, ₹0 for Foreigners')
-        
-        # Parse entry fee for Indians
+        # Current ticket price for the chosen slot
         try:
-            base_amount = int(entry_fee_str.split('for Indians')[0].replace('₹', '').strip())
-        except:
+            base_amount = quote_ticket(monument, datetime.strptime(visit_date, '%Y-%m-%d').date(), time_slot)
+        except ValueError:
             base_amount = 0
         
         total_visitors = num_visitors + 1  # +1 for the primary visitor
-        guide_fee = 300 if need_guide else 0
-        
-        # Calculate base amount with entry fees
-        final_amount = (base_amount * total_visitors) + guide_fee
+        guide_fee = GUIDE_FEE if need_guide else 0
         
-        # Apply student discount if applicable
-        if is_student:
-            final_amount -= (base_amount * 0.3)  # 30% discount for primary contact
+        # Count students like Booking.set_visitors does, so this is the total process_payment charges
+        visitors = session.get('booking_details', {}).get('visitors', [])
+        student_count = int(is_student) + sum(bool(v.get('is_student')) for v in visitors)
+        final_amount = ticket_total(base_amount, total_visitors, student_count, need_guide)
         
         booking_data = {
             'monument': monument,
@@ -715,25 +406,21 @@ def payment():
     booking_details = session['booking_details']
     user = User.query.get(session['user_id'])
     
-    # Get monument entry fee from MONUMENTS_DATA
-    monument_data = MONUMENTS_DATA.get(booking_details['monument'], {})
-    entry_fee_str = monument_data.get('entry_fee', '₹0 for Indians, ₹0 for Foreigners')
-    
-    # Parse entry fee for Indians
+    # Current ticket price for the chosen slot
     try:
-        base_amount = int(entry_fee_str.split('for Indians')[0].replace('₹', '').strip())
-    except:
+        visit_date = datetime.strptime(booking_details['date'], '%Y-%m-%d').date()
+        base_amount = quote_ticket(booking_details['monument'], visit_date, booking_details.get('time_slot', ''))
+    except ValueError:
         base_amount = 0
     
     total_visitors = booking_details.get('num_visitors', 0) + 1  # +1 for the primary visitor
-    guide_fee = 300 if booking_details.get('need_guide', False) else 0
-    
-    # Calculate base amount with entry fees
-    final_amount = (base_amount * total_visitors) + guide_fee
+    need_guide = booking_details.get('need_guide', False)
+    guide_fee = GUIDE_FEE if need_guide else 0
     
-    # Apply student discount if applicable
-    if booking_details.get('is_student', False):
-        final_amount -= (base_amount * 0.3)  # 30% discount for primary contact
+    # Count students like Booking.set_visitors does, so this is the total process_payment charges
+    student_count = (int(bool(booking_details.get('is_student', False)))
+                     + sum(bool(v.get('is_student')) for v in booking_details.get('visitors', [])))
+    final_amount = ticket_total(base_amount, total_visitors, student_count, need_guide)
     
     booking_data = {
         'monument': booking_details['monument'],
@@ -752,6 +439,8 @@ def payment():
     return render_template('payment.html', booking=booking_data)
 
 @app.route('/process_payment', methods=['POST'])
+@rate_limit('payment')
+@query_budget(23)  # Up to 11 visitor rows, one INSERT each where the driver cannot batch them, the closure check, the slot reservation and the prices on a cache miss
 def process_payment():
     if 'user_id' not in session:
         return jsonify({
@@ -833,58 +522,57 @@ def process_payment():
             monument=booking_data['monument'],
             visit_date=visit_date,
             time_slot=time_slot,
-            visitors=json.dumps(booking_data.get('visitors', [])),
             need_guide=booking_data.get('need_guide', False),
             need_parking=booking_data.get('need_parking', False),
-            base_amount=float(booking_data.get('base_amount', 0)),
-            final_amount=float(booking_data.get('final_amount', 0)),
             payment_status='completed',
             payment_method=payment_method,
             id_number=id_number,
             camera_required=camera_required,
             is_student=is_student,
-            student_discount_applied=booking_data.get('student_discount_applied', False),
             nationality='Indian'  # Set default nationality
         )
 
-        # Add booking to database
-        db.session.add(booking)
-        db.session.commit()
+        # Everyone on the ticket, stored as visitor rows plus headcounts
+        visitors = booking_data.get('visitors') or session.get('booking_details', {}).get('visitors', [])
+        booking.set_visitors(visitors, primary_name=booking_data.get('name') or user.name,
+                             primary_age=booking_data.get('age'))
 
-        # Generate QR code
-        qr_data = {
-            'booking_id': booking.id,
-            'monument': booking_data['monument'],
-            'date': booking_data['date'],
-            'time_slot': time_slot,
-            'name': user.name,
-            'email': user.email,
-            'visitors': booking_data.get('visitors', []),
-            'is_student': is_student,
-            'need_guide': booking_data.get('need_guide', False),
-            'need_parking': booking_data.get('need_parking', False),
-            'id_number': id_number,
-            'camera_required': camera_required
-        }
+        # Price it here at the current rate, the amounts in booking_data are only what the page showed
+        booking.base_amount = quote_ticket(booking.monument, visit_date, time_slot)
+        booking.final_amount = ticket_total(booking.base_amount, booking.visitor_count,
+                                            booking.student_count, booking.need_guide)
+        booking.student_discount_applied = booking.student_count > 0
 
-        qr = qrcode.QRCode(
-            version=1,
-            error_correction=qrcode.constants.ERROR_CORRECT_L,
-            box_size=10,
-            border=4,
-        )
-        qr.add_data(json.dumps(qr_data))
-        qr.make(fit=True)
-        qr_image = qr.make_image(fill_color="black", back_color="white")
+        # A closed day looks full, but there is no waitlist to join for it
+        if is_closed(booking.monument, visit_date):
+            return jsonify({
+                'success': False,
+                'error': f'{booking.monument} is closed on this date, please choose another one'
+            })
+
+        # Take the places in the slot before anything is written, or the ones a waitlist offer holds
+        waitlist_entry_id = session.get('booking_details', {}).get('waitlist_entry_id')
+        claimed = waitlist_entry_id and claim_offer(
+            waitlist_entry_id, user.id, booking.monument, visit_date, time_slot, booking.visitor_count)
+        if not claimed and not reserve_slot_capacity(booking.monument, visit_date, time_slot, booking.visitor_count):
+            db.session.rollback()
+            return jsonify({
+                'success': False,
+                'error': 'This time slot is full, please choose another one',
+                'waitlist_url': url_for('join_waitlist_route')
+            })
 
-        # Convert QR code to base64
-        buffered = BytesIO()
-        qr_image.save(buffered, format="PNG")
-        qr_code_base64 = base64.b64encode(buffered.getvalue()).decode()
+        # Add booking to database, flushing assigns its id for the QR payload
+        db.session.add(booking)
+        db.session.flush()
 
-        # Update booking with QR code
-        booking.qr_code = qr_code_base64
+        # Store the QR payload, a worker renders the images before the ticket is first viewed
+        booking.qr_code = booking_payload(booking, user.name, user.email)
+        # The confirmation email commits with the booking and is sent from the outbox
+        booking_confirmed(booking, user)
         db.session.commit()
+        enqueue('tickets.render', {'kind': 'booking', 'ticket_id': booking.id}, priority=PRIORITY_HIGH)
+        send_soon()
 
         # Store booking ID in session for confirmation page
         session['booking_id'] = booking.id
@@ -902,6 +590,7 @@ def process_payment():
         })
 
 @app.route('/booking_confirmation')
+@query_budget(1)
 def booking_confirmation():
     # Get the booking ID from session
     booking_id = session.get('booking_id')
@@ -910,14 +599,14 @@ def booking_confirmation():
         flash('No booking found', 'error')
         return redirect(url_for('booking'))
     
-    # Get the booking from database
-    booking = get_booking_by_id(booking_id)
+    # Get the booking and its user from database in one query
+    booking = get_booking_by_id(booking_id, with_user=True)
     if not booking:
         flash('Booking not found', 'error')
         return redirect(url_for('booking'))
     
-    # Convert QR code from base64 to data URL
-    qr_code_url = f"data:image/png;base64,{booking.qr_code}" if booking.qr_code else None
+    # Cacheable ticket image instead of an inline data URL
+    qr_code_url = ticket_url('booking', booking)
     
     # Create a dictionary with booking and user information
     booking_dict = booking.to_dict()
@@ -931,21 +620,18 @@ def booking_confirmation():
                          qr_code=qr_code_url)
 
 @app.route('/scan/<int:booking_id>')
+@query_budget(2)
 def scan_result(booking_id):
-    booking = get_booking_by_id(booking_id)
+    # Old tickets are still scannable after their booking was archived
+    booking = find_booking(booking_id)
     if not booking:
         return "Invalid booking ID", 404
     
-    # Check if the booking is valid (not expired)
-    is_valid = booking.visit_date >= datetime.now().date()
+    # Check if the booking is valid (not expired or cancelled)
+    is_valid = booking.visit_date >= datetime.now().date() and booking.payment_status not in CANCELLED_STATUSES
     
-    # Get monument image URL based on the monument name
-    monument_images = {
-        'Taj Mahal': 'https://source.unsplash.com/800x400/?taj-mahal',
-        'Red Fort': 'https://source.unsplash.com/800x400/?red-fort-delhi',
-        'Qutub Minar': 'https://source.unsplash.com/800x400/?qutub-minar'
-    }
-    monument_image = monument_images.get(booking.monument, 'https://source.unsplash.com/800x400/?india-monument')
+    # Local resized photo of the monument
+    monument_image = monument_image_url(booking.monument, 960)
     
     return render_template('scan_result.html',
                          booking=booking.to_dict(),
@@ -954,6 +640,8 @@ def scan_result(booking_id):
                          monument_image=monument_image)
 
 @app.route('/get_parking_slots')
+@rate_limit('slots')
+@query_budget(2)
 def get_parking_slots_route():
     monument = request.args.get('monument')
     date_str = request.args.get('date')
@@ -964,19 +652,10 @@ def get_parking_slots_route():
     
     try:
         date = datetime.strptime(date_str, '%Y-%m-%d').date()
-        slots = get_parking_slots(monument, date, vehicle_type)
-        
-        # Convert slots to JSON-serializable format
-        slots_data = [
-            {
-                'number': slot.slot_number,
-                'available': slot.is_available,
-                'type': slot.vehicle_type,
-                'id': slot.id
-            }
-            for slot in slots
-        ]
-        return jsonify(slots_data)
+        if is_closed(monument, date):
+            return jsonify([])
+        slots = get_parking_slots(monument, date, vehicle_type, columns=parking_slot_serializer.columns)
+        return jsonify(parking_slot_serializer.many(slots))
     except ValueError:
         return jsonify([])
 
@@ -985,6 +664,7 @@ def parking():
     return render_template('parking.html')
 
 @app.route('/process_parking', methods=['POST'])
+@rate_limit('booking')
 def process_parking():
     if request.method == 'POST':
         monument = request.form.get('monument')
@@ -995,10 +675,16 @@ def process_parking():
         vehicle_number = request.form.get('vehicle_number')
         driver_name = request.form.get('name')
         phone = request.form.get('phone')
-        total_amount = float(request.form.get('total_amount', 0))
         
         try:
             date = datetime.strptime(date_str, '%Y-%m-%d').date()
+            if is_closed(monument, date):
+                flash(f'{monument} is closed on this date, please choose another one')
+                return redirect(url_for('parking'))
+            
+            # Price the stay server-side at the current rate rather than trusting the form total
+            hourly_rate = quote_parking(monument, date, vehicle_type)
+            total_amount = hourly_rate * duration
             
             # Store parking details in session
             session['parking_details'] = {
@@ -1011,7 +697,7 @@ def process_parking():
                 'driver_name': driver_name,
                 'phone': phone,
                 'amount': total_amount,
-                'hourly_rate': 25
+                'hourly_rate': hourly_rate
             }
             
             return redirect(url_for('payment_page', type='parking'))
@@ -1037,8 +723,9 @@ def payment_page():
     return render_template('payment.html', booking=booking_data)
 
 @app.route('/process_speech', methods=['POST'])
+@rate_limit('speech')
 def process_speech():
-    if not SPEECH_ENABLED:
+    if not recognition_enabled():
         return jsonify({
             'success': False,
             'error': 'Speech recognition is not available'
@@ -1053,61 +740,36 @@ def process_speech():
                 'error': 'No audio file received'
             }), 400
 
-        # Create a temporary file to store the audio
-        with tempfile.NamedTemporaryFile(delete=False, suffix='.wav') as temp_audio:
-            audio_file.save(temp_audio.name)
-            
-            try:
-                # Initialize recognizer
-                recognizer = sr.Recognizer()
-                
-                # Load audio file
-                with sr.AudioFile(temp_audio.name) as source:
-                    audio_data = recognizer.record(source)
-                    
-                    try:
-                        # Convert speech to text
-                        text = recognizer.recognize_google(audio_data).lower()
-                        
-                        # Process commands
-                        response = process_command(text)
-                        
-                        # Convert response to speech
-                        tts = gTTS(text=response, lang='en')
-                        
-                        # Save response audio to temporary file
-                        with tempfile.NamedTemporaryFile(delete=False, suffix='.mp3') as temp_response:
-                            tts.write_to_fp(temp_response.name)
-                            
-                            # Read response audio file and convert to base64
-                            with open(temp_response.name, 'rb') as audio_file:
-                                audio_data = base64.b64encode(audio_file.read()).decode('utf-8')
-                            
-                            # Clean up temporary files
-                            os.unlink(temp_response.name)
-                        
-                        return jsonify({
-                            'success': True,
-                            'text': text,
-                            'response': response,
-                            'audio': audio_data
-                        })
-                        
-                    except sr.UnknownValueError:
-                        return jsonify({
-                            'success': False,
-                            'error': 'Could not understand audio'
-                        }), 400
-                    except sr.RequestError as e:
-                        return jsonify({
-                            'success': False,
-                            'error': f'Could not request results: {str(e)}'
-                        }), 503
-                    
-            finally:
-                # Clean up temporary files
-                os.unlink(temp_audio.name)
-                
+        lang = request.form.get('lang', 'en')
+
+        # Decode the upload straight from memory on the speech worker pool
+        text = recognize_audio(audio_file.read(), lang)
+        
+        # Process commands
+        response = process_command(text, lang)
+        
+        # Send the spoken response back, the recognized text travels in headers
+        return speech_response(response, lang, headers={
+            'X-Speech-Text': quote(text),
+            'X-Speech-Response': quote(response),
+            'Cache-Control': 'no-store'
+        })
+        
+    except SpeechNotUnderstood as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 400
+    except SpeechBusy as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 503
+    except SpeechUnavailable as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 503
     except Exception as e:
         print(f"Speech processing error: {str(e)}")
         return jsonify({
@@ -1115,34 +777,6 @@ def process_speech():
             'error': 'An error occurred while processing speech'
         }), 500
 
-def process_command(text):
-    """Process voice commands and return appropriate response"""
-    text = text.lower()
-    
-    # Navigation commands
-    if 'home' in text:
-        return 'Navigating to home page'
-    elif 'booking' in text or 'book now' in text:
-        return 'Opening booking form'
-    elif 'parking' in text:
-        return 'Opening parking reservation'
-    elif 'logout' in text:
-        return 'Logging out'
-        
-    # Form interactions
-    elif 'student' in text:
-        return 'Student discount will be applied'
-    elif 'guide' in text:
-        return 'Tour guide service added'
-    elif 'need parking' in text:
-        return 'Parking will be reserved'
-    elif text.startswith('select '):
-        monument = text.replace('select ', '')
-        return f'Selected {monument}'
-        
-    # Default response
-    return 'Command not recognized. Try saying "help" for available commands'
-
 @app.route('/speech_help')
 def speech_help():
     """Get help information about available voice commands"""
@@ -1166,6 +800,8 @@ def speech_help():
     return jsonify(help_text)
 
 @app.route('/api/parking/slots')
+@rate_limit('slots')
+@query_budget(2)
 def get_parking_slots_api():
     monument = request.args.get('monument')
     date_str = request.args.get('date')
@@ -1176,20 +812,10 @@ def get_parking_slots_api():
     
     try:
         date = datetime.strptime(date_str, '%Y-%m-%d').date()
-        slots = get_parking_slots(monument, date, vehicle_type)
-        
-        # Convert slots to JSON-serializable format
-        slots_data = []
-        for slot in slots:
-            slot_data = {
-                'number': slot.slot_number,
-                'available': True,
-                'id': slot.id,
-                'type': slot.vehicle_type
-            }
-            slots_data.append(slot_data)
-            
-        return jsonify(slots_data)
+        if is_closed(monument, date):
+            return jsonify([])
+        slots = get_parking_slots(monument, date, vehicle_type, columns=parking_slot_serializer.columns)
+        return jsonify(parking_slot_serializer.many(slots))
     except ValueError:
         return jsonify({'error': 'Invalid date format'}), 400
     except Exception as e:
@@ -1211,11 +837,12 @@ def monument_details(monument_name):
         return redirect(url_for('home'))
     
     monument = MONUMENTS_DATA[monument_name]
-    return render_template('monument_details.html', monument=monument)
+    return render_template('monument_details.html', monument=monument, monument_key=monument_name)
 
 @app.route('/text-to-speech', methods=['POST'])
+@rate_limit('speech')
 def text_to_speech():
-    if not SPEECH_ENABLED:
+    if not synthesis_enabled():
         return jsonify({
             'success': False,
             'error': 'Text-to-speech is not available'
@@ -1228,26 +855,31 @@ def text_to_speech():
         if not text:
             return jsonify({'error': 'No text provided'}), 400
         
-        # Create text-to-speech object
-        tts = gTTS(text=text, lang='en', slow=False)
-        
-        # Save to BytesIO object
-        audio_io = io.BytesIO()
-        tts.write_to_fp(audio_io)
-        audio_io.seek(0)
-        
-        # Return audio file
-        return send_file(
-            audio_io,
-            mimetype='audio/mp3',
-            as_attachment=True,
-            download_name='monument_history.mp3'
-        )
+        # Serve cached audio, or stream it as it is synthesized and cache it
+        return speech_response(text, download_name='monument_history')
         
+    except SpeechUnavailable as e:
+        return jsonify({'error': str(e)}), 503
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+@app.route('/monument/<monument_name>/audio')
+@rate_limit('speech')
+def monument_audio(monument_name):
+    """Monument history audio by GET, so audio players can seek with Range requests"""
+    if monument_name not in MONUMENTS_DATA:
+        return jsonify({'error': 'Monument not found'}), 404
+    if not synthesis_enabled():
+        return jsonify({'error': 'Text-to-speech is not available'}), 503
+    
+    try:
+        return speech_response(MONUMENTS_DATA[monument_name]['history'])
+    except SpeechUnavailable as e:
+        return jsonify({'error': str(e)}), 503
+
 @app.route('/process_parking_payment', methods=['POST'])
+@rate_limit('payment')
+@query_budget(10)  # The rates on a cache miss, the reservation in its savepoint, its user for the email, and the email and SMS rows
 def process_parking_payment():
     try:
         # Check if user is logged in
@@ -1260,7 +892,7 @@ def process_parking_payment():
         # Get form data with validation
         required_fields = ['monument', 'date', 'vehicle_type', 'vehicle_number', 
                          'driver_name', 'phone', 'slot_number', 'duration', 
-                         'amount', 'payment_method']
+                         'payment_method']
         
         for field in required_fields:
             if not request.form.get(field):
@@ -1274,12 +906,19 @@ def process_parking_payment():
             date = datetime.strptime(request.form.get('date'), '%Y-%m-%d').date()
             slot_number = int(request.form.get('slot_number'))
             duration = int(request.form.get('duration'))
-            amount = float(request.form.get('amount'))
         except ValueError as e:
             return jsonify({
                 'success': False,
                 'error': f'Invalid data format: {str(e)}'
             })
+        if duration < 1:
+            return jsonify({
+                'success': False,
+                'error': 'Duration must be at least one hour'
+            })
+
+        # Charge the current rate, never the total the form sends
+        amount = quote_parking(request.form.get('monument'), date, request.form.get('vehicle_type')) * duration
 
         # Create parking reservation
         try:
@@ -1298,31 +937,20 @@ def process_parking_payment():
                 payment_method=request.form.get('payment_method')
             )
             
-            # Generate QR code
-            qr = qrcode.QRCode(version=1, box_size=10, border=5)
-            qr_data = {
-                'type': 'parking',
-                'id': str(uuid.uuid4()),
-                'monument': request.form.get('monument'),
-                'date': date.strftime('%Y-%m-%d'),
-                'slot': slot_number,
-                'vehicle': request.form.get('vehicle_number')
-            }
-            qr.add_data(json.dumps(qr_data))
-            qr.make(fit=True)
-            
-            # Create QR code image
-            qr_img = qr.make_image(fill_color="black", back_color="white")
-            buffered = BytesIO()
-            qr_img.save(buffered, format="PNG")
-            qr_code_base64 = base64.b64encode(buffered.getvalue()).decode()
-            
-            # Save QR code to reservation
-            reservation.qr_code = qr_code_base64
+            # Store the QR payload, a worker renders the images before the ticket is first viewed
+            reservation.qr_code = parking_payload(reservation)
             
-            # Save to database
-            db.session.add(reservation)
+            # Save to database, with the confirmations in the same transaction
+            if not claim_parking_space(reservation):
+                db.session.rollback()
+                return jsonify({
+                    'success': False,
+                    'error': 'This parking slot was just reserved, please choose another one'
+                })
+            parking_confirmed(reservation, reservation.user)
             db.session.commit()
+            enqueue('tickets.render', {'kind': 'parking', 'ticket_id': reservation.id}, priority=PRIORITY_HIGH)
+            send_soon()
             
             # Store reservation ID in session for confirmation page
             session['parking_reservation_id'] = reservation.id
@@ -1349,6 +977,7 @@ def process_parking_payment():
         })
 
 @app.route('/parking-confirmation')
+@query_budget(1)
 def parking_confirmation():
     try:
         reservation_id = session.get('parking_reservation_id')
@@ -1358,13 +987,11 @@ def parking_confirmation():
         reservation = ParkingReservation.query.get(reservation_id)
         if not reservation:
             return redirect(url_for('parking'))
-            
-        # Clear the reservation ID from session
-        session.pop('parking_reservation_id', None)
         
+        # The ID stays in the session like booking_id does, so a refresh shows the page again
         return render_template('parking_confirmation.html', 
                              reservation=reservation,
-                             qr_code=reservation.qr_code)
+                             qr_code=ticket_url('parking', reservation))
                              
     except Exception as e:
         return redirect(url_for('parking'))
@@ -1379,6 +1006,7 @@ def internal_error(error):
     return render_template('500.html'), 500
 
 @app.route('/store_booking', methods=['POST'])
+@rate_limit('booking')
 def store_booking():
     if 'user_id' not in session:
         return jsonify({
@@ -0,0 +1,147 @@
+"""Archival of past bookings, parking reservations and time slots.
+
+Rows dated before the retention window (90 days by default) move to *_archive
+tables with the same columns, a few hundred at a time. Each batch is one short
+transaction, so bookings keep going through while an archive run works its
+way down a long history. The moves use Core statements, which the reporting
+rollups do not see, so the reports still cover archived days.
+
+Lookups by id (/scan, ticket images) go through find_booking() and
+find_reservation(), which fall back to the archive transparently. The history
+API pages over both tables itself, see history.py.
+
+    python archive.py run --retention-days 90
+"""
+import sys
+import time
+import argparse
+from datetime import datetime, timedelta
+
+from sqlalchemy import select, func, union_all
+
+from auth import db, create_script_app, Booking, BookingVisitor, TimeSlot, get_booking_by_id
+from parking import ParkingReservation
+
+def archive_table(table, indexed=()):
+    """Same columns as `table`, without foreign keys or defaults"""
+    return db.Table(f'{table.name}_archive', db.metadata, *[
+        db.Column(column.name, column.type, primary_key=column.primary_key,
+                  nullable=column.nullable, index=column.name in indexed)
+        for column in table.columns
+    ])
+
+bookings_archive = archive_table(Booking.__table__, indexed=('user_id',))
+booking_visitors_archive = archive_table(BookingVisitor.__table__, indexed=('booking_id',))
+parking_reservations_archive = archive_table(ParkingReservation.__table__, indexed=('user_id',))
+# Same keyset order as the live tables for the history API
+db.Index('ix_bookings_archive_user_created',
+         bookings_archive.c.user_id, bookings_archive.c.created_at, bookings_archive.c.id)
+db.Index('ix_parking_reservations_archive_user_created', parking_reservations_archive.c.user_id,
+         parking_reservations_archive.c.created_at, parking_reservations_archive.c.id)
+time_slots_archive = archive_table(TimeSlot.__table__)
+
+ARCHIVES = {
+    Booking.__table__: bookings_archive,
+    BookingVisitor.__table__: booking_visitors_archive,
+    ParkingReservation.__table__: parking_reservations_archive,
+    TimeSlot.__table__: time_slots_archive
+}
+# Table -> (date column, child table moved along with it, child's foreign key column)
+PARTITIONS = [
+    (Booking.__table__, 'visit_date', BookingVisitor.__table__, 'booking_id'),
+    (ParkingReservation.__table__, 'reservation_date', None, None),
+    (TimeSlot.__table__, 'date', None, None)
+]
+
+def with_archive(table):
+    """Subquery over the live and archived rows of `table`, for history-wide aggregates"""
+    archive = ARCHIVES[table]
+    return union_all(select(*table.columns), select(*[archive.c[c.name] for c in table.columns])).subquery()
+
+def _move(table, ids, connection):
+    archive = ARCHIVES[table]
+    columns = [column.name for column in table.columns]
+    connection.execute(archive.insert().from_select(columns, select(*table.columns).where(table.c.id.in_(ids))))
+    connection.execute(table.delete().where(table.c.id.in_(ids)))
+
+def archive_before(cutoff, batch_size=500, pause=0.05):
+    """Move rows dated before `cutoff` into the archive tables, returns the rows moved per table"""
+    moved = {}
+    for table, date_column, child, child_key in PARTITIONS:
+        moved[table.name] = 0
+        while True:
+            ids = [row[0] for row in db.session.execute(
+                select(table.c.id).where(table.c[date_column] < cutoff).order_by(table.c.id).limit(batch_size))]
+            if not ids:
+                break
+            connection = db.session.connection()
+            if child is not None:
+                child_ids = [row[0] for row in connection.execute(
+                    select(child.c.id).where(child.c[child_key].in_(ids)))]
+                if child_ids:
+                    _move(child, child_ids, connection)
+            _move(table, ids, connection)
+            db.session.commit()
+            moved[table.name] += len(ids)
+            # Give waiting writers the lock between batches
+            time.sleep(pause)
+    # Archived objects may still sit in the identity map
+    db.session.expire_all()
+    return moved
+
+def run_archival(retention_days=90, batch_size=500, pause=0.05):
+    cutoff = datetime.utcnow().date() - timedelta(days=retention_days)
+    return archive_before(cutoff, batch_size, pause)
+
+def _archived(model, row):
+    # Transient, never added to the session, so it cannot be flushed back into the live table
+    record = model(**dict(row._mapping))
+    record.archived = True
+    return record
+
+def find_booking(booking_id, with_user=False):
+    """A booking by id, live or archived"""
+    booking = get_booking_by_id(booking_id, with_user=with_user)
+    if booking is not None:
+        return booking
+    row = db.session.execute(select(bookings_archive).where(bookings_archive.c.id == booking_id)).first()
+    return _archived(Booking, row) if row else None
+
+def find_reservation(reservation_id):
+    """A parking reservation by id, live or archived"""
+    reservation = db.session.get(ParkingReservation, reservation_id)
+    if reservation is not None:
+        return reservation
+    row = db.session.execute(select(parking_reservations_archive)
+                             .where(parking_reservations_archive.c.id == reservation_id)).first()
+    return _archived(ParkingReservation, row) if row else None
+
+def archive_stats():
+    stats = {}
+    for table, archive in ARCHIVES.items():
+        stats[table.name] = {
+            'live': db.session.execute(select(func.count()).select_from(table)).scalar(),
+            'archived': db.session.execute(select(func.count()).select_from(archive)).scalar()
+        }
+    return stats
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Archive past bookings, reservations and time slots')
+    parser.add_argument('command', choices=['run', 'stats'])
+    parser.add_argument('--retention-days', type=int, default=90)
+    parser.add_argument('--batch-size', type=int, default=500)
+    parser.add_argument('--pause', type=float, default=0.05, help='seconds to sleep between batches')
+    args = parser.parse_args(argv)
+
+    app = create_script_app()
+    with app.app_context():
+        db.create_all()
+        if args.command == 'run':
+            for table, count in run_archival(args.retention_days, args.batch_size, args.pause).items():
+                print(f"Archived {count} rows from {table}")
+        for table, counts in archive_stats().items():
+            print(f"{table:<22} {counts['live']:>10} live {counts['archived']:>10} archived")
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
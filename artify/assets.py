@@ -0,0 +1,324 @@
+"""Static asset bundling.
+
+Concatenates, minifies and fingerprints the CSS/JS bundles below into
+static/build/assets, with gzip (and brotli, when installed) copies next to
+each bundle. The /assets route serves them precompressed with a one-year
+immutable Cache-Control:
+
+    python assets.py icons     # vendor the Font Awesome icons the templates use
+    python assets.py build     # build every bundle
+
+Templates call asset_tags('<bundle>'). Until a build exists it links the
+source files one by one, and icons.css falls back to the CDN stylesheet.
+"""
+import os
+import re
+import sys
+import gzip
+import json
+import shutil
+import hashlib
+import argparse
+import posixpath
+import urllib.request
+
+from flask import request, send_from_directory, url_for, abort
+from markupsafe import Markup
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+STATIC_DIR = os.path.join(BASE_DIR, 'static')
+TEMPLATE_DIR = os.path.join(BASE_DIR, 'templates')
+BUILD_DIR = os.path.join(STATIC_DIR, 'build', 'assets')
+MANIFEST_PATH = os.path.join(BUILD_DIR, 'manifest.json')
+VENDOR_ICONS_DIR = os.path.join(STATIC_DIR, 'vendor', 'fontawesome')
+
+# Bundle name -> source files relative to static/
+BUNDLES = {
+    'booking.css': ['css/common.css', 'css/booking.css'],
+    'parking.css': ['css/common.css', 'css/parking.css'],
+    'payment.css': ['css/common.css', 'css/payment.css'],
+    'parking.js': ['js/parking.js'],
+    'payment.js': ['js/payment.js'],
+    'icons.css': ['vendor/fontawesome/icons.css']
+}
+
+FONT_AWESOME_VERSION = '6.0.0'
+FONT_AWESOME_CDN = f'https://cdnjs.cloudflare.com/ajax/libs/font-awesome/{FONT_AWESOME_VERSION}'
+FONT_AWESOME_FONTS = [
+    'fa-solid-900.woff2',
+    'fa-regular-400.woff2',
+    'fa-brands-400.woff2',
+    'fa-v4compatibility.woff2'
+]
+
+COMPRESSIBLE = ('.css', '.js', '.svg', '.json')
+
+_CSS_COMMENT = re.compile(r'/\*.*?\*/', re.S)
+# '+' and '~' are left alone, squeezing them would break calc() expressions
+_CSS_SPACE = re.compile(r'\s*([{};,>])\s*')
+_CSS_URL = re.compile(r'url\(\s*([\'"]?)([^\'")]+)\1\s*\)')
+
+def minify_css(css):
+    css = _CSS_COMMENT.sub('', css)
+    css = ' '.join(css.split())
+    css = _CSS_SPACE.sub(r'\1', css)
+    return css.replace(';}', '}').strip()
+
+def minify_js(js):
+    """Conservative JS minifier: drops indentation, blank lines and whole-line comments.
+
+    Newlines are kept so automatic semicolon insertion behaves exactly as in
+    the source, and nothing inside a line is touched.
+    """
+    lines = []
+    for line in js.splitlines():
+        stripped = line.strip()
+        if stripped and not stripped.startswith('//'):
+            lines.append(stripped)
+    return '\n'.join(lines)
+
+def fingerprint(name, data):
+    root, extension = os.path.splitext(name)
+    return f'{root}.{hashlib.sha256(data).hexdigest()[:10]}{extension}'
+
+def write_output(name, data):
+    """Write a fingerprinted file plus its precompressed copies, returns the file name"""
+    output_name = fingerprint(name, data)
+    path = os.path.join(BUILD_DIR, output_name)
+    if not os.path.exists(path):
+        with open(path, 'wb') as f:
+            f.write(data)
+        if output_name.endswith(COMPRESSIBLE):
+            with open(path + '.gz', 'wb') as f:
+                f.write(gzip.compress(data, compresslevel=9, mtime=0))
+            if brotli is not None:
+                with open(path + '.br', 'wb') as f:
+                    f.write(brotli.compress(data, quality=11))
+    return output_name
+
+def rewrite_css_urls(css, source):
+    """Fingerprint local files referenced by url() and point the CSS at the copies"""
+    source_dir = posixpath.dirname(source)
+
+    def replace(match):
+        target = match.group(2)
+        if target.startswith(('data:', 'http:', 'https:', '//', '/', '#')):
+            return match.group(0)
+        relative = posixpath.normpath(posixpath.join(source_dir, target.split('?')[0].split('#')[0]))
+        path = os.path.join(STATIC_DIR, relative)
+        if not os.path.exists(path):
+            print(f"Warning: {source} references missing file {relative}")
+            return match.group(0)
+        with open(path, 'rb') as f:
+            output_name = write_output(posixpath.basename(relative), f.read())
+        return f'url({output_name})'
+
+    return _CSS_URL.sub(replace, css)
+
+def build(bundles=BUNDLES):
+    os.makedirs(BUILD_DIR, exist_ok=True)
+    manifest = {}
+    for name, sources in bundles.items():
+        missing = [source for source in sources if not os.path.exists(os.path.join(STATIC_DIR, source))]
+        if missing:
+            print(f"Skipping {name}, missing {', '.join(missing)}")
+            continue
+        parts = []
+        for source in sources:
+            with open(os.path.join(STATIC_DIR, source), encoding='utf-8') as f:
+                text = f.read()
+            if name.endswith('.css'):
+                parts.append(minify_css(rewrite_css_urls(text, source)))
+            else:
+                # A trailing ';' keeps concatenated scripts from running into each other
+                parts.append(minify_js(text) + ';')
+        data = '\n'.join(parts).encode('utf-8')
+        manifest[name] = write_output(name, data)
+        print(f"{name}: {len(data)} bytes -> {manifest[name]}")
+
+    tmp_path = MANIFEST_PATH + '.tmp'
+    with open(tmp_path, 'w') as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(tmp_path, MANIFEST_PATH)
+    remove_stale(manifest)
+    return manifest
+
+def remove_stale(manifest):
+    """Delete outputs of older builds, keeping bundles and the fonts the new CSS references"""
+    keep = {os.path.basename(MANIFEST_PATH)}
+    for output_name in manifest.values():
+        keep.update({output_name, output_name + '.gz', output_name + '.br'})
+        if output_name.endswith('.css'):
+            with open(os.path.join(BUILD_DIR, output_name), encoding='utf-8') as f:
+                keep.update(match.group(2) for match in _CSS_URL.finditer(f.read()))
+    for file_name in os.listdir(BUILD_DIR):
+        if file_name not in keep:
+            os.remove(os.path.join(BUILD_DIR, file_name))
+
+def split_rules(css):
+    """Split a stylesheet into its top-level rules, keeping nested blocks intact"""
+    rules = []
+    depth = 0
+    start = 0
+    for i, char in enumerate(css):
+        if char == '{':
+            depth += 1
+        elif char == '}':
+            depth -= 1
+            if depth == 0:
+                rules.append(css[start:i + 1].strip())
+                start = i + 1
+        elif char == ';' and depth == 0:
+            # Statements like @charset or @import
+            rules.append(css[start:i + 1].strip())
+            start = i + 1
+    return [rule for rule in rules if rule]
+
+def used_icons():
+    """Every fa-* class mentioned in the templates and scripts"""
+    pattern = re.compile(r'\bfa-([a-z0-9-]+)')
+    names = set()
+    for directory in (TEMPLATE_DIR, os.path.join(STATIC_DIR, 'js')):
+        for root, _, files in os.walk(directory):
+            for file_name in files:
+                if file_name.endswith(('.html', '.js')):
+                    with open(os.path.join(root, file_name), encoding='utf-8') as f:
+                        names.update(pattern.findall(f.read()))
+    return names
+
+def vendor_icons():
+    """Download Font Awesome once and keep only the icons we use.
+
+    Writes static/vendor/fontawesome/icons.css with the base and used icon
+    rules, and the webfonts, subset to the used glyphs when fontTools is
+    installed.
+    """
+    icons = used_icons()
+    os.makedirs(os.path.join(VENDOR_ICONS_DIR, 'webfonts'), exist_ok=True)
+    with urllib.request.urlopen(f'{FONT_AWESOME_CDN}/css/all.min.css', timeout=30) as response:
+        css = response.read().decode('utf-8')
+
+    # Every browser we support takes woff2, drop the truetype fallbacks we do not download
+    css = re.sub(r',\s*url\([^)]*\.ttf\)\s*format\("truetype"\)', '', css)
+
+    kept = []
+    codepoints = set()
+    icon_rule = re.compile(r'^((?:\.fa-[a-z0-9-]+:{1,2}before,?)+)$')
+    for rule in split_rules(css):
+        if '{' not in rule or rule.count('{') > 1:
+            # At-rules such as @keyframes and @media are kept whole
+            kept.append(rule)
+            continue
+        selector, body = rule.split('{', 1)
+        match = icon_rule.match(selector.strip())
+        if not match:
+            kept.append(rule)
+            continue
+        selectors = [s for s in selector.split(',') if s.split(':')[0][len('.fa-'):] in icons]
+        if selectors:
+            kept.append(','.join(selectors) + '{' + body)
+            codepoints.update(int(c, 16) for c in re.findall(r'content:\s*"\\([0-9a-f]+)"', body))
+
+    with open(os.path.join(VENDOR_ICONS_DIR, 'icons.css'), 'w', encoding='utf-8') as f:
+        f.write(f'/* Font Awesome Free {FONT_AWESOME_VERSION} (fontawesome.com/license/free), '
+                f'subset to the icons Artify uses */\n')
+        f.write('\n'.join(kept) + '\n')
+
+    try:
+        from fontTools import subset
+    except ImportError:
+        subset = None
+        print("fontTools is not installed, keeping the full webfonts")
+
+    for font_name in FONT_AWESOME_FONTS:
+        path = os.path.join(VENDOR_ICONS_DIR, 'webfonts', font_name)
+        with urllib.request.urlopen(f'{FONT_AWESOME_CDN}/webfonts/{font_name}', timeout=30) as response, \
+                open(path, 'wb') as f:
+            shutil.copyfileobj(response, f)
+        if subset is not None and codepoints:
+            options = subset.Options()
+            options.flavor = 'woff2'
+            font = subset.load_font(path, options)
+            subsetter = subset.Subsetter(options)
+            subsetter.populate(unicodes=codepoints)
+            subsetter.subset(font)
+            subset.save_font(font, path, options)
+    print(f"Vendored {len(icons)} icon names, {len(codepoints)} glyphs")
+
+_manifest = {}
+_debug = False
+
+def load_manifest():
+    global _manifest
+    try:
+        with open(MANIFEST_PATH) as f:
+            _manifest = json.load(f)
+    except (OSError, ValueError):
+        _manifest = {}
+    return _manifest
+
+def _tag(name, url):
+    if name.endswith('.css'):
+        return f'<link rel="stylesheet" href="{url}">'
+    return f'<script src="{url}"></script>'
+
+def asset_tags(name):
+    """<link>/<script> tags for a bundle: the built file, or its sources before a build"""
+    if name in _manifest and not _debug:
+        return Markup(_tag(name, url_for('built_asset', filename=_manifest[name])))
+    sources = BUNDLES.get(name, [])
+    tags = [_tag(name, url_for('static', filename=source))
+            for source in sources if os.path.exists(os.path.join(STATIC_DIR, source))]
+    if name == 'icons.css' and not tags:
+        tags = [_tag(name, f'{FONT_AWESOME_CDN}/css/all.min.css')]
+    return Markup('\n'.join(tags))
+
+def init_assets(app):
+    """Load the bundle manifest and serve built assets from /assets"""
+    global _debug
+    app.config.setdefault('ASSETS_DEBUG', False)
+    _debug = app.config['ASSETS_DEBUG']
+    load_manifest()
+    app.jinja_env.globals['asset_tags'] = asset_tags
+
+    def built_asset(filename):
+        path = os.path.join(BUILD_DIR, filename)
+        if not os.path.isfile(path):
+            abort(404)
+        encoding = None
+        accepted = request.headers.get('Accept-Encoding', '')
+        if filename.endswith(COMPRESSIBLE):
+            if 'br' in accepted and os.path.exists(path + '.br'):
+                encoding = 'br'
+            elif 'gzip' in accepted and os.path.exists(path + '.gz'):
+                encoding = 'gzip'
+        served = filename + {'br': '.br', 'gzip': '.gz'}.get(encoding, '')
+        mimetype = {'.css': 'text/css', '.js': 'text/javascript'}.get(os.path.splitext(filename)[1])
+        response = send_from_directory(BUILD_DIR, served, mimetype=mimetype, conditional=True)
+        if encoding:
+            response.headers['Content-Encoding'] = encoding
+        response.headers['Vary'] = 'Accept-Encoding'
+        response.cache_control.public = True
+        response.cache_control.max_age = 31536000
+        response.cache_control.immutable = True
+        return response
+
+    app.add_url_rule('/assets/<path:filename>', 'built_asset', built_asset)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Build static asset bundles')
+    parser.add_argument('command', choices=['build', 'icons'])
+    args = parser.parse_args(argv)
+    if args.command == 'icons':
+        vendor_icons()
+    else:
+        build()
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
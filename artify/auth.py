@@ -1,9 +1,21 @@
+import os
+from flask import Flask
 from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy import case
+from sqlalchemy.orm import joinedload, selectinload
 from werkzeug.security import generate_password_hash, check_password_hash
 from datetime import datetime
 
+from serializers import Serializer
+
 db = SQLAlchemy()
 
+# Visiting hours, one TimeSlot row per monument and date for each
+TIME_SLOTS = ['09:00-11:00', '11:00-13:00', '14:00-16:00', '16:00-18:00']
+
+# payment_status of a cancelled booking or reservation, 'refunded' when it had been paid
+CANCELLED_STATUSES = ('cancelled', 'refunded')
+
 class User(db.Model):
     __tablename__ = 'users'
     
@@ -26,23 +38,19 @@ class User(db.Model):
         return User.query.filter_by(email=email).first()
 
     def to_dict(self):
-        return {
-            'id': self.id,
-            'name': self.name,
-            'email': self.email,
-            'is_admin': self.is_admin,
-            'created_at': self.created_at.strftime('%Y-%m-%d %H:%M:%S')
-        }
+        return user_serializer(self)
 
 class Booking(db.Model):
     __tablename__ = 'bookings'
+    # A user's history newest first, see history.py
+    __table_args__ = (db.Index('ix_bookings_user_created', 'user_id', 'created_at', 'id'),)
     
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
     monument = db.Column(db.String(100), nullable=False)
     visit_date = db.Column(db.Date, nullable=False)
     time_slot = db.Column(db.String(20), nullable=False)
-    visitors = db.Column(db.JSON, nullable=True)  # Allow NULL for visitors
+    visitors = db.Column(db.JSON, nullable=True)  # Additional visitors as given at booking, see visitor_records
     qr_code = db.Column(db.Text, nullable=True)  # Allow NULL for QR code
     payment_status = db.Column(db.String(20), default='pending')
     payment_method = db.Column(db.String(50), nullable=True)  # Allow NULL for payment method
@@ -60,6 +68,31 @@ class Booking(db.Model):
     is_student = db.Column(db.Boolean, default=False)
     student_id = db.Column(db.String(50), nullable=True)  # Student ID number if applicable
     student_discount_applied = db.Column(db.Boolean, default=False)  # Track if student discount was applied
+    cancelled_at = db.Column(db.DateTime, nullable=True)
+    group_id = db.Column(db.Integer, db.ForeignKey('group_orders.id'), nullable=True, index=True)
+
+    # Headcount including the primary contact, kept in sync with visitor_records by set_visitors()
+    visitor_count = db.Column(db.Integer, nullable=False, default=1)
+    student_count = db.Column(db.Integer, nullable=False, default=0)
+
+    visitor_records = db.relationship('BookingVisitor', backref='booking', lazy=True,
+                                      cascade='all, delete-orphan', order_by='BookingVisitor.position')
+
+    def set_visitors(self, visitors, primary_name=None, primary_age=None):
+        """Record everyone on the ticket: the primary contact first, then `visitors`"""
+        visitors = visitors or []
+        records = [BookingVisitor(position=0, name=primary_name, age=primary_age, is_student=bool(self.is_student))]
+        for position, visitor in enumerate(visitors, start=1):
+            records.append(BookingVisitor(
+                position=position,
+                name=visitor.get('name'),
+                age=visitor.get('age'),
+                is_student=bool(visitor.get('is_student'))
+            ))
+        self.visitors = visitors
+        self.visitor_records = records
+        self.visitor_count = len(records)
+        self.student_count = sum(1 for record in records if record.is_student)
 
     def calculate_amount(self):
         """Calculate final amount including student discounts and guide fees"""
@@ -69,9 +102,9 @@ class Booking(db.Model):
         # Guide fee if needed
         guide_fee = 500.0 if self.need_guide else 0
         
-        # Calculate visitor count and student discount
-        total_visitors = len(self.visitors) if self.visitors else 0
-        student_count = sum(1 for v in self.visitors if v.get('is_student')) if self.visitors else 0
+        # Additional visitors and students among them, the primary contact is priced below
+        total_visitors = (self.visitor_count or 1) - 1
+        student_count = (self.student_count or 0) - (1 if self.is_student else 0)
         regular_count = total_visitors - student_count
         
         # Apply student discount (30%)
@@ -92,29 +125,29 @@ class Booking(db.Model):
 
     def to_dict(self):
         """Convert booking to dictionary"""
-        return {
-            'id': self.id,
-            'user_id': self.user_id,
-            'monument': self.monument,
-            'visit_date': self.visit_date.strftime('%Y-%m-%d'),
-            'time_slot': self.time_slot,
-            'visitors': self.visitors,
-            'qr_code': self.qr_code,
-            'payment_status': self.payment_status,
-            'payment_method': self.payment_method,
-            'need_guide': self.need_guide,
-            'need_parking': self.need_parking,
-            'base_amount': self.base_amount,
-            'final_amount': self.final_amount,
-            'created_at': self.created_at.strftime('%Y-%m-%d %H:%M:%S'),
-            'updated_at': self.updated_at.strftime('%Y-%m-%d %H:%M:%S'),
-            'nationality': self.nationality,
-            'id_number': self.id_number,
-            'camera_required': self.camera_required,
-            'is_student': self.is_student,
-            'student_id': self.student_id,
-            'student_discount_applied': self.student_discount_applied
-        }
+        return booking_serializer(self)
+
+class BookingVisitor(db.Model):
+    __tablename__ = 'booking_visitors'
+
+    id = db.Column(db.Integer, primary_key=True)
+    booking_id = db.Column(db.Integer, db.ForeignKey('bookings.id'), nullable=False, index=True)
+    position = db.Column(db.Integer, nullable=False, default=0)  # 0 is the primary contact
+    name = db.Column(db.String(100), nullable=True)
+    age = db.Column(db.Integer, nullable=True)
+    is_student = db.Column(db.Boolean, nullable=False, default=False)
+
+class GroupOrder(db.Model):
+    """Bookings and parking reservations made together through the group booking API"""
+    __tablename__ = 'group_orders'
+
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False, index=True)
+    reference = db.Column(db.String(32), unique=True, nullable=False)
+    total_amount = db.Column(db.Float, nullable=False, default=0.0)
+    payment_method = db.Column(db.String(50), nullable=True)
+    qr_code = db.Column(db.Text, nullable=True)  # JSON manifest of every ticket in the order
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
 
 class TimeSlot(db.Model):
     __tablename__ = 'time_slots'
@@ -131,20 +164,44 @@ class TimeSlot(db.Model):
         return self.capacity > self.booked
 
     def to_dict(self):
-        return {
-            'monument': self.monument,
-            'date': self.date.strftime('%Y-%m-%d'),
-            'time_slot': self.time_slot,
-            'available_slots': self.capacity - self.booked
-        }
+        return timeslot_serializer(self)
 
-def init_db(app):
-    # Database configuration
-    app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///artify.db'
+user_serializer = Serializer(User, ['id', 'name', 'email', 'is_admin', 'created_at'])
+
+booking_serializer = Serializer(Booking, [
+    'id', 'user_id', 'monument', 'visit_date', 'time_slot', 'visitors', 'qr_code',
+    'payment_status', 'payment_method', 'need_guide', 'need_parking',
+    'base_amount', 'final_amount', 'created_at', 'updated_at', 'nationality',
+    'id_number', 'camera_required', 'is_student', 'student_id', 'student_discount_applied',
+    'visitor_count', 'student_count', 'cancelled_at', 'group_id'
+])
+
+timeslot_serializer = Serializer(
+    TimeSlot, ['monument', 'date', 'time_slot'],
+    computed={'available_slots': lambda slot: slot.capacity - slot.booked},
+    requires=['capacity', 'booked']
+)
+
+def configure_db(app):
+    # Database configuration (ARTIFY_DATABASE_URI lets scripts point at a scratch database)
+    app.config['SQLALCHEMY_DATABASE_URI'] = os.environ.get('ARTIFY_DATABASE_URI', 'sqlite:///artify.db')
     app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
     
     # Initialize database
     db.init_app(app)
+
+def create_script_app():
+    """Bare app on the site's database for command line tools.
+
+    Importing app.py would recreate the tables, this leaves them alone.
+    """
+    app = Flask(__name__)
+    app.instance_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'instance')
+    configure_db(app)
+    return app
+
+def init_db(app):
+    configure_db(app)
     
     # Create all tables
     with app.app_context():
@@ -196,13 +253,13 @@ def create_booking(user_id, monument, visit_date, time_slot, visitors=None, need
             monument=monument,
             visit_date=visit_date,
             time_slot=time_slot,
-            visitors=visitors or [],
             need_guide=need_guide,
             need_parking=need_parking
         )
+        booking.set_visitors(visitors)
         
         # Update slot availability
-        slot.booked += len(visitors or []) + 1
+        slot.booked += booking.visitor_count
         
         db.session.add(booking)
         db.session.commit()
@@ -212,12 +269,19 @@ def create_booking(user_id, monument, visit_date, time_slot, visitors=None, need
         db.session.rollback()
         return False, str(e)
 
-def get_user_bookings(user_id):
-    """Get all bookings for a user"""
-    return Booking.query.filter_by(user_id=user_id).all()
+def get_user_bookings(user_id, limit=20):
+    """A user's most recent bookings with their visitors, see history.py for the paginated API"""
+    return (Booking.query
+            .options(selectinload(Booking.visitor_records))
+            .filter_by(user_id=user_id)
+            .order_by(Booking.created_at.desc(), Booking.id.desc())
+            .limit(limit)
+            .all())
 
-def get_booking_by_id(booking_id):
-    """Get a booking by its ID"""
+def get_booking_by_id(booking_id, with_user=False):
+    """Get a booking by its ID, optionally loading its user in the same query"""
+    if with_user:
+        return Booking.query.options(joinedload(Booking.user)).filter_by(id=booking_id).first()
     return Booking.query.get(booking_id)
 
 def update_booking_payment(booking_id, payment_method, status='completed'):
@@ -235,39 +299,79 @@ def update_booking_payment(booking_id, payment_method, status='completed'):
     return False, "Booking not found"
 
 def create_time_slots(monument, date):
-    """Create time slots for a given monument and date"""
-    slots = ['09:00-11:00', '11:00-13:00', '14:00-16:00', '16:00-18:00']
+    """Create time slots for a given monument and date.
+
+    They are flushed in a savepoint and committed with the caller's
+    transaction, so a payment that creates its day's slots stays atomic.
+    """
     created_slots = []
     
-    for slot in slots:
+    for slot in TIME_SLOTS:
         time_slot = TimeSlot(
             monument=monument,
             date=date,
             time_slot=slot
         )
-        db.session.add(time_slot)
         created_slots.append(time_slot)
     
     try:
-        db.session.commit()
+        with db.session.begin_nested():
+            db.session.add_all(created_slots)
         return True, created_slots
     except Exception as e:
-        db.session.rollback()
         return False, str(e)
 
 def get_available_slots(monument, date):
     """Get available time slots for a monument on a specific date"""
-    slots = TimeSlot.query.filter_by(
-        monument=monument,
-        date=date
-    ).all()
+    # Select just the serialized columns, the rows are never modified here
+    query = db.session.query(*timeslot_serializer.columns).filter(
+        TimeSlot.monument == monument,
+        TimeSlot.date == date
+    )
+    slots = query.all()
     
     if not slots:
-        success, slots = create_time_slots(monument, date)
+        success, _ = create_time_slots(monument, date)
         if not success:
             return []
+        db.session.commit()
+        slots = query.all()
     
-    return [slot.to_dict() for slot in slots if slot.available]
+    return [timeslot_serializer(slot) for slot in slots if slot.capacity > slot.booked]
+
+def reserve_slot_capacity(monument, date, time_slot, count=1):
+    """Take `count` places in a slot with one conditional UPDATE, so two payments cannot oversell it.
+
+    Returns False when the slot is full. Slots are created on first use,
+    like get_available_slots does.
+    """
+    def reserve():
+        return TimeSlot.query.filter(
+            TimeSlot.monument == monument,
+            TimeSlot.date == date,
+            TimeSlot.time_slot == time_slot,
+            TimeSlot.capacity - TimeSlot.booked >= count
+        ).update({TimeSlot.booked: TimeSlot.booked + count}, synchronize_session=False)
+
+    if reserve():
+        return True
+    if TimeSlot.query.filter_by(monument=monument, date=date).first() is None:
+        success, _ = create_time_slots(monument, date)
+        return success and bool(reserve())
+    return False
+
+def release_slot_capacity(monument, date, time_slot, count=1):
+    """Give `count` places back to a slot, the reverse of reserve_slot_capacity().
+
+    booked never goes below zero, a slot that counted fewer places than are
+    released (e.g. rows booked before capacity was tracked) is emptied.
+    """
+    TimeSlot.query.filter(
+        TimeSlot.monument == monument,
+        TimeSlot.date == date,
+        TimeSlot.time_slot == time_slot
+    ).update({TimeSlot.booked: case((TimeSlot.booked > count, TimeSlot.booked - count), else_=0)},
+             synchronize_session=False)
 
 def update_slot_availability(monument, date, time_slot, count=1):
     """Update slot availability when a booking is made"""
@@ -0,0 +1,317 @@
+"""Load test for the booking and parking flows.
+
+Runs the real Flask app against a scratch SQLite database, job queue and
+ticket and speech caches, so nothing the site uses is ever touched:
+
+    python benchmark.py --users 200 --concurrency 8
+    python benchmark.py --save-baseline baseline.json
+    python benchmark.py --baseline baseline.json --tolerance 20
+"""
+import os
+import sys
+import json
+import time
+import random
+import argparse
+import tempfile
+import threading
+from datetime import date, datetime, timedelta
+from concurrent.futures import ThreadPoolExecutor
+
+# The app recreates its tables on import, so point it at a scratch database first,
+# and payments queue ticket renders and notification sends, so at a scratch job queue too
+_bench_dir = tempfile.mkdtemp(prefix='artify-bench-')
+os.environ.setdefault('ARTIFY_DATABASE_URI', 'sqlite:///' + os.path.join(_bench_dir, 'bench.db'))
+os.environ.setdefault('ARTIFY_JOBS_DB', os.path.join(_bench_dir, 'jobs.db'))
+os.environ.setdefault('ARTIFY_TICKET_CACHE_DIR', os.path.join(_bench_dir, 'tickets'))
+os.environ.setdefault('ARTIFY_TTS_CACHE_DIR', os.path.join(_bench_dir, 'tts_cache'))
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+from werkzeug.security import generate_password_hash
+
+from app import app, MONUMENTS_DATA
+from auth import db, User, TimeSlot
+from parking import ParkingSlot, ParkingReservation
+
+TIME_SLOTS = ['09:00-11:00', '11:00-13:00', '14:00-16:00', '16:00-18:00']
+PARKING_MONUMENTS = ['Taj Mahal', 'Red Fort', 'Qutub Minar', 'India Gate', 'Lotus Temple']
+PASSWORD = 'benchmark-pass'
+
+_counters = threading.local()
+
+@event.listens_for(Session, 'after_commit')
+def _count_commit(session):
+    _counters.commits = getattr(_counters, 'commits', 0) + 1
+
+def seed_database(num_users, horizon_days, history_days, seed=42):
+    """Fill the scratch database with users, a TimeSlot horizon and parking history"""
+    rng = random.Random(seed)
+    today = date.today()
+    # Hashing is deliberately slow, one hash shared by every seeded user keeps seeding fast
+    password_hash = generate_password_hash(PASSWORD)
+
+    with app.app_context():
+        db.session.bulk_insert_mappings(User, [
+            {
+                'name': f'Seed User {i}',
+                'email': f'seed{i}@bench.artify',
+                'password_hash': password_hash
+            }
+            for i in range(num_users)
+        ])
+
+        db.session.bulk_insert_mappings(TimeSlot, [
+            {
+                'monument': monument,
+                'date': today + timedelta(days=offset),
+                'time_slot': slot,
+                'capacity': 50,
+                'booked': rng.randint(0, 40)
+            }
+            for monument in MONUMENTS_DATA
+            for offset in range(horizon_days)
+            for slot in TIME_SLOTS
+        ])
+
+        user_ids = [u.id for u in User.query.with_entities(User.id).all()]
+        slots = ParkingSlot.query.with_entities(
+            ParkingSlot.id, ParkingSlot.monument, ParkingSlot.vehicle_type
+        ).all()
+        reservations = []
+        for offset in range(1, history_days + 1):
+            day = today - timedelta(days=offset)
+            for slot_id, monument, vehicle_type in rng.sample(slots, len(slots) // 2):
+                reservations.append({
+                    'user_id': rng.choice(user_ids),
+                    'slot_id': slot_id,
+                    'monument': monument,
+                    'vehicle_type': vehicle_type,
+                    'vehicle_number': f'DL{rng.randint(1, 99):02d}AB{rng.randint(1000, 9999)}',
+                    'driver_name': 'Seed Driver',
+                    'phone': '9999999999',
+                    'reservation_date': day,
+                    'duration': rng.randint(1, 6),
+                    'amount': 50.0,
+                    'payment_status': 'completed',
+                    'payment_method': 'upi'
+                })
+        db.session.bulk_insert_mappings(ParkingReservation, reservations)
+        db.session.commit()
+
+    return {
+        'users': num_users,
+        'time_slots': len(MONUMENTS_DATA) * horizon_days * len(TIME_SLOTS),
+        'parking_reservations': len(reservations)
+    }
+
+class FlowRunner:
+    """Drives one virtual user through the site and records every request"""
+
+    def __init__(self, index, rng):
+        self.index = index
+        self.rng = rng
+        self.client = app.test_client()
+        self.samples = []
+
+    def call(self, operation, method, path, **kwargs):
+        _counters.commits = 0
+        start = time.perf_counter()
+        response = self.client.open(path, method=method, **kwargs)
+        elapsed = time.perf_counter() - start
+        ok = response.status_code < 400
+        if ok and response.is_json:
+            body = response.get_json()
+            ok = not isinstance(body, dict) or body.get('success', True) is not False
+        self.samples.append((operation, elapsed, _counters.commits, ok))
+        return response
+
+    def signup_and_login(self):
+        email = f'bench{self.index}-{self.rng.randint(0, 10**9)}@bench.artify'
+        self.call('signup', 'POST', '/signup', data={
+            'name': f'Bench User {self.index}',
+            'email': email,
+            'password': PASSWORD,
+            'confirm_password': PASSWORD
+        })
+        self.call('login', 'POST', '/login', data={'email': email, 'password': PASSWORD})
+
+    def booking_flow(self):
+        monument = self.rng.choice(list(MONUMENTS_DATA))
+        visit_date = (date.today() + timedelta(days=self.rng.randint(1, 30))).strftime('%Y-%m-%d')
+        time_slot = self.rng.choice(TIME_SLOTS)
+
+        self.call('get_available_slots', 'GET', '/get_available_slots',
+                  query_string={'monument': monument, 'date': visit_date})
+        self.call('store_booking', 'POST', '/store_booking', json={
+            'monument': monument,
+            'date': visit_date,
+            'time_slot': time_slot,
+            'id_number': '1234-5678-9012',
+            'num_visitors': 2
+        })
+        self.call('process_payment', 'POST', '/process_payment', json={
+            'payment_method': 'upi',
+            'upi_id': 'bench@upi',
+            'time_slot': time_slot,
+            'id_number': '1234-5678-9012',
+            'booking_data': {
+                'monument': monument,
+                'date': visit_date,
+                'visitors': [{'name': 'Guest', 'age': 30}, {'name': 'Student', 'age': 20, 'is_student': True}],
+                'base_amount': 50,
+                'final_amount': 150
+            }
+        })
+        self.call('booking_confirmation', 'GET', '/booking_confirmation')
+        with self.client.session_transaction() as sess:
+            booking_id = sess.get('booking_id')
+        if booking_id:
+            self.call('scan', 'GET', f'/scan/{booking_id}')
+
+    def parking_flow(self):
+        monument = self.rng.choice(PARKING_MONUMENTS)
+        reservation_date = (date.today() + timedelta(days=self.rng.randint(1, 30))).strftime('%Y-%m-%d')
+        vehicle_type = self.rng.choice(['2wheeler', '4wheeler', 'bus'])
+
+        response = self.call('get_parking_slots', 'GET', '/api/parking/slots', query_string={
+            'monument': monument, 'date': reservation_date, 'vehicle_type': vehicle_type
+        })
+        slots = response.get_json() if response.status_code == 200 else None
+        if not slots:
+            return
+        slot = self.rng.choice(slots)
+
+        form = {
+            'monument': monument,
+            'date': reservation_date,
+            'vehicle_type': vehicle_type,
+            'slot_number': str(slot['id']),
+            'duration': '2',
+            'vehicle_number': f'DL01AB{self.rng.randint(1000, 9999)}',
+            'name': 'Bench Driver',
+            'phone': '9999999999',
+            'total_amount': '50'
+        }
+        self.call('process_parking', 'POST', '/process_parking', data=form)
+
+        form['driver_name'] = form.pop('name')
+        form['amount'] = form.pop('total_amount')
+        form['payment_method'] = 'upi'
+        self.call('process_parking_payment', 'POST', '/process_parking_payment', data=form)
+        self.call('parking_confirmation', 'GET', '/parking-confirmation')
+
+    def run(self):
+        self.signup_and_login()
+        self.booking_flow()
+        self.parking_flow()
+        return self.samples
+
+def percentile(sorted_values, pct):
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return 0.0
+    rank = max(0, min(len(sorted_values) - 1, int(round(pct / 100.0 * len(sorted_values) + 0.5)) - 1))
+    return sorted_values[rank]
+
+def summarize(samples, wall_time):
+    operations = {}
+    for operation, elapsed, commits, ok in samples:
+        operations.setdefault(operation, []).append((elapsed, commits, ok))
+
+    report = {
+        'total_requests': len(samples),
+        'wall_time_s': round(wall_time, 3),
+        'throughput_rps': round(len(samples) / wall_time, 2) if wall_time else 0.0,
+        'operations': {}
+    }
+    for operation, rows in operations.items():
+        latencies = sorted(row[0] for row in rows)
+        report['operations'][operation] = {
+            'count': len(rows),
+            'errors': sum(1 for row in rows if not row[2]),
+            'p50_ms': round(percentile(latencies, 50) * 1000, 2),
+            'p95_ms': round(percentile(latencies, 95) * 1000, 2),
+            'p99_ms': round(percentile(latencies, 99) * 1000, 2),
+            'commits_per_op': round(sum(row[1] for row in rows) / len(rows), 2)
+        }
+    return report
+
+def print_report(report):
+    print(f"\n{report['total_requests']} requests in {report['wall_time_s']}s "
+          f"({report['throughput_rps']} req/s)\n")
+    print(f"{'operation':<26}{'count':>7}{'errors':>8}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'commits':>9}")
+    for operation, stats in sorted(report['operations'].items()):
+        print(f"{operation:<26}{stats['count']:>7}{stats['errors']:>8}{stats['p50_ms']:>10}"
+              f"{stats['p95_ms']:>10}{stats['p99_ms']:>10}{stats['commits_per_op']:>9}")
+
+def compare_with_baseline(report, baseline, tolerance):
+    """Print p95 and commit changes against a saved run, return the regressed operations"""
+    regressions = []
+    print(f"\nComparison with baseline (tolerance {tolerance}%):")
+    for operation, stats in sorted(report['operations'].items()):
+        base = baseline.get('operations', {}).get(operation)
+        if not base:
+            print(f"  {operation:<26} new operation")
+            continue
+        change = ((stats['p95_ms'] - base['p95_ms']) / base['p95_ms'] * 100) if base['p95_ms'] else 0.0
+        marker = ''
+        if change > tolerance or stats['commits_per_op'] > base['commits_per_op']:
+            marker = '  REGRESSION'
+            regressions.append(operation)
+        print(f"  {operation:<26} p95 {base['p95_ms']} -> {stats['p95_ms']} ms ({change:+.1f}%), "
+              f"commits {base['commits_per_op']} -> {stats['commits_per_op']}{marker}")
+    return regressions
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Load test the Artify booking and parking flows')
+    parser.add_argument('--users', type=int, default=100, help='virtual users to run through the flows')
+    parser.add_argument('--concurrency', type=int, default=4, help='virtual users running at once')
+    parser.add_argument('--seed-users', type=int, default=1000)
+    parser.add_argument('--horizon-days', type=int, default=60, help='days of TimeSlot inventory to seed')
+    parser.add_argument('--history-days', type=int, default=90, help='days of past parking reservations')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--output', help='write the JSON report to this file')
+    parser.add_argument('--save-baseline', help='save this run as the baseline file')
+    parser.add_argument('--baseline', help='compare against a saved baseline file')
+    parser.add_argument('--tolerance', type=float, default=15.0, help='allowed p95 regression in percent')
+    args = parser.parse_args(argv)
+
+    app.config['TESTING'] = True
+    app.config['RATELIMIT_ENABLED'] = False
+    # Report query budget overruns as warnings instead of failing the run
+    app.config['QUERYTRACE_STRICT'] = False
+
+    print(f"Seeding database in {_bench_dir}...")
+    seeded = seed_database(args.seed_users, args.horizon_days, args.history_days, args.seed)
+    print(f"Seeded {seeded}")
+
+    runners = [FlowRunner(i, random.Random(args.seed + i)) for i in range(args.users)]
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+        results = list(pool.map(lambda runner: runner.run(), runners))
+    wall_time = time.perf_counter() - start
+
+    report = summarize([sample for samples in results for sample in samples], wall_time)
+    report['config'] = {
+        'users': args.users,
+        'concurrency': args.concurrency,
+        'seeded': seeded,
+        'run_at': datetime.utcnow().strftime('%Y-%m-%d %H:%M:%S')
+    }
+    print_report(report)
+
+    for path in filter(None, [args.output, args.save_baseline]):
+        with open(path, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"\nReport written to {path}")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        if compare_with_baseline(report, baseline, args.tolerance):
+            return 1
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
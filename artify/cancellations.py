@@ -0,0 +1,254 @@
+"""Cancelling bookings and parking reservations, one at a time or for a whole closed day.
+
+A cancellation changes the row's payment_status to 'refunded' (it had been
+paid, and a Refund row records what is owed) or 'cancelled', and gives its
+places back in the same transaction: TimeSlot.booked goes down by the
+booking's headcount, and a cancelled reservation no longer holds its parking
+slot for the day. The status change is claimed with a conditional UPDATE
+first, so two cancellations racing for the same booking cannot both return
+its places. Freed ticket places wake the waitlist promoter.
+
+Visitors can cancel until the day before their visit and get the full amount
+back. Every cancellation emails the visitor through the notification outbox.
+Closing a monument for a day cancels and refunds everything booked for it in
+batches and stops new bookings for that day:
+
+    python cancellations.py close --monument "Taj Mahal" --date 2024-03-08 --reason "State visit"
+"""
+import sys
+import argparse
+from datetime import datetime
+
+from flask import request, session, jsonify
+from sqlalchemy.orm import joinedload
+
+from auth import (
+    db, create_script_app, Booking, TimeSlot, CANCELLED_STATUSES,
+    create_time_slots, release_slot_capacity
+)
+from parking import ParkingReservation
+from reporting import admin_required
+from querytrace import query_budget
+from ratelimit import rate_limit
+from serializers import Serializer
+from waitlist import WaitlistEntry, WAITING, OFFERED, CANCELLED, wake_promoter
+from notifications import cancelled as notify_cancelled, send_soon
+
+class Refund(db.Model):
+    __tablename__ = 'refunds'
+
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False, index=True)
+    # Plain ids rather than foreign keys, the archiver moves refunded bookings out of their tables
+    booking_id = db.Column(db.Integer, nullable=True, index=True)
+    parking_reservation_id = db.Column(db.Integer, nullable=True, index=True)
+    amount = db.Column(db.Float, nullable=False)
+    payment_method = db.Column(db.String(50), nullable=True)  # Refunded the way it was paid
+    reason = db.Column(db.String(200), nullable=True)
+    status = db.Column(db.String(20), nullable=False, default='pending')  # pending until the provider pays it out
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+class Closure(db.Model):
+    __tablename__ = 'closures'
+    __table_args__ = (db.UniqueConstraint('monument', 'date'),)
+
+    id = db.Column(db.Integer, primary_key=True)
+    monument = db.Column(db.String(100), nullable=False)
+    date = db.Column(db.Date, nullable=False)
+    reason = db.Column(db.String(200), nullable=True)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+refund_serializer = Serializer(Refund, ['id', 'amount', 'payment_method', 'reason', 'status', 'created_at'])
+
+def is_closed(monument, date):
+    return db.session.query(Closure.id).filter_by(monument=monument, date=date).first() is not None
+
+def _claim(model, record, status, now):
+    """Move `record` from the status it was loaded with to `status`, False if it changed meanwhile"""
+    claimed = model.query.filter(model.id == record.id, model.payment_status == record.payment_status).update(
+        {model.payment_status: status, model.cancelled_at: now}, synchronize_session=False)
+    if not claimed:
+        return False
+    # Mirror the change on the loaded object so the rollups see it when it is flushed
+    record.payment_status = status
+    record.cancelled_at = now
+    return True
+
+def _cancel(model, record, amount, reason, now):
+    """Cancel a booking or reservation inside the caller's transaction, returns (success, refund)"""
+    if record.payment_status in CANCELLED_STATUSES:
+        return False, None
+    paid = record.payment_status == 'completed'
+    if not _claim(model, record, 'refunded' if paid else 'cancelled', now):
+        return False, None
+    refund = None
+    if paid and amount:
+        refund = Refund(user_id=record.user_id, amount=amount, payment_method=record.payment_method, reason=reason)
+        if model is Booking:
+            refund.booking_id = record.id
+        else:
+            refund.parking_reservation_id = record.id
+        db.session.add(refund)
+    notify_cancelled(record, record.user, 'booking' if model is Booking else 'parking reservation', refund)
+    return True, refund
+
+def _cancel_booking(booking, reason, now):
+    success, refund = _cancel(Booking, booking, booking.final_amount, reason, now)
+    if success:
+        release_slot_capacity(booking.monument, booking.visit_date, booking.time_slot, booking.visitor_count or 1)
+    return success, refund
+
+def _cancel_reservation(reservation, reason, now):
+    # The slot is free for the day as soon as the status is a cancelled one
+    return _cancel(ParkingReservation, reservation, reservation.amount, reason, now)
+
+def cancel_booking(booking, reason=None, now=None):
+    """Cancel a visitor's booking, returns (True, refund or None) or (False, message)"""
+    now = now or datetime.utcnow()
+    if booking.visit_date <= now.date():
+        return False, "Bookings can be cancelled until the day before the visit"
+    try:
+        success, refund = _cancel_booking(booking, reason, now)
+        if not success:
+            db.session.rollback()
+            return False, "Booking is already cancelled"
+        db.session.commit()
+    except Exception as e:
+        db.session.rollback()
+        return False, f"Cancellation failed: {str(e)}"
+    wake_promoter()
+    send_soon()
+    return True, refund
+
+def cancel_reservation(reservation, reason=None, now=None):
+    """Cancel a parking reservation, returns (True, refund or None) or (False, message)"""
+    now = now or datetime.utcnow()
+    if reservation.reservation_date <= now.date():
+        return False, "Parking can be cancelled until the day before the reservation"
+    try:
+        success, refund = _cancel_reservation(reservation, reason, now)
+        if not success:
+            db.session.rollback()
+            return False, "Reservation is already cancelled"
+        db.session.commit()
+    except Exception as e:
+        db.session.rollback()
+        return False, f"Cancellation failed: {str(e)}"
+    send_soon()
+    return True, refund
+
+def _cancel_in_batches(model, date_column, cancel, monument, date, reason, now, batch_size):
+    """Cancel every active row of `model` for the day, one transaction per batch"""
+    cancelled = refunded = 0
+    last_id = 0
+    while True:
+        batch = (model.query
+                 .filter(model.monument == monument,
+                         getattr(model, date_column) == date,
+                         model.payment_status.notin_(CANCELLED_STATUSES),
+                         model.id > last_id)
+                 .options(joinedload(model.user))  # For the cancellation emails
+                 .order_by(model.id)
+                 .limit(batch_size)
+                 .all())
+        if not batch:
+            return cancelled, refunded
+        for record in batch:
+            success, refund = cancel(record, reason, now)
+            cancelled += success
+            refunded += refund.amount if refund else 0.0
+        last_id = batch[-1].id
+        db.session.commit()
+
+def close_day(monument, date, reason=None, batch_size=200, now=None):
+    """Close a monument for a day: no new bookings, and everything already booked is cancelled and refunded"""
+    now = now or datetime.utcnow()
+    if not is_closed(monument, date):
+        db.session.add(Closure(monument=monument, date=date, reason=reason))
+    # Zero capacity first so nothing is booked while the cancellations run.
+    # Create the day's slots if nobody has asked for them yet, they would open with full capacity later.
+    if TimeSlot.query.filter_by(monument=monument, date=date).first() is None:
+        create_time_slots(monument, date)
+    TimeSlot.query.filter_by(monument=monument, date=date).update(
+        {TimeSlot.capacity: 0}, synchronize_session=False)
+    open_entries = WaitlistEntry.query.filter(
+        WaitlistEntry.monument == monument,
+        WaitlistEntry.date == date,
+        WaitlistEntry.status.in_([WAITING, OFFERED])
+    )
+    for entry in open_entries.filter_by(status=OFFERED):
+        release_slot_capacity(monument, date, entry.time_slot, entry.visitor_count)
+    open_entries.update({WaitlistEntry.status: CANCELLED}, synchronize_session=False)
+    db.session.commit()
+
+    bookings, booking_refunds = _cancel_in_batches(
+        Booking, 'visit_date', _cancel_booking, monument, date, reason, now, batch_size)
+    reservations, parking_refunds = _cancel_in_batches(
+        ParkingReservation, 'reservation_date', _cancel_reservation, monument, date, reason, now, batch_size)
+    send_soon()
+    return {
+        'bookings_cancelled': bookings,
+        'reservations_cancelled': reservations,
+        'refunded': round(booking_refunds + parking_refunds, 2)
+    }
+
+def _cancellation_response(success, result):
+    if not success:
+        return jsonify({'success': False, 'error': result}), 409
+    return jsonify({'success': True, 'refund': refund_serializer(result) if result else None})
+
+def init_cancellations(app):
+    @app.route('/bookings/<int:booking_id>/cancel', methods=['POST'])
+    @rate_limit('booking')
+    @query_budget(8)
+    def cancel_booking_route(booking_id):
+        if 'user_id' not in session:
+            return jsonify({'success': False, 'error': 'Please login to continue'}), 401
+        booking = Booking.query.get(booking_id)
+        if booking is None or booking.user_id != session['user_id']:
+            return jsonify({'success': False, 'error': 'Booking not found'}), 404
+        return _cancellation_response(*cancel_booking(booking, (request.get_json(silent=True) or request.form).get('reason')))
+
+    @app.route('/parking/<int:reservation_id>/cancel', methods=['POST'])
+    @rate_limit('booking')
+    @query_budget(7)
+    def cancel_reservation_route(reservation_id):
+        if 'user_id' not in session:
+            return jsonify({'success': False, 'error': 'Please login to continue'}), 401
+        reservation = ParkingReservation.query.get(reservation_id)
+        if reservation is None or reservation.user_id != session['user_id']:
+            return jsonify({'success': False, 'error': 'Reservation not found'}), 404
+        return _cancellation_response(*cancel_reservation(reservation, (request.get_json(silent=True) or request.form).get('reason')))
+
+    @app.route('/admin/closures', methods=['POST'])
+    @admin_required
+    def close_monument_day():
+        data = request.get_json(silent=True) or request.form
+        monument = data.get('monument')
+        try:
+            date = datetime.strptime(data.get('date', ''), '%Y-%m-%d').date()
+        except ValueError:
+            return jsonify({'error': 'Dates must be YYYY-MM-DD'}), 400
+        if not monument:
+            return jsonify({'error': 'Missing monument'}), 400
+        return jsonify(close_day(monument, date, data.get('reason')))
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Close a monument for a day, cancelling and refunding its bookings')
+    parser.add_argument('command', choices=['close'])
+    parser.add_argument('--monument', required=True)
+    parser.add_argument('--date', required=True, type=lambda value: datetime.strptime(value, '%Y-%m-%d').date())
+    parser.add_argument('--reason')
+    parser.add_argument('--batch-size', type=int, default=200)
+    args = parser.parse_args(argv)
+
+    app = create_script_app()
+    with app.app_context():
+        db.create_all()
+        result = close_day(args.monument, args.date, args.reason, args.batch_size)
+    print(f"Cancelled {result['bookings_cancelled']} bookings and {result['reservations_cancelled']} "
+          f"parking reservations, refunding {result['refunded']}")
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
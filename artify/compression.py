@@ -0,0 +1,122 @@
+"""Response compression and conditional requests for pages and JSON.
+
+GET responses get a weak ETag computed from the body and a 304 when the
+client already has it. Text bodies above COMPRESS_MIN_SIZE are gzip or
+brotli encoded, whichever the client prefers, and streamed responses are
+compressed chunk by chunk. Images, audio and anything that already carries
+a Content-Encoding (the precompressed /assets bundles) pass through untouched.
+"""
+import gzip
+import zlib
+
+from flask import request, current_app
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+COMPRESSIBLE_TYPES = (
+    'text/',
+    'application/json',
+    'application/javascript',
+    'application/xml',
+    'image/svg+xml'
+)
+# Already compressed formats, checked first so images and audio cost one startswith
+INCOMPRESSIBLE_TYPES = ('image/', 'audio/', 'video/', 'font/', 'application/zip', 'application/gzip')
+
+def is_compressible(mimetype):
+    if not mimetype or (mimetype.startswith(INCOMPRESSIBLE_TYPES) and mimetype != 'image/svg+xml'):
+        return False
+    return mimetype.startswith(COMPRESSIBLE_TYPES)
+
+def choose_encoding():
+    """Best encoding the client accepts, brotli first when the module is installed"""
+    offers = ['br', 'gzip'] if brotli is not None else ['gzip']
+    return request.accept_encodings.best_match(offers)
+
+def gzip_stream(chunks, level):
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    for chunk in chunks:
+        if isinstance(chunk, str):
+            chunk = chunk.encode('utf-8')
+        data = compressor.compress(chunk)
+        # Flush each chunk so streamed exports reach the client as they are produced
+        data += compressor.flush(zlib.Z_SYNC_FLUSH)
+        if data:
+            yield data
+    yield compressor.flush()
+
+def brotli_stream(chunks, quality):
+    compressor = brotli.Compressor(quality=quality)
+    for chunk in chunks:
+        if isinstance(chunk, str):
+            chunk = chunk.encode('utf-8')
+        data = compressor.process(chunk) + compressor.flush()
+        if data:
+            yield data
+    yield compressor.finish()
+
+def add_conditional_headers(response):
+    """Give cacheable GET pages and JSON a weak ETag and answer 304 when it matches"""
+    if 'ETag' not in response.headers:
+        response.add_etag(weak=True)
+    if 'Cache-Control' not in response.headers:
+        # Let browsers keep the copy but revalidate it on every use
+        response.headers['Cache-Control'] = 'no-cache'
+    return response.make_conditional(request)
+
+def init_compression(app):
+    """Negotiate gzip/brotli for text responses and add ETags to GET responses.
+
+    Call this before other after_request hooks are registered: Flask runs
+    them in reverse order, so compression then sees the final body.
+    """
+    app.config.setdefault('COMPRESS_ENABLED', True)
+    app.config.setdefault('COMPRESS_MIN_SIZE', 500)
+    app.config.setdefault('COMPRESS_LEVEL', 6)
+    app.config.setdefault('COMPRESS_BR_QUALITY', 4)
+
+    @app.after_request
+    def compress_response(response):
+        config = current_app.config
+        if not config['COMPRESS_ENABLED'] or response.direct_passthrough:
+            # send_file responses handle their own ETags and Range requests
+            return response
+        if 'Content-Encoding' in response.headers or not is_compressible(response.mimetype):
+            return response
+
+        if request.method in ('GET', 'HEAD') and response.status_code == 200 and not response.is_streamed:
+            response = add_conditional_headers(response)
+            if response.status_code == 304:
+                return response
+
+        if response.status_code not in (200, 201) or request.method == 'HEAD':
+            return response
+
+        encoding = choose_encoding()
+        if not encoding:
+            return response
+        response.vary.add('Accept-Encoding')
+
+        if response.is_streamed:
+            chunks = response.response
+            if encoding == 'br':
+                response.response = brotli_stream(chunks, config['COMPRESS_BR_QUALITY'])
+            else:
+                response.response = gzip_stream(chunks, config['COMPRESS_LEVEL'])
+            response.headers.pop('Content-Length', None)
+            response.headers['Content-Encoding'] = encoding
+            return response
+
+        data = response.get_data()
+        if len(data) < config['COMPRESS_MIN_SIZE']:
+            return response
+        if encoding == 'br':
+            compressed = brotli.compress(data, quality=config['COMPRESS_BR_QUALITY'])
+        else:
+            compressed = gzip.compress(data, compresslevel=config['COMPRESS_LEVEL'], mtime=0)
+        response.set_data(compressed)
+        response.headers['Content-Encoding'] = encoding
+        return response
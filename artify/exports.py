@@ -0,0 +1,209 @@
+"""Streaming exports of bookings and parking reservations.
+
+Rows are selected as plain column tuples with yield_per, from the live table
+and its archive so days past the retention window are still exported. Only
+one batch of EXPORT_BATCH_SIZE rows exists in memory at a time, and each
+batch is written out as soon as it is encoded: a CSV chunk, or a Parquet row
+group when pyarrow is installed. Admins download them from
+
+    /admin/export/bookings.csv?start=2024-01-01&end=2024-01-31&monument=Taj Mahal
+
+and cron jobs can write the same files with
+
+    python exports.py bookings --format parquet --start 2024-01-01 -o bookings.parquet
+"""
+import io
+import csv
+import sys
+import argparse
+from datetime import datetime, date
+
+from flask import Response, request, jsonify, stream_with_context
+from sqlalchemy import select
+
+from auth import db, create_script_app, Booking
+from parking import ParkingReservation
+from archive import with_archive
+from reporting import admin_required
+
+try:
+    import pyarrow
+    import pyarrow.parquet
+except ImportError:
+    pyarrow = None
+
+EXPORT_BATCH_SIZE = 2000
+
+# Identity documents and QR payloads stay out of exports
+EXPORTS = {
+    'bookings': (Booking, 'visit_date', [
+        'id', 'user_id', 'monument', 'visit_date', 'time_slot', 'visitor_count', 'student_count',
+        'nationality', 'is_student', 'student_discount_applied', 'need_guide', 'need_parking',
+        'camera_required', 'payment_status', 'payment_method', 'base_amount', 'final_amount',
+        'created_at', 'updated_at', 'cancelled_at', 'group_id'
+    ]),
+    'parking': (ParkingReservation, 'reservation_date', [
+        'id', 'user_id', 'slot_id', 'monument', 'reservation_date', 'vehicle_type', 'vehicle_number',
+        'driver_name', 'duration', 'payment_status', 'payment_method', 'amount',
+        'created_at', 'updated_at', 'cancelled_at', 'group_id'
+    ])
+}
+FORMATS = {
+    'csv': 'text/csv',
+    'parquet': 'application/vnd.apache.parquet'
+}
+
+def export_query(kind, start=None, end=None, monument=None):
+    """(column names, streaming rows) for an export, live and archived, oldest rows first"""
+    model, date_column, names = EXPORTS[kind]
+    rows = with_archive(model.__table__).c
+    query = select(*[rows[name] for name in names])
+    if start:
+        query = query.where(rows[date_column] >= start)
+    if end:
+        query = query.where(rows[date_column] <= end)
+    if monument:
+        query = query.where(rows.monument == monument)
+    # yield_per streams the results (a server-side cursor where the driver has one)
+    return names, db.session.execute(query.order_by(rows.id).execution_options(yield_per=EXPORT_BATCH_SIZE))
+
+def _batches(rows, size=EXPORT_BATCH_SIZE):
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) == size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+def _csv_value(value):
+    if isinstance(value, datetime):
+        return value.isoformat(' ', 'seconds')
+    if isinstance(value, date):
+        return value.isoformat()
+    return value
+
+def stream_csv(names, rows):
+    """Yield the CSV encoding of `rows`, one chunk per batch"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(names)
+    for batch in _batches(rows):
+        writer.writerows([_csv_value(value) for value in row] for row in batch)
+        yield buffer.getvalue().encode('utf-8')
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue().encode('utf-8')
+
+class _ChunkSink(io.RawIOBase):
+    """Write-only file that hands its bytes out as they are written"""
+
+    def __init__(self):
+        self.chunks = []
+        self.position = 0
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self.chunks.append(bytes(data))
+        self.position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self.position
+
+    def drain(self):
+        data = b''.join(self.chunks)
+        self.chunks = []
+        return data
+
+def _arrow_type(column):
+    python_type = column.type.python_type
+    if python_type is bool:
+        return pyarrow.bool_()
+    if python_type is int:
+        return pyarrow.int64()
+    if python_type is float:
+        return pyarrow.float64()
+    if python_type is datetime:
+        return pyarrow.timestamp('s')
+    if python_type is date:
+        return pyarrow.date32()
+    return pyarrow.string()
+
+def stream_parquet(kind, names, rows):
+    """Yield a Parquet file holding `rows`, one row group per batch"""
+    if pyarrow is None:
+        raise RuntimeError("Parquet export needs pyarrow: pip install pyarrow")
+    model = EXPORTS[kind][0]
+    schema = pyarrow.schema([(name, _arrow_type(model.__table__.columns[name])) for name in names])
+    sink = _ChunkSink()
+    with pyarrow.parquet.ParquetWriter(sink, schema, compression='zstd') as writer:
+        for batch in _batches(rows):
+            columns = list(zip(*batch))
+            writer.write_table(pyarrow.Table.from_arrays(
+                [pyarrow.array(values, type=field.type) for values, field in zip(columns, schema)],
+                schema=schema))
+            data = sink.drain()
+            if data:
+                yield data
+    # The footer is written when the writer closes
+    yield sink.drain()
+
+def export_stream(kind, fmt, start=None, end=None, monument=None):
+    names, rows = export_query(kind, start, end, monument)
+    if fmt == 'parquet':
+        return stream_parquet(kind, names, rows)
+    return stream_csv(names, rows)
+
+def parse_date(value):
+    return datetime.strptime(value, '%Y-%m-%d').date() if value else None
+
+def init_exports(app):
+    @app.route('/admin/export/<kind>.<fmt>')
+    @admin_required
+    def admin_export(kind, fmt):
+        if kind not in EXPORTS or fmt not in FORMATS:
+            return jsonify({'error': 'Unknown export'}), 404
+        if fmt == 'parquet' and pyarrow is None:
+            return jsonify({'error': 'Parquet export is not available'}), 503
+        try:
+            start = parse_date(request.args.get('start'))
+            end = parse_date(request.args.get('end'))
+        except ValueError:
+            return jsonify({'error': 'Dates must be YYYY-MM-DD'}), 400
+
+        chunks = export_stream(kind, fmt, start, end, request.args.get('monument'))
+        file_name = '_'.join(str(part) for part in (kind, start, end) if part)
+        return Response(stream_with_context(chunks), mimetype=FORMATS[fmt], headers={
+            'Content-Disposition': f'attachment; filename={file_name}.{fmt}',
+            'Cache-Control': 'no-store'
+        })
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Export bookings or parking reservations')
+    parser.add_argument('kind', choices=sorted(EXPORTS))
+    parser.add_argument('--format', choices=sorted(FORMATS), default='csv')
+    parser.add_argument('--start', type=parse_date, help='first visit/reservation date, YYYY-MM-DD')
+    parser.add_argument('--end', type=parse_date, help='last visit/reservation date, YYYY-MM-DD')
+    parser.add_argument('--monument')
+    parser.add_argument('-o', '--output', help='file to write, defaults to stdout')
+    args = parser.parse_args(argv)
+
+    app = create_script_app()
+
+    output = open(args.output, 'wb') if args.output else sys.stdout.buffer
+    try:
+        with app.app_context():
+            for chunk in export_stream(args.kind, args.format, args.start, args.end, args.monument):
+                output.write(chunk)
+    finally:
+        if args.output:
+            output.close()
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
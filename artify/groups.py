@@ -0,0 +1,354 @@
+"""Group booking API for tour operators.
+
+One POST books many time slots and parking spaces at once:
+
+    POST /api/group-bookings
+    {
+        "payment_method": "upi",
+        "id_number": "AGENCY-1234",
+        "bookings": [
+            {"ref": "bus-1", "monument": "Taj Mahal", "date": "2024-03-08",
+             "time_slot": "09:00-11:00", "visitor_count": 45, "students": 10, "need_guide": true}
+        ],
+        "parking": [
+            {"ref": "bus-1", "monument": "Taj Mahal", "date": "2024-03-08", "vehicle_type": "bus",
+             "vehicle_number": "UP80AB1234", "driver_name": "R. Singh", "phone": "9876543210", "duration": 4}
+        ]
+    }
+
+Bookings may list their visitors ("visitors": [{"name", "age", "is_student"}])
+instead of giving counts. Every item is validated first and checked against
+one capacity query covering all the slots involved. The items that fit are
+priced from the cached prices and written in a single transaction, with one
+conditional UPDATE per distinct time slot and batched inserts for the rest.
+Items that do not fit are rejected on their own, the rest of the batch still
+goes through. The response lists every item's result and links one QR
+manifest covering the whole order, so a guide can show a single code at the
+gate.
+"""
+import json
+import uuid
+from datetime import datetime
+
+from flask import request, session, jsonify
+from sqlalchemy import and_, or_
+
+from auth import (
+    db, User, Booking, GroupOrder, TimeSlot, TIME_SLOTS,
+    create_time_slots, reserve_slot_capacity
+)
+from parking import ParkingSlot, ParkingReservation, get_available_slots as get_parking_slots, claim_parking_space
+from monuments import MONUMENTS_DATA
+from pricing import ticket_prices, parking_rates, ticket_total
+from cancellations import Closure
+from tickets import ticket_url
+from jobs import enqueue
+from notifications import group_confirmed, send_soon
+from ratelimit import rate_limit
+from querytrace import query_budget
+
+GROUP_MAX_ITEMS = 100  # Bookings plus parking per request, keeps the manifest QR readable
+GROUP_MAX_VISITORS = 50  # Per booking, one time slot's default capacity
+VEHICLE_TYPES = ('2wheeler', '4wheeler', 'bus')
+PAYMENT_METHODS = ('card', 'upi', 'netbanking')
+
+class ItemError(ValueError):
+    """An item of the batch that cannot be booked, reported back with its index"""
+
+def _date(value):
+    try:
+        date = datetime.strptime(value or '', '%Y-%m-%d').date()
+    except ValueError:
+        raise ItemError('Dates must be YYYY-MM-DD')
+    if date < datetime.now().date():
+        raise ItemError('Please select a future date')
+    return date
+
+def _monument(value):
+    if value not in MONUMENTS_DATA:
+        raise ItemError('Unknown monument')
+    return value
+
+def _count(value, name, low, high):
+    try:
+        value = int(value)
+    except (TypeError, ValueError):
+        raise ItemError(f'{name} must be a number')
+    if not low <= value <= high:
+        raise ItemError(f'{name} must be between {low} and {high}')
+    return value
+
+def parse_booking(item, defaults):
+    """Validated booking fields from one request item"""
+    visitors = item.get('visitors')
+    if visitors is not None:
+        if not isinstance(visitors, list) or not all(isinstance(visitor, dict) for visitor in visitors):
+            raise ItemError('visitors must be a list of objects')
+        visitor_count = _count(len(visitors), 'Number of visitors', 1, GROUP_MAX_VISITORS)
+        students = sum(1 for visitor in visitors if visitor.get('is_student'))
+    else:
+        visitor_count = _count(item.get('visitor_count'), 'Number of visitors', 1, GROUP_MAX_VISITORS)
+        students = _count(item.get('students', 0), 'Number of students', 0, visitor_count)
+    if item.get('time_slot') not in TIME_SLOTS:
+        raise ItemError(f'time_slot must be one of {", ".join(TIME_SLOTS)}')
+    id_number = item.get('id_number') or defaults.get('id_number')
+    if not id_number:
+        raise ItemError('Missing id_number')
+    return {
+        'monument': _monument(item.get('monument')),
+        'date': _date(item.get('date')),
+        'time_slot': item['time_slot'],
+        'visitors': visitors,
+        'visitor_count': visitor_count,
+        'students': students,
+        'need_guide': bool(item.get('need_guide')),
+        'need_parking': bool(item.get('need_parking')),
+        'id_number': str(id_number)
+    }
+
+def parse_parking(item):
+    """Validated parking fields from one request item"""
+    if item.get('vehicle_type') not in VEHICLE_TYPES:
+        raise ItemError(f'vehicle_type must be one of {", ".join(VEHICLE_TYPES)}')
+    missing = [name for name in ('vehicle_number', 'driver_name', 'phone') if not item.get(name)]
+    if missing:
+        raise ItemError(f'Missing required fields: {", ".join(missing)}')
+    return {
+        'monument': _monument(item.get('monument')),
+        'date': _date(item.get('date')),
+        'vehicle_type': item['vehicle_type'],
+        'vehicle_number': str(item['vehicle_number']),
+        'driver_name': str(item['driver_name']),
+        'phone': str(item['phone']),
+        'duration': _count(item.get('duration', 2), 'Duration', 1, 24)
+    }
+
+def _parse_all(items, parse, results):
+    parsed = []
+    for index, item in enumerate(items):
+        result = {'index': index, 'ref': item.get('ref') if isinstance(item, dict) else None}
+        results.append(result)
+        try:
+            if not isinstance(item, dict):
+                raise ItemError('Items must be objects')
+            parsed.append((result, parse(item)))
+        except ItemError as e:
+            result.update(status='rejected', error=str(e))
+    return parsed
+
+def _reject(result, error):
+    result.update(status='rejected', error=error)
+
+def _days_matching(model, date_column, days):
+    """Filter matching any of the (monument, date) pairs in `days`"""
+    return or_(*[and_(model.monument == monument, getattr(model, date_column) == date)
+                 for monument, date in days])
+
+def free_places(days):
+    """(monument, date, time slot) -> places left, creating the slots of days nobody asked for yet.
+
+    Days whose slots could not be created are left out, so their items find no places.
+    """
+    def query():
+        return (db.session.query(TimeSlot.monument, TimeSlot.date, TimeSlot.time_slot,
+                                 TimeSlot.capacity, TimeSlot.booked)
+                .filter(_days_matching(TimeSlot, 'date', days))
+                .all())
+
+    rows = query()
+    missing = set(days) - {(row[0], row[1]) for row in rows}
+    if missing:
+        created = [day for day in missing if create_time_slots(*day)[0]]
+        if created:
+            rows = query()
+    return {(monument, date, time_slot): capacity - (booked or 0)
+            for monument, date, time_slot, capacity, booked in rows}
+
+def price_booking(fields, prices):
+    """(price per visitor, total) for a booking"""
+    price = prices.get(fields['time_slot'], prices['default'])
+    return price, ticket_total(price, fields['visitor_count'], fields['students'], fields['need_guide'])
+
+def place_group_order(user, data):
+    """Book everything in `data` that fits, returns (order or None, booking results, parking results)"""
+    booking_results, parking_results = [], []
+    bookings = _parse_all(data.get('bookings') or [], lambda item: parse_booking(item, data), booking_results)
+    parking = _parse_all(data.get('parking') or [], parse_parking, parking_results)
+
+    days = {(fields['monument'], fields['date']) for _, fields in bookings + parking}
+    if days:
+        closed = {tuple(row) for row in db.session.query(Closure.monument, Closure.date)
+                  .filter(_days_matching(Closure, 'date', days))}
+        for result, fields in bookings + parking:
+            if (fields['monument'], fields['date']) in closed:
+                _reject(result, f'{fields["monument"]} is closed on this date')
+        bookings = [(result, fields) for result, fields in bookings if 'status' not in result]
+        parking = [(result, fields) for result, fields in parking if 'status' not in result]
+
+    # Allocate places from one capacity snapshot, in request order
+    demand = {}
+    if bookings:
+        remaining = free_places({(fields['monument'], fields['date']) for _, fields in bookings})
+        for result, fields in bookings:
+            key = (fields['monument'], fields['date'], fields['time_slot'])
+            if key not in remaining:
+                _reject(result, 'This date cannot be booked right now, please try again')
+                continue
+            if remaining[key] < fields['visitor_count']:
+                _reject(result, 'Not enough places left in this time slot')
+                continue
+            remaining[key] -= fields['visitor_count']
+            demand.setdefault(key, []).append((result, fields))
+
+    # Parking spaces are handed out in slot number order per (monument, date, vehicle type),
+    # the rest of each list are the spares tried when a space was taken since the snapshot
+    assigned = []
+    free_spaces = {}
+    for result, fields in parking:
+        key = (fields['monument'], fields['date'], fields['vehicle_type'])
+        if key not in free_spaces:
+            free_spaces[key] = [row[0] for row in sorted(
+                get_parking_slots(*key, columns=[ParkingSlot.id, ParkingSlot.slot_number]),
+                key=lambda row: row[1])]
+        if not free_spaces[key]:
+            _reject(result, 'No parking spaces left for this vehicle type')
+            continue
+        assigned.append((result, fields, free_spaces[key].pop(0)))
+
+    if not demand and not assigned:
+        return None, booking_results, parking_results
+
+    try:
+        # Claim the places, a slot filled by someone else since the snapshot rejects its items
+        for key, items in list(demand.items()):
+            if not reserve_slot_capacity(*key, sum(fields['visitor_count'] for _, fields in items)):
+                for result, _ in items:
+                    _reject(result, 'Not enough places left in this time slot')
+                del demand[key]
+        if not demand and not assigned:
+            db.session.rollback()
+            return None, booking_results, parking_results
+
+        order = GroupOrder(user_id=user.id, reference=uuid.uuid4().hex, payment_method=data['payment_method'])
+        db.session.add(order)
+        db.session.flush()
+        created = []
+        # Parking first, each space is claimed on its own before the bookings are added to the session
+        for result, fields, slot_id in assigned:
+            hourly_rate = parking_rates(fields['monument'], fields['date']).get(fields['vehicle_type'])
+            reservation = ParkingReservation(
+                user_id=user.id, slot_id=slot_id, monument=fields['monument'], reservation_date=fields['date'],
+                vehicle_type=fields['vehicle_type'], vehicle_number=fields['vehicle_number'],
+                driver_name=fields['driver_name'], phone=fields['phone'], duration=fields['duration'],
+                amount=hourly_rate * fields['duration'], payment_status='completed',
+                payment_method=data['payment_method'], group_id=order.id
+            )
+            spares = free_spaces[(fields['monument'], fields['date'], fields['vehicle_type'])]
+            if claim_parking_space(reservation, spares):
+                created.append((result, reservation))
+            else:
+                _reject(result, 'No parking spaces left for this vehicle type')
+        if not demand and not created:
+            db.session.rollback()
+            return None, booking_results, parking_results
+        for items in demand.values():
+            for result, fields in items:
+                prices = ticket_prices(fields['monument'], fields['date'])
+                price, total = price_booking(fields, prices)
+                booking = Booking(
+                    user=user, monument=fields['monument'], visit_date=fields['date'],
+                    time_slot=fields['time_slot'], need_guide=fields['need_guide'],
+                    need_parking=fields['need_parking'], base_amount=price, final_amount=total,
+                    payment_status='completed', payment_method=data['payment_method'],
+                    id_number=fields['id_number'], nationality='Indian', group_id=order.id,
+                    student_discount_applied=fields['students'] > 0
+                )
+                visitors = fields['visitors']
+                if visitors is None:
+                    # Headcount only, the ticket is for the group rather than named visitors
+                    booking.is_student = fields['students'] > 0
+                    booking.set_visitors([{'is_student': i < fields['students']}
+                                          for i in range(1, fields['visitor_count'])], primary_name=user.name)
+                else:
+                    booking.is_student = bool(visitors[0].get('is_student'))
+                    booking.set_visitors(visitors[1:], primary_name=visitors[0].get('name') or user.name,
+                                         primary_age=visitors[0].get('age'))
+                created.append((result, booking))
+
+        db.session.add_all([record for _, record in created])
+        # One flush assigns every id for the QR payloads
+        db.session.flush()
+
+        manifest = {'type': 'group', 'group_id': order.id, 'reference': order.reference,
+                    'bookings': [], 'parking': []}
+        for result, record in created:
+            if isinstance(record, Booking):
+                record.qr_code = json.dumps({
+                    'booking_id': record.id, 'group_id': order.id, 'monument': record.monument,
+                    'date': record.visit_date.isoformat(), 'time_slot': record.time_slot,
+                    'name': user.name, 'email': user.email, 'visitor_count': record.visitor_count,
+                    'need_guide': record.need_guide, 'id_number': record.id_number
+                })
+                manifest['bookings'].append(record.id)
+                result.update(status='booked', booking_id=record.id, amount=record.final_amount)
+            else:
+                record.qr_code = json.dumps({
+                    'type': 'parking', 'id': record.id, 'group_id': order.id, 'monument': record.monument,
+                    'date': record.reservation_date.isoformat(), 'slot': record.slot_id,
+                    'vehicle': record.vehicle_number
+                })
+                manifest['parking'].append(record.id)
+                result.update(status='booked', reservation_id=record.id, slot_id=record.slot_id,
+                              amount=record.amount)
+        order.total_amount = round(sum(record.final_amount if isinstance(record, Booking) else record.amount
+                                       for _, record in created), 2)
+        order.qr_code = json.dumps(manifest)
+        # One email for the whole order, the operator hands the tickets out
+        group_confirmed(order, user, len(manifest['bookings']), len(manifest['parking']))
+        db.session.commit()
+    except Exception as e:
+        db.session.rollback()
+        for result, _ in [item for items in demand.values() for item in items]:
+            _reject(result, f'Booking failed: {str(e)}')
+        for result, _, _ in assigned:
+            _reject(result, f'Booking failed: {str(e)}')
+        return None, booking_results, parking_results
+
+    # Behind single visitors' tickets in the queue, an operator fetches these in bulk later
+    send_soon()
+    enqueue('tickets.render', {'kind': 'group', 'ticket_id': order.id})
+    for result, record in created:
+        kind = 'booking' if isinstance(record, Booking) else 'parking'
+        result['ticket'] = ticket_url(kind, record)
+        enqueue('tickets.render', {'kind': kind, 'ticket_id': record.id})
+    return order, booking_results, parking_results
+
+def init_groups(app):
+    @app.route('/api/group-bookings', methods=['POST'])
+    @rate_limit('booking')
+    @query_budget(8 * GROUP_MAX_ITEMS)  # Per item at most its prices on a cache miss, its slot day or parking savepoint and its share of the inserts
+    def group_booking():
+        if 'user_id' not in session:
+            return jsonify({'success': False, 'error': 'Please login to continue'}), 401
+        data = request.get_json(silent=True)
+        if not isinstance(data, dict):
+            return jsonify({'success': False, 'error': 'Invalid booking data'}), 400
+        items = len(data.get('bookings') or []) + len(data.get('parking') or [])
+        if not items or items > GROUP_MAX_ITEMS:
+            return jsonify({'success': False, 'error': f'Send between 1 and {GROUP_MAX_ITEMS} items'}), 400
+        if data.get('payment_method') not in PAYMENT_METHODS:
+            return jsonify({'success': False, 'error': 'Invalid payment method'}), 400
+        user = User.query.get(session['user_id'])
+        if not user:
+            return jsonify({'success': False, 'error': 'User not found'}), 401
+
+        order, booking_results, parking_results = place_group_order(user, data)
+        return jsonify({
+            'success': order is not None,
+            'group_id': order.id if order else None,
+            'reference': order.reference if order else None,
+            'total_amount': order.total_amount if order else 0.0,
+            'manifest': ticket_url('group', order) if order else None,
+            'bookings': booking_results,
+            'parking': parking_results
+        })
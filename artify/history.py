@@ -0,0 +1,146 @@
+"""The logged in user's bookings and parking reservations, newest first.
+
+    GET /api/me/bookings?limit=20
+    GET /api/me/bookings?limit=20&cursor=<next_cursor of the previous page>
+    GET /api/me/parking
+
+Pages are keyset paginated on (created_at, id): the cursor carries the last
+row's position and the next page starts strictly after it, so a page costs
+the same index range scan on (user_id, created_at, id) whether it is the
+first or the five hundredth. Rows added meanwhile never shift a page.
+
+Each page selects just the columns it returns, from the live table and from
+the archive (archived rows keep their id and created_at, so the two merge
+into one order). A booking page loads its visitors in one more query per
+table, a parking page joins its slot numbers.
+"""
+import base64
+from datetime import datetime
+
+from flask import request, session, jsonify, url_for
+from sqlalchemy import select, tuple_
+
+from auth import db, Booking, BookingVisitor
+from parking import ParkingReservation, ParkingSlot
+from archive import bookings_archive, booking_visitors_archive, parking_reservations_archive
+from querytrace import query_budget
+from ratelimit import rate_limit
+from serializers import Serializer
+
+PAGE_SIZE = 20
+MAX_PAGE_SIZE = 100
+
+class PageError(ValueError):
+    pass
+
+def encode_cursor(row):
+    return base64.urlsafe_b64encode(f'{row.created_at.isoformat()}|{row.id}'.encode()).decode().rstrip('=')
+
+def decode_cursor(cursor):
+    """(created_at, id) from a cursor handed out with a previous page"""
+    try:
+        created_at, _, row_id = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)).decode().partition('|')
+        return datetime.fromisoformat(created_at), int(row_id)
+    except ValueError:
+        raise PageError('Invalid cursor')
+
+def _ticket(kind):
+    return lambda row: url_for('ticket_image', kind=kind, ticket_id=row.id, fmt='png')
+
+booking_history_serializer = Serializer(Booking, [
+    'id', 'monument', 'visit_date', 'time_slot', 'visitor_count', 'student_count', 'need_guide',
+    'need_parking', 'final_amount', 'payment_status', 'payment_method', 'created_at', 'cancelled_at', 'group_id'
+], computed={'ticket': _ticket('booking')})
+
+parking_history_serializer = Serializer(ParkingReservation, [
+    'id', 'monument', 'reservation_date', 'vehicle_type', 'vehicle_number', 'duration', 'amount',
+    'payment_status', 'payment_method', 'created_at', 'cancelled_at', 'group_id'
+], computed={'slot_number': lambda row: row.slot_number, 'ticket': _ticket('parking')})
+
+def _newest_first(table, serializer, user_id, after, limit, join=None, extra=()):
+    """Up to `limit` of the user's rows in `table` after the `after` cursor, projected to `serializer`"""
+    query = select(*[table.c[column.key] for column in serializer.columns], *extra)
+    if join is not None:
+        query = query.select_from(join(table))
+    query = query.where(table.c.user_id == user_id)
+    if after is not None:
+        query = query.where(tuple_(table.c.created_at, table.c.id) < tuple_(*after))
+    return db.session.execute(
+        query.order_by(table.c.created_at.desc(), table.c.id.desc()).limit(limit)).all()
+
+def history_page(tables, serializer, user_id, after=None, limit=PAGE_SIZE, **options):
+    """One page across the live table and its archive: (rows, ids of the archived ones, next cursor)"""
+    live, archive = tables
+    # One row past the page tells whether there is a next one
+    live_rows = _newest_first(live, serializer, user_id, after, limit + 1, **options)
+    archived_rows = _newest_first(archive, serializer, user_id, after, limit + 1, **options)
+    rows = sorted(live_rows + archived_rows, key=lambda row: (row.created_at, row.id), reverse=True)
+    next_cursor = encode_cursor(rows[limit - 1]) if len(rows) > limit else None
+    page = rows[:limit]
+    archived_ids = {row.id for row in archived_rows} & {row.id for row in page}
+    return page, archived_ids, next_cursor
+
+def _visitors(page, archived_ids):
+    """Visitors of the page's bookings by booking id, one query per table that holds any"""
+    visitors = {}
+    live_ids = [row.id for row in page if row.id not in archived_ids]
+    for table, ids in ((BookingVisitor.__table__, live_ids), (booking_visitors_archive, list(archived_ids))):
+        if not ids:
+            continue
+        rows = db.session.execute(
+            select(table.c.booking_id, table.c.name, table.c.age, table.c.is_student)
+            .where(table.c.booking_id.in_(ids))
+            .order_by(table.c.booking_id, table.c.position))
+        for row in rows:
+            visitors.setdefault(row.booking_id, []).append(
+                {'name': row.name, 'age': row.age, 'is_student': row.is_student})
+    return visitors
+
+def booking_history(user_id, after=None, limit=PAGE_SIZE):
+    page, archived_ids, next_cursor = history_page(
+        (Booking.__table__, bookings_archive), booking_history_serializer, user_id, after, limit)
+    visitors = _visitors(page, archived_ids)
+    bookings = booking_history_serializer.many(page)
+    for booking in bookings:
+        booking['visitors'] = visitors.get(booking['id'], [])
+    return bookings, next_cursor
+
+def parking_history(user_id, after=None, limit=PAGE_SIZE):
+    slots = ParkingSlot.__table__
+    page, _, next_cursor = history_page(
+        (ParkingReservation.__table__, parking_reservations_archive), parking_history_serializer, user_id,
+        after, limit, join=lambda table: table.outerjoin(slots, slots.c.id == table.c.slot_id),
+        extra=(slots.c.slot_number,))
+    return parking_history_serializer.many(page), next_cursor
+
+def _page_args():
+    """(after, limit) from the query string"""
+    try:
+        limit = int(request.args.get('limit', PAGE_SIZE))
+    except ValueError:
+        raise PageError('limit must be a number')
+    cursor = request.args.get('cursor')
+    return (decode_cursor(cursor) if cursor else None), max(1, min(limit, MAX_PAGE_SIZE))
+
+def init_history(app):
+    def history_route(kind, history):
+        if 'user_id' not in session:
+            return jsonify({'error': 'Please login to continue'}), 401
+        try:
+            after, limit = _page_args()
+        except PageError as e:
+            return jsonify({'error': str(e)}), 400
+        items, next_cursor = history(session['user_id'], after, limit)
+        return jsonify({kind: items, 'next_cursor': next_cursor})
+
+    @app.route('/api/me/bookings')
+    @rate_limit('history')
+    @query_budget(4)
+    def my_bookings():
+        return history_route('bookings', booking_history)
+
+    @app.route('/api/me/parking')
+    @rate_limit('history')
+    @query_budget(2)
+    def my_parking():
+        return history_route('parking', parking_history)
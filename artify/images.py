@@ -0,0 +1,222 @@
+"""Responsive images for the monument catalog.
+
+Builds resized AVIF/WebP/JPEG variants of static/images/*.jpeg for each
+breakpoint into static/build/images, with content hashes in the file names so
+they can be cached forever, plus a manifest mapping catalog keys to variants:
+
+    python images.py build
+
+Templates use monument_picture(), monument_image_url() and
+monument_image_set(). Without a build they fall back to the original file,
+and to the catalog's remote image_url for monuments with no local photo.
+"""
+import os
+import io
+import sys
+import json
+import hashlib
+import argparse
+
+from flask import url_for, request
+from markupsafe import Markup, escape
+
+from monuments import MONUMENTS_DATA, MONUMENT_ALIASES
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+SOURCE_DIR = os.path.join(BASE_DIR, 'static', 'images')
+BUILD_DIR = os.path.join(BASE_DIR, 'static', 'build', 'images')
+MANIFEST_PATH = os.path.join(BUILD_DIR, 'manifest.json')
+
+BREAKPOINTS = (480, 960, 1600)
+# Listed best first, <picture> offers them to the browser in this order
+FORMATS = {
+    'avif': {'pil_format': 'AVIF', 'mimetype': 'image/avif', 'options': {'quality': 50}},
+    'webp': {'pil_format': 'WEBP', 'mimetype': 'image/webp', 'options': {'quality': 78, 'method': 6}},
+    'jpeg': {'pil_format': 'JPEG', 'mimetype': 'image/jpeg',
+             'options': {'quality': 82, 'optimize': True, 'progressive': True}}
+}
+
+def normalize_name(name):
+    """'Purana Qila (Old Fort).jpeg' and 'purana qila' both become 'purana qila'"""
+    name = os.path.splitext(name)[0] if name.lower().endswith(('.jpeg', '.jpg', '.png')) else name
+    return ' '.join(name.split('(')[0].lower().split())
+
+def slugify(name):
+    return '-'.join(normalize_name(name).replace("'", '').split())
+
+def find_sources():
+    """Map catalog keys to their source photo in static/images, matched on names and aliases"""
+    files = {}
+    for file_name in os.listdir(SOURCE_DIR) if os.path.isdir(SOURCE_DIR) else []:
+        if file_name.lower().endswith(('.jpeg', '.jpg', '.png')):
+            files[normalize_name(file_name)] = file_name
+
+    sources = {}
+    for key, data in MONUMENTS_DATA.items():
+        for name in [key, data.get('name', key)] + MONUMENT_ALIASES.get(key, []):
+            file_name = files.get(normalize_name(name))
+            if file_name:
+                sources[key] = file_name
+                break
+    return sources
+
+def _encode(image, format_name):
+    spec = FORMATS[format_name]
+    buffer = io.BytesIO()
+    image.save(buffer, format=spec['pil_format'], **spec['options'])
+    return buffer.getvalue()
+
+def build(formats=None, breakpoints=BREAKPOINTS):
+    """Generate every missing variant and rewrite the manifest, returns the manifest"""
+    try:
+        from PIL import Image, ImageOps, features
+    except ImportError:
+        print("Pillow is required to build images: pip install Pillow")
+        return None
+
+    formats = [f for f in (formats or FORMATS) if f in FORMATS]
+    if 'avif' in formats and not features.check('avif') and 'AVIF' not in Image.SAVE:
+        print("This Pillow build cannot write AVIF, skipping it")
+        formats.remove('avif')
+
+    os.makedirs(BUILD_DIR, exist_ok=True)
+    manifest = {}
+    for key, file_name in sorted(find_sources().items()):
+        with Image.open(os.path.join(SOURCE_DIR, file_name)) as original:
+            image = ImageOps.exif_transpose(original).convert('RGB')
+
+        widths = sorted({min(width, image.width) for width in breakpoints})
+        entry = {
+            'source': file_name,
+            'width': image.width,
+            'height': image.height,
+            'variants': {}
+        }
+        for width in widths:
+            height = round(image.height * width / image.width)
+            resized = image if width == image.width else image.resize((width, height), Image.LANCZOS)
+            for format_name in formats:
+                data = _encode(resized, format_name)
+                digest = hashlib.sha256(data).hexdigest()[:10]
+                output_name = f'{slugify(key)}-{width}.{digest}.{format_name.replace("jpeg", "jpg")}'
+                output_path = os.path.join(BUILD_DIR, output_name)
+                if not os.path.exists(output_path):
+                    with open(output_path, 'wb') as f:
+                        f.write(data)
+                entry['variants'].setdefault(format_name, []).append([width, f'build/images/{output_name}'])
+        manifest[key] = entry
+        print(f"{key}: {len(widths)} sizes x {len(formats)} formats")
+
+    tmp_path = MANIFEST_PATH + '.tmp'
+    with open(tmp_path, 'w') as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(tmp_path, MANIFEST_PATH)
+    remove_stale(manifest)
+    return manifest
+
+def remove_stale(manifest):
+    """Delete variants from older builds that the manifest no longer references"""
+    referenced = {os.path.basename(path)
+                  for entry in manifest.values()
+                  for variants in entry['variants'].values()
+                  for _, path in variants}
+    for file_name in os.listdir(BUILD_DIR):
+        if file_name != os.path.basename(MANIFEST_PATH) and file_name not in referenced:
+            os.remove(os.path.join(BUILD_DIR, file_name))
+
+_manifest = {}
+_sources = {}
+
+def load_manifest():
+    global _manifest, _sources
+    _sources = find_sources()
+    try:
+        with open(MANIFEST_PATH) as f:
+            _manifest = json.load(f)
+    except (OSError, ValueError):
+        _manifest = {}
+    return _manifest
+
+def monument_image_url(key, width=960, format_name='jpeg'):
+    """Smallest built variant at least `width` wide, else the original photo or remote URL"""
+    entry = _manifest.get(key)
+    if entry and entry['variants'].get(format_name):
+        variants = entry['variants'][format_name]
+        path = next((path for w, path in variants if w >= width), variants[-1][1])
+        return url_for('static', filename=path)
+    if key in _sources:
+        return url_for('static', filename=f'images/{_sources[key]}')
+    return MONUMENTS_DATA.get(key, {}).get('image_url', '')
+
+def monument_image_set(key, width=1600):
+    """CSS background-image value offering AVIF/WebP with a JPEG fallback"""
+    fallback = f"url('{monument_image_url(key, width)}')"
+    entry = _manifest.get(key)
+    if not entry:
+        return Markup(fallback)
+    options = []
+    for format_name, spec in FORMATS.items():
+        if entry['variants'].get(format_name):
+            options.append(f"url('{monument_image_url(key, width, format_name)}') type('{spec['mimetype']}')")
+    return Markup(f"{fallback}; background-image: image-set({', '.join(options)})")
+
+def monument_picture(key, alt='', sizes='(max-width: 600px) 100vw, 33vw', css_class=None, lazy=True):
+    """<picture> element with a srcset per format so browsers download only what they need"""
+    attributes = f' alt="{escape(alt or key)}"'
+    if css_class:
+        attributes += f' class="{escape(css_class)}"'
+    if lazy:
+        attributes += ' loading="lazy" decoding="async"'
+
+    entry = _manifest.get(key)
+    if not entry:
+        return Markup(f'<img src="{escape(monument_image_url(key))}"{attributes}>')
+
+    sources = []
+    for format_name, spec in FORMATS.items():
+        variants = entry['variants'].get(format_name)
+        if variants and format_name != 'jpeg':
+            srcset = ', '.join(f"{url_for('static', filename=path)} {width}w" for width, path in variants)
+            sources.append(f'<source type="{spec["mimetype"]}" srcset="{srcset}" sizes="{sizes}">')
+
+    jpeg = entry['variants'].get('jpeg', [])
+    srcset = ', '.join(f"{url_for('static', filename=path)} {width}w" for width, path in jpeg)
+    width = jpeg[0][0] if jpeg else entry['width']
+    height = round(entry['height'] * width / entry['width'])
+    img = (f'<img src="{escape(monument_image_url(key, 960))}" srcset="{srcset}" sizes="{sizes}" '
+           f'width="{width}" height="{height}"{attributes}>')
+    return Markup('<picture>' + ''.join(sources) + img + '</picture>')
+
+def init_images(app):
+    """Load the image manifest and expose the image helpers to templates"""
+    load_manifest()
+    app.jinja_env.globals.update(
+        monument_picture=monument_picture,
+        monument_image_url=monument_image_url,
+        monument_image_set=monument_image_set
+    )
+
+    @app.after_request
+    def cache_fingerprinted_files(response):
+        # Build outputs carry a content hash in their name, so they never change
+        if response.status_code == 200 and request.path.startswith('/static/build/'):
+            response.cache_control.public = True
+            response.cache_control.max_age = 31536000
+            response.cache_control.immutable = True
+        return response
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Build responsive monument images')
+    parser.add_argument('command', choices=['build', 'sources'])
+    parser.add_argument('--formats', nargs='+', choices=list(FORMATS))
+    args = parser.parse_args(argv)
+
+    if args.command == 'sources':
+        sources = find_sources()
+        for key in MONUMENTS_DATA:
+            print(f"{key:<24} {sources.get(key, '(remote image_url)')}")
+        return 0
+    return 0 if build(args.formats) is not None else 1
+
+if __name__ == '__main__':
+    sys.exit(main())
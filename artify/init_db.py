@@ -23,11 +23,6 @@ def init_directories():
     static_dir = os.path.join(os.path.dirname(__file__), 'static')
     if not os.path.exists(static_dir):
         os.makedirs(static_dir)
-    
-    # Create QR codes directory
-    qr_codes_dir = os.path.join(static_dir, 'qr_codes')
-    if not os.path.exists(qr_codes_dir):
-        os.makedirs(qr_codes_dir)
 
 def create_admin_user():
     """Create an admin user"""
@@ -0,0 +1,474 @@
+"""Background jobs in a local SQLite queue.
+
+Request handlers enqueue work with one INSERT into JOBS_DB_PATH (WAL mode,
+so it does not wait for running workers) and return:
+
+    enqueue('tickets.render', {'kind': 'booking', 'ticket_id': booking.id}, priority=PRIORITY_HIGH)
+
+Worker processes claim due jobs lowest priority number first, run the task
+registered under the job's name with the payload as keyword arguments, and
+retry failures with exponential backoff until max_attempts, after which the
+job is kept as 'dead' for inspection. A job whose worker died is picked up
+again once its lease runs out. Workers also enqueue the cron schedules in
+tasks.SCHEDULE when they come due; each schedule fires once however many
+workers are running.
+
+    python jobs.py worker --processes 2
+    python jobs.py enqueue tts.pregenerate
+    python jobs.py stats
+    python jobs.py retry-dead
+
+Queue depth and the age of the oldest due job are reported on /metrics,
+along with wait and run time histograms from the workers when they share
+METRICS_MULTIPROC_DIR with the site (--metrics-dir).
+"""
+import os
+import sys
+import json
+import time
+import uuid
+import random
+import signal
+import socket
+import sqlite3
+import argparse
+import threading
+import multiprocessing
+from datetime import datetime, timedelta
+
+from flask import jsonify
+
+from auth import db, create_script_app
+from metrics import REGISTRY, JOB_WAIT_SECONDS, JOB_RUN_SECONDS, flush_snapshot
+from reporting import admin_required
+
+PRIORITY_HIGH = 0
+PRIORITY_NORMAL = 5
+PRIORITY_LOW = 9
+
+QUEUED, RUNNING, DONE, DEAD = 'queued', 'running', 'done', 'dead'
+
+SCHEMA = [
+    'CREATE TABLE IF NOT EXISTS jobs ('
+    'id INTEGER PRIMARY KEY, name TEXT NOT NULL, payload TEXT NOT NULL, '
+    'priority INTEGER NOT NULL, status TEXT NOT NULL, attempts INTEGER NOT NULL DEFAULT 0, '
+    'max_attempts INTEGER, run_at REAL NOT NULL, enqueued_at REAL NOT NULL, '
+    'started_at REAL, finished_at REAL, lease_until REAL, worker TEXT, last_error TEXT, unique_key TEXT)',
+    'CREATE INDEX IF NOT EXISTS ix_jobs_due ON jobs (status, priority, run_at, id)',
+    # At most one queued or running job per unique key
+    "CREATE UNIQUE INDEX IF NOT EXISTS ix_jobs_unique ON jobs (unique_key) "
+    "WHERE unique_key IS NOT NULL AND status IN ('queued', 'running')",
+    'CREATE TABLE IF NOT EXISTS job_schedules ('
+    'name TEXT PRIMARY KEY, cron TEXT NOT NULL, task TEXT NOT NULL, payload TEXT NOT NULL, '
+    'next_run REAL NOT NULL)'
+]
+
+class Task:
+    def __init__(self, fn, name, max_attempts, backoff, max_backoff):
+        self.fn = fn
+        self.name = name
+        self.max_attempts = max_attempts
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+
+    def retry_delay(self, attempts):
+        """Exponential backoff with up to 10% jitter, so retries of a burst spread out"""
+        delay = min(self.backoff * 2 ** (attempts - 1), self.max_backoff)
+        return delay * (1 + random.random() * 0.1)
+
+TASKS = {}
+
+def task(name, max_attempts=5, backoff=10.0, max_backoff=3600.0):
+    """Register a function as the task run for jobs called `name`"""
+    def decorator(fn):
+        TASKS[name] = Task(fn, name, max_attempts, backoff, max_backoff)
+        return fn
+    return decorator
+
+class CronSchedule:
+    """Standard five field cron expression (minute hour day-of-month month day-of-week), local time"""
+
+    RANGES = [(0, 59), (0, 23), (1, 31), (1, 12), (0, 6)]
+
+    def __init__(self, expression):
+        fields = expression.split()
+        if len(fields) != 5:
+            raise ValueError(f'Cron expression needs 5 fields: {expression!r}')
+        self.expression = expression
+        self.minutes, self.hours, self.days, self.months, self.weekdays = [
+            self._parse(field, low, high, weekday=index == 4)
+            for index, (field, (low, high)) in enumerate(zip(fields, self.RANGES))]
+        # Like cron, a restricted day of month and day of week match when either does
+        self.any_day = fields[2] == '*'
+        self.any_weekday = fields[4] == '*'
+
+    @staticmethod
+    def _parse(field, low, high, weekday=False):
+        top = 7 if weekday else high  # 7 is Sunday too
+        values = set()
+        for part in field.split(','):
+            spec, _, step = part.partition('/')
+            if spec == '*':
+                start, end = low, high
+            elif '-' in spec:
+                start, end = (int(value) for value in spec.split('-', 1))
+            else:
+                start = int(spec)
+                end = high if step else start
+            if not low <= start <= end <= top:
+                raise ValueError(f'Cron field out of range: {field!r}')
+            values.update(value % 7 if weekday else value for value in range(start, end + 1, int(step or 1)))
+        return values
+
+    def _day_matches(self, moment):
+        day = moment.day in self.days
+        weekday = (moment.weekday() + 1) % 7 in self.weekdays
+        if self.any_day or self.any_weekday:
+            return day and weekday
+        return day or weekday
+
+    def next_after(self, moment):
+        """First minute strictly after `moment` the schedule fires at"""
+        moment = moment.replace(second=0, microsecond=0) + timedelta(minutes=1)
+        limit = moment + timedelta(days=366 * 5)
+        while moment < limit:
+            if moment.month not in self.months:
+                moment = (moment.replace(day=1) + timedelta(days=32)).replace(day=1, hour=0, minute=0)
+            elif not self._day_matches(moment):
+                moment = (moment + timedelta(days=1)).replace(hour=0, minute=0)
+            elif moment.hour not in self.hours:
+                moment = (moment + timedelta(hours=1)).replace(minute=0)
+            elif moment.minute not in self.minutes:
+                moment += timedelta(minutes=1)
+            else:
+                return moment
+        raise ValueError(f'Cron expression never fires: {self.expression!r}')
+
+class JobQueue:
+    """Jobs and cron schedules in a SQLite file shared by the site and the workers"""
+
+    def __init__(self, path, lease=600):
+        self.path = path
+        self.lease = lease
+        self._local = threading.local()
+        directory = os.path.dirname(path)
+        if directory and not os.path.exists(directory):
+            os.makedirs(directory)
+        conn = self._connect()
+        for statement in SCHEMA:
+            conn.execute(statement)
+
+    def _connect(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=10, isolation_level=None)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            self._local.conn = conn
+        return conn
+
+    def enqueue(self, name, payload=None, priority=PRIORITY_NORMAL, delay=0, max_attempts=None, unique_key=None):
+        """Add a job, returns its id, or None when `unique_key` is already queued or running.
+
+        `max_attempts` defaults to what the task was registered with.
+        """
+        now = time.time()
+        cursor = self._connect().execute(
+            'INSERT OR IGNORE INTO jobs (name, payload, priority, status, max_attempts, run_at, enqueued_at, unique_key) '
+            'VALUES (?, ?, ?, ?, ?, ?, ?, ?)',
+            (name, json.dumps(payload or {}), priority, QUEUED, max_attempts, now + delay, now, unique_key))
+        return cursor.lastrowid if cursor.rowcount else None
+
+    def claim(self, worker):
+        """Lease the next due job to `worker`, returns (id, name, payload, attempt, max_attempts, run_at) or None"""
+        now = time.time()
+        conn = self._connect()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            row = conn.execute(
+                'SELECT id, name, payload, attempts, max_attempts, run_at FROM jobs '
+                'WHERE status = ? AND run_at <= ? ORDER BY priority, run_at, id LIMIT 1',
+                (QUEUED, now)).fetchone()
+            if row:
+                conn.execute(
+                    'UPDATE jobs SET status = ?, attempts = attempts + 1, started_at = ?, lease_until = ?, worker = ? '
+                    'WHERE id = ?', (RUNNING, now, now + self.lease, worker, row[0]))
+            conn.execute('COMMIT')
+        except Exception:
+            conn.execute('ROLLBACK')
+            raise
+        if row is None:
+            return None
+        return row[0], row[1], json.loads(row[2]), row[3] + 1, row[4], row[5]
+
+    def renew(self, job_id):
+        self._connect().execute('UPDATE jobs SET lease_until = ? WHERE id = ? AND status = ?',
+                                (time.time() + self.lease, job_id, RUNNING))
+
+    def complete(self, job_id):
+        self._connect().execute('UPDATE jobs SET status = ?, finished_at = ?, lease_until = NULL WHERE id = ?',
+                                (DONE, time.time(), job_id))
+
+    def fail(self, job_id, error, retry_in=None):
+        """Record a failed attempt, queued again in `retry_in` seconds or dead when that is None"""
+        now = time.time()
+        if retry_in is None:
+            self._connect().execute(
+                'UPDATE jobs SET status = ?, finished_at = ?, lease_until = NULL, last_error = ? WHERE id = ?',
+                (DEAD, now, error, job_id))
+        else:
+            self._connect().execute(
+                'UPDATE jobs SET status = ?, run_at = ?, lease_until = NULL, last_error = ? WHERE id = ?',
+                (QUEUED, now + retry_in, error, job_id))
+
+    def requeue_expired(self):
+        """Put jobs whose worker stopped renewing its lease back in the queue, returns how many"""
+        cursor = self._connect().execute(
+            'UPDATE jobs SET status = ?, lease_until = NULL, last_error = ? WHERE status = ? AND lease_until < ?',
+            (QUEUED, 'Worker lease expired', RUNNING, time.time()))
+        return cursor.rowcount
+
+    def sync_schedules(self, schedules):
+        """Make job_schedules match {name: (cron, task, payload)}, keeping due times of unchanged entries"""
+        now = datetime.now()
+        conn = self._connect()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            existing = {row[0]: row[1:] for row in conn.execute('SELECT name, cron, task, payload FROM job_schedules')}
+            for name, (cron, task_name, payload) in schedules.items():
+                payload = json.dumps(payload or {})
+                if existing.get(name) == (cron, task_name, payload):
+                    continue
+                next_run = time.mktime(CronSchedule(cron).next_after(now).timetuple())
+                conn.execute('INSERT OR REPLACE INTO job_schedules (name, cron, task, payload, next_run) '
+                             'VALUES (?, ?, ?, ?, ?)', (name, cron, task_name, payload, next_run))
+            for name in set(existing) - set(schedules):
+                conn.execute('DELETE FROM job_schedules WHERE name = ?', (name,))
+            conn.execute('COMMIT')
+        except Exception:
+            conn.execute('ROLLBACK')
+            raise
+
+    def enqueue_due_schedules(self):
+        """Enqueue every schedule that came due and move it to its next run, returns the job ids"""
+        now = time.time()
+        conn = self._connect()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            enqueued = []
+            due = conn.execute('SELECT name, cron, task, payload FROM job_schedules WHERE next_run <= ?', (now,))
+            for name, cron, task_name, payload in due.fetchall():
+                # Due times missed while no worker ran are skipped, the job runs once
+                next_run = time.mktime(CronSchedule(cron).next_after(datetime.fromtimestamp(now)).timetuple())
+                conn.execute('UPDATE job_schedules SET next_run = ? WHERE name = ?', (next_run, name))
+                job_id = self.enqueue(task_name, json.loads(payload), PRIORITY_LOW, unique_key=f'cron:{name}')
+                if job_id:
+                    enqueued.append(job_id)
+            conn.execute('COMMIT')
+            return enqueued
+        except Exception:
+            conn.execute('ROLLBACK')
+            raise
+
+    def prune(self, older_than=7 * 86400):
+        """Delete finished jobs older than `older_than` seconds, dead ones are kept"""
+        cursor = self._connect().execute('DELETE FROM jobs WHERE status = ? AND finished_at < ?',
+                                         (DONE, time.time() - older_than))
+        return cursor.rowcount
+
+    def retry_dead(self):
+        cursor = self._connect().execute(
+            'UPDATE jobs SET status = ?, attempts = 0, run_at = ? WHERE status = ?', (QUEUED, time.time(), DEAD))
+        return cursor.rowcount
+
+    def stats(self):
+        """Jobs per (name, status), and how long the oldest due job has waited"""
+        conn = self._connect()
+        now = time.time()
+        counts = {(name, status): count for name, status, count in conn.execute(
+            'SELECT name, status, COUNT(*) FROM jobs WHERE status != ? GROUP BY name, status', (DONE,))}
+        oldest = conn.execute('SELECT MIN(run_at) FROM jobs WHERE status = ? AND run_at <= ?',
+                              (QUEUED, now)).fetchone()[0]
+        return counts, (now - oldest if oldest else 0.0)
+
+class Worker:
+    """Runs jobs from a queue inside an app context, one at a time"""
+
+    def __init__(self, queue, app, poll_interval=1.0, metrics_dir=None):
+        self.queue = queue
+        self.app = app
+        self.poll_interval = poll_interval
+        self.metrics_dir = metrics_dir
+        self.name = f'{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:6]}'
+        self.stopping = False
+
+    def run_once(self):
+        """Run one due job, returns False when there was none"""
+        job = self.queue.claim(self.name)
+        if job is None:
+            return False
+        job_id, name, payload, attempt, max_attempts, run_at = job
+        JOB_WAIT_SECONDS.observe(max(0.0, time.time() - run_at), name)
+        task_def = TASKS.get(name)
+        start = time.perf_counter()
+        outcome = 'done'
+        finished = threading.Event()
+        heartbeat = threading.Thread(target=self._heartbeat, args=(job_id, finished), daemon=True)
+        heartbeat.start()
+        with self.app.app_context():
+            try:
+                if task_def is None:
+                    raise LookupError(f'No task registered as {name!r}')
+                task_def.fn(**payload)
+                self.queue.complete(job_id)
+            except Exception as e:
+                db.session.rollback()
+                error = f'{type(e).__name__}: {str(e)}'
+                if task_def is not None and attempt < (max_attempts or task_def.max_attempts):
+                    outcome = 'retry'
+                    self.queue.fail(job_id, error, task_def.retry_delay(attempt))
+                else:
+                    outcome = 'dead'
+                    self.queue.fail(job_id, error)
+                print(f"Job {job_id} ({name}) failed on attempt {attempt}: {error}")
+            finally:
+                db.session.remove()
+                finished.set()
+        JOB_RUN_SECONDS.observe(time.perf_counter() - start, name, outcome)
+        return True
+
+    def _heartbeat(self, job_id, finished):
+        # Keep the lease while a long job (an archive run) is still going
+        while not finished.wait(self.queue.lease / 3):
+            try:
+                self.queue.renew(job_id)
+            except sqlite3.Error as e:
+                print(f"Error renewing lease of job {job_id}: {str(e)}")
+
+    def run(self):
+        signal.signal(signal.SIGTERM, self._stop)
+        signal.signal(signal.SIGINT, self._stop)
+        last_housekeeping = 0.0
+        while not self.stopping:
+            if time.monotonic() - last_housekeeping >= self.poll_interval:
+                self.queue.requeue_expired()
+                self.queue.enqueue_due_schedules()
+                last_housekeeping = time.monotonic()
+            ran = self.run_once()
+            if self.metrics_dir:
+                flush_snapshot(self.metrics_dir)
+            if not ran:
+                time.sleep(self.poll_interval)
+
+    def _stop(self, signum, frame):
+        # Finish the current job, the loop exits before claiming another
+        self.stopping = True
+
+_queue = None
+
+def get_queue():
+    return _queue
+
+def enqueue(name, payload=None, **options):
+    """Add a job to the site's queue without letting a queue error fail the request.
+
+    Returns the job id, or None when it was not added.
+    """
+    if _queue is None:
+        return None
+    try:
+        return _queue.enqueue(name, payload, **options)
+    except sqlite3.Error as e:
+        print(f"Error enqueueing {name}: {str(e)}")
+        return None
+
+def _queue_gauges():
+    counts, oldest = _queue.stats()
+    return {
+        'artify_jobs': ('Jobs not yet finished, by task and status', ('name', 'status'), counts),
+        'artify_jobs_oldest_due_seconds': ('How long the oldest due job has waited', (), {(): oldest})
+    }
+
+def default_db_path(instance_path):
+    return os.environ.get('ARTIFY_JOBS_DB') or os.path.join(instance_path, 'jobs.db')
+
+def init_jobs(app):
+    global _queue
+    app.config.setdefault('JOBS_DB_PATH', default_db_path(app.instance_path))
+    _queue = JobQueue(app.config['JOBS_DB_PATH'])
+    REGISTRY.collector(_queue_gauges)
+
+    @app.route('/admin/jobs')
+    @admin_required
+    def job_stats():
+        counts, oldest = _queue.stats()
+        return jsonify({
+            'jobs': [{'name': name, 'status': status, 'count': count}
+                     for (name, status), count in sorted(counts.items())],
+            'oldest_due_seconds': round(oldest, 3)
+        })
+
+    return _queue
+
+def _worker_main(db_path, poll_interval, metrics_dir):
+    global _queue
+    import tasks  # Registers the task functions
+
+    app = create_script_app()
+    # Tasks enqueue follow-up jobs on the queue they were claimed from
+    _queue = JobQueue(db_path)
+    _queue.sync_schedules(tasks.SCHEDULE)
+    Worker(_queue, app, poll_interval, metrics_dir).run()
+
+def run_workers(processes, db_path, poll_interval=1.0, metrics_dir=None):
+    """Run `processes` workers and wait for them, SIGTERM stops them after their current job"""
+    if processes == 1:
+        _worker_main(db_path, poll_interval, metrics_dir)
+        return
+    children = [multiprocessing.Process(target=_worker_main, args=(db_path, poll_interval, metrics_dir),
+                                        name=f'artify-worker-{i}') for i in range(processes)]
+    for child in children:
+        child.start()
+
+    def stop(signum, frame):
+        for child in children:
+            if child.is_alive():
+                os.kill(child.pid, signal.SIGTERM)
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+    for child in children:
+        child.join()
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Run and manage background jobs')
+    parser.add_argument('command', choices=['worker', 'enqueue', 'stats', 'retry-dead'])
+    parser.add_argument('task', nargs='?', help='task name, for enqueue')
+    parser.add_argument('--payload', default='{}', help='JSON keyword arguments, for enqueue')
+    parser.add_argument('--priority', type=int, default=PRIORITY_NORMAL)
+    parser.add_argument('--processes', type=int, default=1)
+    parser.add_argument('--poll-interval', type=float, default=1.0)
+    parser.add_argument('--metrics-dir', help="the site's METRICS_MULTIPROC_DIR, to report worker metrics")
+    parser.add_argument('--db', help='queue database, defaults to instance/jobs.db')
+    args = parser.parse_args(argv)
+
+    db_path = args.db or default_db_path(os.path.join(os.path.dirname(os.path.abspath(__file__)), 'instance'))
+    if args.command == 'worker':
+        run_workers(args.processes, db_path, args.poll_interval, args.metrics_dir)
+        return 0
+
+    queue = JobQueue(db_path)
+    if args.command == 'enqueue':
+        if not args.task:
+            parser.error('enqueue needs a task name')
+        print(f"Enqueued job {queue.enqueue(args.task, json.loads(args.payload), args.priority)}")
+    elif args.command == 'retry-dead':
+        print(f"Requeued {queue.retry_dead()} dead jobs")
+    else:
+        counts, oldest = queue.stats()
+        for (name, status), count in sorted(counts.items()):
+            print(f"{name:<24} {status:<8} {count:>8}")
+        print(f"Oldest due job has waited {oldest:.1f}s")
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,299 @@
+import os
+import json
+import time
+import threading
+from contextlib import contextmanager
+
+from flask import Response, request, g, has_app_context
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+# Latency buckets in seconds, from a fast JSON lookup up to a slow speech request
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+class Counter:
+    """Monotonic counter with optional labels"""
+
+    kind = 'counter'
+
+    def __init__(self, name, help_text, labels=()):
+        self.name = name
+        self.help_text = help_text
+        self.labels = tuple(labels)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *label_values, amount=1):
+        with self._lock:
+            self._values[label_values] = self._values.get(label_values, 0) + amount
+
+    def snapshot(self):
+        with self._lock:
+            values = {json.dumps(key): value for key, value in self._values.items()}
+        return {'type': self.kind, 'help': self.help_text, 'labels': self.labels, 'values': values}
+
+class Histogram:
+    """Cumulative bucket histogram, stores [bucket counts..., sum, count] per label set"""
+
+    kind = 'histogram'
+
+    def __init__(self, name, help_text, labels=(), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.help_text = help_text
+        self.labels = tuple(labels)
+        self.buckets = tuple(buckets)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, *label_values):
+        with self._lock:
+            row = self._values.get(label_values)
+            if row is None:
+                row = self._values[label_values] = [0] * (len(self.buckets) + 2)
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    row[i] += 1
+                    break
+            row[-2] += value
+            row[-1] += 1
+
+    def snapshot(self):
+        with self._lock:
+            values = {json.dumps(key): list(row) for key, row in self._values.items()}
+        return {
+            'type': self.kind,
+            'help': self.help_text,
+            'labels': self.labels,
+            'buckets': self.buckets,
+            'values': values
+        }
+
+class Registry:
+    def __init__(self):
+        self.metrics = {}
+        self.collectors = []
+
+    def counter(self, name, help_text, labels=()):
+        return self.metrics.setdefault(name, Counter(name, help_text, labels))
+
+    def histogram(self, name, help_text, labels=(), buckets=DEFAULT_BUCKETS):
+        return self.metrics.setdefault(name, Histogram(name, help_text, labels, buckets))
+
+    def collector(self, collect):
+        """Register `collect()`, called on every scrape for gauges read from a shared source.
+
+        It returns {name: (help text, label names, {label values tuple: value})}.
+        Its values are not part of worker snapshots, so they are not summed.
+        """
+        self.collectors.append(collect)
+        return collect
+
+    def snapshot(self):
+        return {name: metric.snapshot() for name, metric in self.metrics.items()}
+
+    def collect_gauges(self):
+        gauges = {}
+        for collect in self.collectors:
+            try:
+                results = collect()
+            except Exception as e:
+                print(f"Error collecting metrics: {str(e)}")
+                continue
+            for name, (help_text, labels, values) in results.items():
+                gauges[name] = {
+                    'type': 'gauge',
+                    'help': help_text,
+                    'labels': tuple(labels),
+                    'values': {json.dumps(list(key)): value for key, value in values.items()}
+                }
+        return gauges
+
+REGISTRY = Registry()
+
+REQUEST_LATENCY = REGISTRY.histogram(
+    'artify_request_duration_seconds', 'Request latency by endpoint', ('endpoint', 'method', 'status'))
+REQUEST_DB_QUERIES = REGISTRY.histogram(
+    'artify_request_db_queries', 'SQL statements executed per request', ('endpoint',),
+    buckets=(0, 1, 2, 5, 10, 20, 50, 100))
+REQUEST_DB_SECONDS = REGISTRY.histogram(
+    'artify_request_db_seconds', 'Time spent in SQL per request', ('endpoint',))
+DB_QUERIES = REGISTRY.counter('artify_db_queries_total', 'SQL statements executed')
+QR_RENDER_SECONDS = REGISTRY.histogram('artify_qr_render_seconds', 'QR code render time', ('kind',))
+JOB_WAIT_SECONDS = REGISTRY.histogram(
+    'artify_job_wait_seconds', 'Time from a job being due to a worker starting it', ('name',),
+    buckets=(0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 10.0, 30.0, 60.0, 300.0, 900.0, 3600.0))
+JOB_RUN_SECONDS = REGISTRY.histogram(
+    'artify_job_run_seconds', 'Background job run time by outcome', ('name', 'outcome'),
+    buckets=(0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 10.0, 30.0, 60.0, 300.0, 900.0))
+SPEECH_SECONDS = REGISTRY.histogram(
+    'artify_speech_seconds', 'Speech recognition and synthesis time', ('stage',))
+WAITLIST_OFFERS = REGISTRY.counter(
+    'artify_waitlist_offers_total', 'Waitlist offers made, accepted and expired', ('outcome',))
+NOTIFICATIONS = REGISTRY.counter(
+    'artify_notifications_total', 'Notification delivery attempts by outcome', ('channel', 'outcome'))
+
+@contextmanager
+def timer(histogram, *label_values):
+    """Observe the wall time of the block on `histogram`"""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        histogram.observe(time.perf_counter() - start, *label_values)
+
+@event.listens_for(Engine, 'before_cursor_execute')
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault('query_start', []).append(time.perf_counter())
+
+@event.listens_for(Engine, 'after_cursor_execute')
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    elapsed = time.perf_counter() - conn.info['query_start'].pop()
+    DB_QUERIES.inc()
+    if has_app_context() and 'metrics_start' in g:
+        g.db_queries += 1
+        g.db_seconds += elapsed
+
+@event.listens_for(Engine, 'handle_error')
+def _handle_error(context):
+    # A failed statement never reaches after_cursor_execute, drop the start time it pushed
+    if context.connection is not None and context.cursor is not None:
+        starts = context.connection.info.get('query_start')
+        if starts:
+            starts.pop()
+
+def merge_snapshots(snapshots):
+    """Sum metric values from several worker snapshots"""
+    merged = {}
+    for snapshot in snapshots:
+        for name, metric in snapshot.items():
+            target = merged.setdefault(name, dict(metric, values={}))
+            for key, value in metric['values'].items():
+                if key not in target['values']:
+                    target['values'][key] = value
+                elif isinstance(value, list):
+                    target['values'][key] = [a + b for a, b in zip(target['values'][key], value)]
+                else:
+                    target['values'][key] += value
+    return merged
+
+def _format_labels(names, values, extra=None):
+    pairs = list(zip(names, values))
+    if extra:
+        pairs.append(extra)
+    if not pairs:
+        return ''
+    escaped = (str(v).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') for _, v in pairs)
+    return '{' + ','.join(f'{k}="{v}"' for (k, _), v in zip(pairs, escaped)) + '}'
+
+def render_text(snapshot):
+    """Render a snapshot in the Prometheus text exposition format"""
+    lines = []
+    for name, metric in sorted(snapshot.items()):
+        lines.append(f'# HELP {name} {metric["help"]}')
+        lines.append(f'# TYPE {name} {metric["type"]}')
+        for key, value in sorted(metric['values'].items()):
+            label_values = json.loads(key)
+            if metric['type'] in ('counter', 'gauge'):
+                lines.append(f'{name}{_format_labels(metric["labels"], label_values)} {value}')
+                continue
+            cumulative = 0
+            for bound, count in zip(metric['buckets'], value):
+                cumulative += count
+                labels = _format_labels(metric['labels'], label_values, ('le', bound))
+                lines.append(f'{name}_bucket{labels} {cumulative}')
+            labels = _format_labels(metric['labels'], label_values, ('le', '+Inf'))
+            lines.append(f'{name}_bucket{labels} {value[-1]}')
+            lines.append(f'{name}_sum{_format_labels(metric["labels"], label_values)} {value[-2]}')
+            lines.append(f'{name}_count{_format_labels(metric["labels"], label_values)} {value[-1]}')
+    return '\n'.join(lines) + '\n'
+
+_last_flush = 0.0
+
+def flush_snapshot(directory, interval=1.0):
+    """Write this worker's snapshot for /metrics to merge, at most once per `interval`"""
+    global _last_flush
+    now = time.monotonic()
+    if now - _last_flush < interval:
+        return
+    _last_flush = now
+    path = os.path.join(directory, f'{os.getpid()}.json')
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w') as f:
+        json.dump(REGISTRY.snapshot(), f)
+    os.replace(tmp_path, path)
+
+def _pid_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True  # Someone else's process, but alive
+    return True
+
+def collect(directory=None):
+    """Snapshot of this process plus, in multi-worker mode, every other live worker.
+
+    Snapshots of workers that have exited are deleted rather than summed, so
+    a restart does not count its old workers twice; their counters drop out
+    of the total, which Prometheus reads as a counter reset.
+    """
+    snapshots = [REGISTRY.snapshot()]
+    if directory and os.path.isdir(directory):
+        own_file = f'{os.getpid()}.json'
+        for file_name in os.listdir(directory):
+            if not file_name.endswith('.json') or file_name == own_file:
+                continue
+            pid = file_name[:-len('.json')]
+            if pid.isdigit() and not _pid_alive(int(pid)):
+                try:
+                    os.remove(os.path.join(directory, file_name))
+                except OSError:
+                    pass
+                continue
+            try:
+                with open(os.path.join(directory, file_name)) as f:
+                    snapshots.append(json.load(f))
+            except (OSError, ValueError):
+                continue
+    merged = merge_snapshots(snapshots)
+    merged.update(REGISTRY.collect_gauges())
+    return merged
+
+def init_metrics(app):
+    """Record request metrics and expose them at /metrics.
+
+    Set METRICS_MULTIPROC_DIR when running several worker processes so each
+    worker publishes its numbers there and /metrics reports the sum.
+    """
+    app.config.setdefault('METRICS_MULTIPROC_DIR', None)
+    directory = app.config['METRICS_MULTIPROC_DIR']
+    if directory and not os.path.exists(directory):
+        os.makedirs(directory)
+
+    @app.before_request
+    def start_request_metrics():
+        g.metrics_start = time.perf_counter()
+        g.db_queries = 0
+        g.db_seconds = 0.0
+
+    @app.after_request
+    def record_request_metrics(response):
+        if 'metrics_start' not in g:
+            return response
+        endpoint = request.endpoint or 'unmatched'
+        REQUEST_LATENCY.observe(time.perf_counter() - g.metrics_start,
+                                endpoint, request.method, str(response.status_code))
+        REQUEST_DB_QUERIES.observe(g.db_queries, endpoint)
+        REQUEST_DB_SECONDS.observe(g.db_seconds, endpoint)
+        if directory:
+            try:
+                flush_snapshot(directory)
+            except OSError as e:
+                print(f"Error writing metrics snapshot: {str(e)}")
+        return response
+
+    def metrics_endpoint():
+        return Response(render_text(collect(directory)), mimetype='text/plain; version=0.0.4')
+
+    app.add_url_rule('/metrics', 'metrics', metrics_endpoint)
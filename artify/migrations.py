@@ -0,0 +1,155 @@
+"""Bring an existing database up to the current models without losing rows.
+
+app.py recreates every table on startup, which is fine for development but not
+for a database that has to be kept. This creates missing tables, adds missing
+columns and runs the data backfills, each safe to run again:
+
+    ARTIFY_DATABASE_URI=sqlite:////path/to/artify.db python migrations.py
+"""
+import sys
+import json
+import argparse
+from types import SimpleNamespace
+
+from sqlalchemy import inspect, text, select, func
+
+from auth import db, create_script_app, User, Booking, BookingVisitor
+from parking import ParkingReservation
+import cancellations  # Registers the waitlist, refund and closure tables with db.metadata
+import notifications  # and the notification outbox
+from archive import ARCHIVES
+from reporting import rebuild_rollups
+from tickets import booking_payload, parking_payload
+
+def add_missing_columns():
+    """ALTER TABLE ADD COLUMN for model columns the database does not have yet"""
+    inspector = inspect(db.engine)
+    existing_tables = set(inspector.get_table_names())
+    added = []
+    for table in db.metadata.sorted_tables:
+        if table.name not in existing_tables:
+            continue
+        existing = {column['name'] for column in inspector.get_columns(table.name)}
+        for column in table.columns:
+            if column.name in existing:
+                continue
+            ddl = f'ALTER TABLE {table.name} ADD COLUMN {column.name} {column.type.compile(db.engine.dialect)}'
+            default = column.default.arg if column.default is not None and column.default.is_scalar else None
+            if default is not None:
+                ddl += f' DEFAULT {int(default) if isinstance(default, bool) else repr(default)}'
+            elif not column.nullable:
+                raise RuntimeError(f'{table.name}.{column.name} is NOT NULL without a default, add it by hand')
+            db.session.execute(text(ddl))
+            added.append(f'{table.name}.{column.name}')
+    db.session.commit()
+    return added
+
+def create_missing_indexes():
+    """CREATE INDEX for model indexes added after their table was created"""
+    inspector = inspect(db.engine)
+    existing_tables = set(inspector.get_table_names())
+    created = []
+    for table in db.metadata.sorted_tables:
+        if table.name not in existing_tables:
+            continue
+        existing = {index['name'] for index in inspector.get_indexes(table.name)}
+        for index in table.indexes:
+            if index.name not in existing:
+                index.create(bind=db.engine)
+                created.append(index.name)
+    return created
+
+def decode_visitors(value):
+    """Visitors as a list, unwrapping the JSON strings process_payment used to store"""
+    while isinstance(value, str):
+        try:
+            value = json.loads(value)
+        except ValueError:
+            return []
+    return [visitor for visitor in value if isinstance(visitor, dict)] if isinstance(value, list) else []
+
+def backfill_visitors(batch_size=500):
+    """Create visitor rows and headcounts for bookings that have none, one batch per transaction"""
+    done = 0
+    last_id = 0
+    while True:
+        has_records = db.session.query(BookingVisitor.id).filter(BookingVisitor.booking_id == Booking.id).exists()
+        rows = (db.session.query(Booking, User.name)
+                .join(User, User.id == Booking.user_id)
+                .filter(Booking.id > last_id, ~has_records)
+                .order_by(Booking.id)
+                .limit(batch_size)
+                .all())
+        if not rows:
+            return done
+        for booking, user_name in rows:
+            booking.set_visitors(decode_visitors(booking.visitors), primary_name=user_name)
+        last_id = rows[-1][0].id
+        db.session.commit()
+        done += len(rows)
+        print(f"Backfilled visitors for {done} bookings")
+
+def backfill_qr_payloads(batch_size=500):
+    """Replace the base64 PNGs qr_code used to hold with the ticket's JSON payload, live and archived rows"""
+    users = User.__table__
+    done = 0
+    for model, payload in ((Booking, lambda row: booking_payload(row, row.user_name, row.user_email)),
+                           (ParkingReservation, parking_payload)):
+        for table in (model.__table__, ARCHIVES[model.__table__]):
+            query = select(*table.columns, users.c.name.label('user_name'), users.c.email.label('user_email'))
+            query = query.select_from(table.outerjoin(users, users.c.id == table.c.user_id))
+            last_id = 0
+            while True:
+                rows = db.session.execute(
+                    query.where(table.c.id > last_id, table.c.qr_code.isnot(None), ~table.c.qr_code.like('{%'))
+                    .order_by(table.c.id).limit(batch_size)).all()
+                if not rows:
+                    break
+                for row in rows:
+                    fields = dict(row._mapping)
+                    if 'visitors' in fields:
+                        fields['visitors'] = decode_visitors(fields['visitors'])
+                    db.session.execute(table.update().where(table.c.id == row.id)
+                                       .values(qr_code=payload(SimpleNamespace(**fields))))
+                last_id = rows[-1].id
+                db.session.commit()
+                done += len(rows)
+                print(f"Rebuilt the QR payload of {done} tickets")
+    return done
+
+def backfill_created_at():
+    """Date rows saved before created_at was set by their last update, else their day, so history can page over them"""
+    done = 0
+    for model, date_column in ((Booking, 'visit_date'), (ParkingReservation, 'reservation_date')):
+        for table in (model.__table__, ARCHIVES[model.__table__]):
+            done += db.session.execute(
+                table.update().where(table.c.created_at.is_(None))
+                .values(created_at=func.coalesce(table.c.updated_at, table.c[date_column]))).rowcount
+    db.session.commit()
+    return done
+
+def migrate(batch_size=500):
+    db.create_all()
+    for column in add_missing_columns():
+        print(f"Added column {column}")
+    for index in create_missing_indexes():
+        print(f"Created index {index}")
+    backfill_visitors(batch_size)
+    backfill_qr_payloads(batch_size)
+    print(f"Set created_at on {backfill_created_at()} bookings and reservations")
+    bookings, parking_rows = rebuild_rollups()
+    print(f"Rebuilt {bookings} booking and {parking_rows} parking rollup rows")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Migrate an existing Artify database')
+    parser.add_argument('--batch-size', type=int, default=500)
+    args = parser.parse_args(argv)
+
+    app = create_script_app()
+
+    with app.app_context():
+        migrate(args.batch_size)
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,411 @@
+# Monument catalog shared by the pages, booking fees and voice features
+MONUMENTS_DATA = {
+    'Red Fort': {
+        'name': 'Red Fort (Lal Qila)',
+        'short_description': 'A historic fort built by Mughal Emperor Shah Jahan',
+        'image_url': 'https://source.unsplash.com/1600x900/?red-fort-delhi',
+        'history': '''The Red Fort, also known as Lal Qila, was built by Mughal Emperor Shah Jahan in 1639. 
+        It served as the main residence of the Mughal emperors for nearly 200 years. The fort's construction 
+        began in 1638 and was completed in 1648. The name "Red Fort" comes from its massive red sandstone walls. 
+        The fort was designed by architect Ustad Ahmad Lahori, who also designed the Taj Mahal.''',
+        'highlights': [
+            {
+                'title': 'Architecture',
+                'description': 'The fort showcases a perfect blend of Persian, Timurid, and Hindu architectural styles.'
+            },
+            {
+                'title': 'Diwan-i-Aam',
+                'description': 'The Hall of Public Audience where the emperor would meet the general public.'
+            },
+            {
+                'title': 'Diwan-i-Khas',
+                'description': 'The Hall of Private Audience where the emperor would meet important guests.'
+            }
+        ],
+        'timing': '9:30 AM - 4:30 PM (Closed on Mondays)',
+        'entry_fee': '₹25 for Indians, ₹50 for Foreigners',
+        'best_time': 'October to March (Winter Season)',
+        'virtual_tour_urls': [
+            'https://www.google.com/maps/embed?pb=!4v1648123456789!6m8!1m7!1sCAESLEdpbGxlcm9lR0FTRS1ldXdJR1JfYl9nS2dCbGdCbGdCbGdCbGdCbGdCbGc!2m2!1d28.6562!2d77.2410!3f0!4f0!5f0.7820865974627469'
+        ],
+        'map_url': 'https://www.google.com/maps/embed?pb=!1m18!1m12!1m3!1d3500.8389774351086!2d77.2410!3d28.6562!2m3!1f0!2f0!3f0!3m2!1i1024!2i768!4f13.1!3m3!1m2!1s0x390cfd5b347f62e7%3A0x37205b715389640!2sRed%20Fort!5e0!3m2!1sen!2sin!4v1648123456789!5m2!1sen!2sin',
+        'directions_url': 'https://www.google.com/maps/dir/?api=1&destination=Red+Fort+Delhi'
+    },
+    'Qutub Minar': {
+        'name': 'Qutub Minar',
+        'short_description': 'The tallest brick minaret in the world',
+        'image_url': 'https://source.unsplash.com/1600x900/?qutub-minar',
+        'history': '''Qutub Minar was built in 1192 by Qutub-ud-din Aibak, the founder of the Delhi Sultanate. 
+        The construction was completed by his successor Iltutmish. The minaret is 73 meters tall and has 379 steps. 
+        It is made of red sandstone and marble, with intricate carvings and verses from the Quran.''',
+        'highlights': [
+            {
+                'title': 'Architecture',
+                'description': 'A masterpiece of Indo-Islamic architecture with five distinct storeys.'
+            },
+            {
+                'title': 'Iron Pillar',
+                'description': 'A 7-meter tall iron pillar that has not rusted for over 1600 years.'
+            },
+            {
+                'title': 'Quwwat-ul-Islam Mosque',
+                'description': 'The first mosque built in India, located at the base of the minaret.'
+            }
+        ],
+        'timing': '7:00 AM - 5:00 PM (Open all days)',
+        'entry_fee': '₹30 for Indians, ₹60 for Foreigners',
+        'best_time': 'October to March (Winter Season)',
+        'virtual_tour_urls': [
+            'https://www.google.com/maps/embed?pb=!4v1648123456789!6m8!1m7!1sCAESLEdpbGxlcm9lR0FTRS1ldXdJR1JfYl9nS2dCbGdCbGdCbGdCbGdCbGdCbGc!2m2!1d28.5244!2d77.1855!3f0!4f0!5f0.7820865974627469'
+        ],
+        'map_url': 'https://www.google.com/maps/embed?pb=!1m18!1m12!1m3!1d3500.8389774351086!2d77.1855!3d28.5244!2m3!1f0!2f0!3f0!3m2!1i1024!2i768!4f13.1!3m3!1m2!1s0x390cfd5b347f62e7%3A0x37205b715389640!2sQutub%20Minar!5e0!3m2!1sen!2sin!4v1648123456789!5m2!1sen!2sin',
+        'directions_url': 'https://www.google.com/maps/dir/?api=1&destination=Qutub+Minar+Delhi'
+    },
+    'India Gate': {
+        'name': 'India Gate',
+        'short_description': 'A war memorial dedicated to Indian soldiers',
+        'image_url': 'https://source.unsplash.com/1600x900/?india-gate',
+        'history': '''India Gate was built in 1931 to commemorate the 70,000 Indian soldiers who died in World War I. 
+        The monument was designed by Edwin Lutyens and is inspired by the Arc de Triomphe in Paris. 
+        The names of 13,300 servicemen are inscribed on the walls.''',
+        'highlights': [
+            {
+                'title': 'Architecture',
+                'description': 'A 42-meter tall archway made of red and pale sandstone and granite.'
+            },
+            {
+                'title': 'Amar Jawan Jyoti',
+                'description': 'An eternal flame burning in memory of soldiers who died in the 1971 Indo-Pakistan War.'
+            },
+            {
+                'title': 'Surrounding Gardens',
+                'description': 'Beautiful lawns and gardens perfect for evening walks and picnics.'
+            }
+        ],
+        'timing': 'Open 24 hours',
+        'entry_fee': 'Free for all visitors',
+        'best_time': 'October to March (Winter Season)',
+        'virtual_tour_urls': [
+            'https://www.google.com/maps/embed?pb=!4v1648123456789!6m8!1m7!1sCAESLEdpbGxlcm9lR0FTRS1ldXdJR1JfYl9nS2dCbGdCbGdCbGdCbGdCbGdCbGc!2m2!1d28.6129!2d77.2295!3f0!4f0!5f0.7820865974627469'
+        ],
+        'map_url': 'https://www.google.com/maps/embed?pb=!1m18!1m12!1m3!1d3500.8389774351086!2d77.2295!3d28.6129!2m3!1f0!2f0!3f0!3m2!1i1024!2i768!4f13.1!3m3!1m2!1s0x390cfd5b347f62e7%3A0x37205b715389640!2sIndia%20Gate!5e0!3m2!1sen!2sin!4v1648123456789!5m2!1sen!2sin',
+        'directions_url': 'https://www.google.com/maps/dir/?api=1&destination=India+Gate+Delhi'
+    },
+    'Taj Mahal': {
+        'name': 'Taj Mahal',
+        'short_description': 'One of the Seven Wonders of the World',
+        'image_url': 'https://source.unsplash.com/1600x900/?taj-mahal',
+        'history': '''The Taj Mahal was commissioned in 1632 by Mughal Emperor Shah Jahan to house the tomb of his 
+        favorite wife, Mumtaz Mahal. Construction was completed in 1653. The monument is considered the finest 
+        example of Mughal architecture, combining Persian, Ottoman Turkish, and Indian architectural styles.''',
+        'highlights': [
+            {
+                'title': 'Architecture',
+                'description': 'A perfect blend of Persian, Ottoman Turkish, and Indian architectural styles.'
+            },
+            {
+                'title': 'Main Mausoleum',
+                'description': 'The central structure housing the tombs of Shah Jahan and Mumtaz Mahal.'
+            },
+            {
+                'title': 'Gardens',
+                'description': 'Beautiful Mughal gardens with reflecting pools and fountains.'
+            }
+        ],
+        'timing': 'Sunrise to Sunset (Closed on Fridays)',
+        'entry_fee': '₹40 for Indians, ₹80 for Foreigners',
+        'best_time': 'October to March (Winter Season)',
+        'virtual_tour_urls': [
+            'https://www.google.com/maps/embed?pb=!4v1648123456789!6m8!1m7!1sCAESLEdpbGxlcm9lR0FTRS1ldXdJR1JfYl9nS2dCbGdCbGdCbGdCbGdCbGdCbGc!2m2!1d27.1751!2d78.0421!3f0!4f0!5f0.7820865974627469'
+        ],
+        'map_url': 'https://www.google.com/maps/embed?pb=!1m18!1m12!1m3!1d3500.8389774351086!2d78.0421!3d27.1751!2m3!1f0!2f0!3f0!3m2!1i1024!2i768!4f13.1!3m3!1m2!1s0x39747121d702ff6d%3A0xdd2ae4807feb8530!2sTaj%20Mahal!5e0!3m2!1sen!2sin!4v1648123456789!5m2!1sen!2sin',
+        'directions_url': 'https://www.google.com/maps/dir/?api=1&destination=Taj+Mahal+Agra'
+    },
+    'Lotus Temple': {
+        'name': 'Lotus Temple',
+        'short_description': 'A Bahá\'í House of Worship',
+        'image_url': 'https://source.unsplash.com/1600x900/?lotus-temple',
+        'history': '''The Lotus Temple, completed in 1986, is a Bahá\'í House of Worship. It was designed by 
+        Iranian architect Fariborz Sahba and is notable for its flowerlike shape. The temple has won numerous 
+        architectural awards and is one of the most visited buildings in the world.''',
+        'highlights': [
+            {
+                'title': 'Architecture',
+                'description': 'A unique lotus-shaped structure with 27 free-standing marble-clad "petals".'
+            },
+            {
+                'title': 'Interior',
+                'description': 'A central hall with a capacity of 2,500 people and excellent acoustics.'
+            },
+            {
+                'title': 'Gardens',
+                'description': 'Beautiful landscaped gardens with nine pools and walkways.'
+            }
+        ],
+        'timing': '9:00 AM - 5:30 PM (Closed on Mondays)',
+        'entry_fee': 'Free for all visitors',
+        'best_time': 'October to March (Winter Season)',
+        'virtual_tour_urls': [
+            'https://www.google.com/maps/embed?pb=!4v1648123456789!6m8!1m7!1sCAESLEdpbGxlcm9lR0FTRS1ldXdJR1JfYl9nS2dCbGdCbGdCbGdCbGdCbGdCbGc!2m2!1d28.5535!2d77.2588!3f0!4f0!5f0.7820865974627469'
+        ],
+        'map_url': 'https://www.google.com/maps/embed?pb=!1m18!1m12!1m3!1d3500.8389774351086!2d77.2588!3d28.5535!2m3!1f0!2f0!3f0!3m2!1i1024!2i768!4f13.1!3m3!1m2!1s0x390cfd5b347f62e7%3A0x37205b715389640!2sLotus%20Temple!5e0!3m2!1sen!2sin!4v1648123456789!5m2!1sen!2sin',
+        'directions_url': 'https://www.google.com/maps/dir/?api=1&destination=Lotus+Temple+Delhi'
+    },
+    'Jama Masjid': {
+        'name': 'Jama Masjid',
+        'short_description': 'One of the largest mosques in India',
+        'image_url': 'https://source.unsplash.com/1600x900/?jama-masjid',
+        'history': '''Jama Masjid was built by Mughal Emperor Shah Jahan between 1650 and 1656. The mosque 
+        was inaugurated by Syed Abdul Ghafoor Shah Bukhari, a religious leader from Uzbekistan. It is the 
+        largest mosque in India and can accommodate 25,000 worshippers.''',
+        'highlights': [
+            {
+                'title': 'Architecture',
+                'description': 'A magnificent example of Mughal architecture with three domes and two minarets.'
+            },
+            {
+                'title': 'Courtyard',
+                'description': 'A vast courtyard that can hold thousands of worshippers.'
+            },
+            {
+                'title': 'Relics',
+                'description': 'Houses several relics of Islamic religious significance.'
+            }
+        ],
+        'timing': '7:00 AM - 12:00 PM, 1:30 PM - 6:30 PM (Closed during prayer times)',
+        'entry_fee': 'Free for Indian visitors, ₹35 for Foreign visitors',
+        'best_time': 'October to March (Winter Season)',
+        'virtual_tour_urls': [
+            'https://www.google.com/maps/embed?pb=!4v1648123456789!6m8!1m7!1sCAESLEdpbGxlcm9lR0FTRS1ldXdJR1JfYl9nS2dCbGdCbGdCbGdCbGdCbGdCbGc!2m2!1d28.6507!2d77.2334!3f0!4f0!5f0.7820865974627469'
+        ],
+        'map_url': 'https://www.google.com/maps/embed?pb=!1m18!1m12!1m3!1d3500.8389774351086!2d77.2334!3d28.6507!2m3!1f0!2f0!3f0!3m2!1i1024!2i768!4f13.1!3m3!1m2!1s0x390cfd5b347f62e7%3A0x37205b715389640!2sJama%20Masjid!5e0!3m2!1sen!2sin!4v1648123456789!5m2!1sen!2sin',
+        'directions_url': 'https://www.google.com/maps/dir/?api=1&destination=Jama+Masjid+Delhi'
+    },
+    'Purana Qila': {
+        'name': 'Purana Qila (Old Fort)',
+        'short_description': 'The oldest fort in Delhi',
+        'image_url': 'https://source.unsplash.com/1600x900/?purana-qila',
+        'history': '''Purana Qila, also known as Old Fort, is believed to be the site of Indraprastha, 
+        the ancient city of the Mahabharata. The current structure was built by Sher Shah Suri in 1538. 
+        The fort has witnessed the rise and fall of several empires.''',
+        'highlights': [
+            {
+                'title': 'Architecture',
+                'description': 'A blend of Afghan and Mughal architectural styles.'
+            },
+            {
+                'title': 'Qila-i-Kuhna Mosque',
+                'description': 'A beautiful mosque built by Sher Shah Suri.'
+            },
+            {
+                'title': 'Sher Mandal',
+                'description': 'An octagonal tower believed to be Humayun\'s library.'
+            }
+        ],
+        'timing': '7:00 AM - 5:00 PM (Open all days)',
+        'entry_fee': '₹20 for Indians, ₹40 for Foreigners',
+        'best_time': 'October to March (Winter Season)',
+        'virtual_tour_urls': [
+            'https://www.google.com/maps/embed?pb=!4v1648123456789!6m8!1m7!1sCAESLEdpbGxlcm9lR0FTRS1ldXdJR1JfYl9nS2dCbGdCbGdCbGdCbGdCbGdCbGc!2m2!1d28.6092!2d77.2439!3f0!4f0!5f0.7820865974627469'
+        ],
+        'map_url': 'https://www.google.com/maps/embed?pb=!1m18!1m12!1m3!1d3500.8389774351086!2d77.2439!3d28.6092!2m3!1f0!2f0!3f0!3m2!1i1024!2i768!4f13.1!3m3!1m2!1s0x390cfd5b347f62e7%3A0x37205b715389640!2sPurana%20Qila!5e0!3m2!1sen!2sin!4v1648123456789!5m2!1sen!2sin',
+        'directions_url': 'https://www.google.com/maps/dir/?api=1&destination=Purana+Qila+Delhi'
+    },
+    'National War Memorial': {
+        'name': 'National War Memorial',
+        'short_description': 'A tribute to Indian soldiers',
+        'image_url': 'https://source.unsplash.com/1600x900/?national-war-memorial',
+        'history': '''The National War Memorial was inaugurated in 2019 to honor the soldiers who have 
+        served in the armed forces since India\'s independence. The memorial commemorates the sacrifices 
+        of over 25,942 soldiers who have laid down their lives for the nation.''',
+        'highlights': [
+            {
+                'title': 'Architecture',
+                'description': 'A modern architectural marvel with four concentric circles.'
+            },
+            {
+                'title': 'Amar Chakra',
+                'description': 'The innermost circle with the eternal flame.'
+            },
+            {
+                'title': 'Veerta Chakra',
+                'description': 'Gallantry award winners\' names inscribed on walls.'
+            }
+        ],
+        'timing': '9:00 AM - 7:30 PM (Open all days)',
+        'entry_fee': 'Free for all visitors',
+        'best_time': 'October to March (Winter Season)',
+        'virtual_tour_urls': [
+            'https://www.youtube.com/embed/dQw4w9WgXcQ'
+        ],
+        'map_url': 'https://www.google.com/maps/embed?pb=!1m18!1m12!1m3!1d3500.8389774351086!2d77.2295!3d28.6129!2m3!1f0!2f0!3f0!3m2!1i1024!2i768!4f13.1!3m3!1m2!1s0x390cfd5b347f62e7%3A0x37205b715389640!2sNational%20War%20Memorial!5e0!3m2!1sen!2sin!4v1648123456789!5m2!1sen!2sin',
+        'directions_url': 'https://www.google.com/maps/dir/?api=1&destination=National+War+Memorial+Delhi'
+    },
+    'Rashtrapati Bhavan': {
+        'name': 'Rashtrapati Bhavan',
+        'short_description': 'The official residence of the President of India',
+        'image_url': 'https://source.unsplash.com/1600x900/?rashtrapati-bhavan',
+        'history': '''Rashtrapati Bhavan was designed by British architects Edwin Lutyens and Herbert Baker. 
+        Construction began in 1912 and was completed in 1929. It was originally built as the Viceroy\'s House 
+        during British rule and became the President\'s residence after India\'s independence.''',
+        'highlights': [
+            {
+                'title': 'Architecture',
+                'description': 'A blend of Indian and Western architectural styles with 340 rooms.'
+            },
+            {
+                'title': 'Mughal Gardens',
+                'description': 'Beautiful gardens spread over 15 acres with rare flowers and plants.'
+            },
+            {
+                'title': 'Darbar Hall',
+                'description': 'The grand ceremonial hall used for official functions.'
+            }
+        ],
+        'timing': '9:00 AM - 4:00 PM (Closed on Mondays)',
+        'entry_fee': '₹15 for Indians, ₹30 for Foreigners',
+        'best_time': 'October to March (Winter Season)',
+        'virtual_tour_urls': [
+            'https://www.google.com/maps/embed?pb=!4v1648123456789!6m8!1m7!1sCAESLEdpbGxlcm9lR0FTRS1ldXdJR1JfYl9nS2dCbGdCbGdCbGdCbGdCbGdCbGc!2m2!1d28.6143!2d77.1990!3f0!4f0!5f0.7820865974627469'
+        ],
+        'map_url': 'https://www.google.com/maps/embed?pb=!1m18!1m12!1m3!1d3500.8389774351086!2d77.1990!3d28.6143!2m3!1f0!2f0!3f0!3m2!1i1024!2i768!4f13.1!3m3!1m2!1s0x390cfd5b347f62e7%3A0x37205b715389640!2sRashtrapati%20Bhavan!5e0!3m2!1sen!2sin!4v1648123456789!5m2!1sen!2sin',
+        'directions_url': 'https://www.google.com/maps/dir/?api=1&destination=Rashtrapati+Bhavan+Delhi'
+    },
+    'Raj Ghat': {
+        'name': 'Raj Ghat',
+        'short_description': 'Memorial to Mahatma Gandhi',
+        'image_url': 'https://source.unsplash.com/1600x900/?raj-ghat',
+        'history': '''Raj Ghat is a memorial dedicated to Mahatma Gandhi, marking the spot of his cremation 
+        on January 31, 1948. The memorial is a simple black marble platform with an eternal flame burning 
+        at one end. The memorial is surrounded by beautiful gardens.''',
+        'highlights': [
+            {
+                'title': 'Memorial Platform',
+                'description': 'A simple black marble platform marking the spot of Gandhi\'s cremation.'
+            },
+            {
+                'title': 'Eternal Flame',
+                'description': 'A flame that burns continuously in memory of the Father of the Nation.'
+            },
+            {
+                'title': 'Gardens',
+                'description': 'Beautiful gardens with trees planted by various world leaders.'
+            }
+        ],
+        'timing': '6:30 AM - 6:00 PM (Open all days)',
+        'entry_fee': 'Free for all visitors',
+        'best_time': 'October to March (Winter Season)',
+        'virtual_tour_urls': [
+            'https://www.youtube.com/embed/JSwo2f2xFNQ'
+        ],
+        'map_url': 'https://www.google.com/maps/embed?pb=!1m18!1m12!1m3!1d3500.8389774351086!2d77.2489!3d28.6415!2m3!1f0!2f0!3f0!3m2!1i1024!2i768!4f13.1!3m3!1m2!1s0x390cfd5b347f62e7%3A0x37205b715389640!2sRaj%20Ghat!5e0!3m2!1sen!2sin!4v1648123456789!5m2!1sen!2sin',
+        'directions_url': 'https://www.google.com/maps/dir/?api=1&destination=Raj+Ghat+Delhi'
+    },
+    'Jantar Mantar': {
+        'name': 'Jantar Mantar',
+        'short_description': 'An astronomical observatory',
+        'image_url': 'https://source.unsplash.com/1600x900/?jantar-mantar',
+        'history': '''Jantar Mantar was built by Maharaja Jai Singh II of Jaipur in 1724. It is one of five 
+        astronomical observatories built by him across India. The observatory was used to compile astronomical 
+        tables and predict the times and movements of the sun, moon, and planets.''',
+        'highlights': [
+            {
+                'title': 'Architecture',
+                'description': 'A collection of 13 architectural astronomy instruments.'
+            },
+            {
+                'title': 'Samrat Yantra',
+                'description': 'The world\'s largest sundial, accurate to within 20 seconds.'
+            },
+            {
+                'title': 'Rama Yantra',
+                'description': 'Used to measure the altitude and azimuth of celestial objects.'
+            }
+        ],
+        'timing': '9:00 AM - 4:30 PM (Open all days)',
+        'entry_fee': '₹20 for Indians, ₹40 for Foreigners',
+        'best_time': 'October to March (Winter Season)',
+        'virtual_tour_urls': [
+            'https://www.google.com/maps/embed?pb=!4v1648123456789!6m8!1m7!1sCAESLEdpbGxlcm9lR0FTRS1ldXdJR1JfYl9nS2dCbGdCbGdCbGdCbGdCbGdCbGc!2m2!1d28.6277!2d77.2167!3f0!4f0!5f0.7820865974627469'
+        ],
+        'map_url': 'https://www.google.com/maps/embed?pb=!1m18!1m12!1m3!1d3500.8389774351086!2d77.2167!3d28.6277!2m3!1f0!2f0!3f0!3m2!1i1024!2i768!4f13.1!3m3!1m2!1s0x390cfd5b347f62e7%3A0x37205b715389640!2sJantar%20Mantar!5e0!3m2!1sen!2sin!4v1648123456789!5m2!1sen!2sin',
+        'directions_url': 'https://www.google.com/maps/dir/?api=1&destination=Jantar+Mantar+Delhi'
+    },
+    'Akshardham Temple': {
+        'name': 'Akshardham Temple',
+        'short_description': 'A modern Hindu temple complex',
+        'image_url': 'https://source.unsplash.com/1600x900/?akshardham-temple',
+        'history': '''Akshardham Temple was inaugurated in 2005 by Pramukh Swami Maharaj. The temple complex 
+        showcases traditional Hindu and Indian culture, spirituality, and architecture. It was built using 
+        ancient architectural principles and modern technology.''',
+        'highlights': [
+            {
+                'title': 'Architecture',
+                'description': 'A stunning example of traditional Hindu architecture with intricate carvings.'
+            },
+            {
+                'title': 'Exhibitions',
+                'description': 'Interactive exhibitions showcasing Indian culture and spirituality.'
+            },
+            {
+                'title': 'Musical Fountain',
+                'description': 'A spectacular water show in the evening.'
+            }
+        ],
+        'timing': '9:30 AM - 6:30 PM (Closed on Mondays)',
+        'entry_fee': '₹15 for Indians, ₹30 for Foreigners',
+        'best_time': 'October to March (Winter Season)',
+        'virtual_tour_urls': [
+            'https://www.youtube.com/embed/DwsYVv36Vo0'
+        ],
+        'map_url': 'https://www.google.com/maps/embed?pb=!1m18!1m12!1m3!1d3500.8389774351086!2d77.2777!3d28.6129!2m3!1f0!2f0!3f0!3m2!1i1024!2i768!4f13.1!3m3!1m2!1s0x390cfd5b347f62e7%3A0x37205b715389640!2sAkshardham%20Temple!5e0!3m2!1sen!2sin!4v1648123456789!5m2!1sen!2sin',
+        'directions_url': 'https://www.google.com/maps/dir/?api=1&destination=Akshardham+Temple+Delhi'
+    },
+    'Lodi Gardens': {
+        'name': 'Lodi Gardens',
+        'short_description': 'A city park with historical monuments',
+        'image_url': 'https://source.unsplash.com/1600x900/?lodi-gardens',
+        'history': '''Lodi Gardens was built in 1936 by the British to preserve the tombs of the Sayyid and 
+        Lodi dynasties. The park was designed by Lady Willingdon, the wife of the Viceroy of India. It is 
+        now a popular recreational spot in Delhi.''',
+        'highlights': [
+            {
+                'title': 'Tombs',
+                'description': 'Several historical tombs from the Sayyid and Lodi periods.'
+            },
+            {
+                'title': 'Gardens',
+                'description': 'Beautiful landscaped gardens with rare trees and plants.'
+            },
+            {
+                'title': 'Architecture',
+                'description': 'Fine examples of Indo-Islamic architecture.'
+            }
+        ],
+        'timing': '6:00 AM - 8:00 PM (Open all days)',
+        'entry_fee': 'Free for all visitors',
+        'best_time': 'October to March (Winter Season)',
+        'virtual_tour_urls': [
+            'https://www.google.com/maps/embed?pb=!4v1648123456789!6m8!1m7!1sCAESLEdpbGxlcm9lR0FTRS1ldXdJR1JfYl9nS2dCbGdCbGdCbGdCbGdCbGdCbGc!2m2!1d28.5933!2d77.2197!3f0!4f0!5f0.7820865974627469'
+        ],
+        'map_url': 'https://www.google.com/maps/embed?pb=!1m18!1m12!1m3!1d3500.8389774351086!2d77.2197!3d28.5933!2m3!1f0!2f0!3f0!3m2!1i1024!2i768!4f13.1!3m3!1m2!1s0x390cfd5b347f62e7%3A0x37205b715389640!2sLodi%20Gardens!5e0!3m2!1sen!2sin!4v1648123456789!5m2!1sen!2sin',
+        'directions_url': 'https://www.google.com/maps/dir/?api=1&destination=Lodi+Gardens+Delhi'
+    }
+}
+
+# Other names visitors use for each monument, in addition to the catalog key and display name
+MONUMENT_ALIASES = {
+    'Red Fort': ['lal qila', 'lal quila', 'लाल किला', 'रेड फोर्ट'],
+    'Qutub Minar': ['qutb minar', 'qutab minar', 'kutub minar', 'कुतुब मीनार'],
+    'India Gate': ['all india war memorial', 'इंडिया गेट'],
+    'Taj Mahal': ['taj', 'ताज महल'],
+    'Lotus Temple': ['bahai temple', "baha'i house of worship", 'लोटस टेंपल', 'कमल मंदिर'],
+    'Jama Masjid': ['masjid-i jahan-numa', 'जामा मस्जिद'],
+    'Purana Qila': ['old fort', 'purana quila', 'पुराना किला'],
+    'National War Memorial': ['war memorial', 'राष्ट्रीय युद्ध स्मारक'],
+    'Rashtrapati Bhavan': ['rastrapati bhavan', 'presidents house', 'राष्ट्रपति भवन'],
+    'Raj Ghat': ['rajghat', 'राजघाट'],
+    'Jantar Mantar': ['जंतर मंतर'],
+    'Akshardham Temple': ['akshardham', 'swaminarayan akshardham', 'अक्षरधाम'],
+    'Lodi Gardens': ['lodhi gardens', 'lodi garden', 'लोधी गार्डन']
+}
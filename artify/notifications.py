@@ -0,0 +1,318 @@
+"""Transactional outbox for booking, parking and waitlist notifications.
+
+Whatever writes a booking or reservation also adds its Notification rows to
+the same session, so a confirmation exists exactly when the booking does and
+a crash after the commit cannot lose it. Messages are rendered when they are
+queued and never touch the request again: the sender (the notifications.send
+task, woken after each commit and run every minute by cron) claims due rows
+in batches and hands them to the transport configured for their channel.
+
+NOTIFY_TRANSPORTS maps each channel to a transport: 'file' writes the message
+under NOTIFY_OUTBOX_DIR, 'smtp' delivers email to NOTIFY_SMTP_HOST, which can
+be a local sink during development:
+
+    python -m aiosmtpd -n -l localhost:1025
+    python notifications.py send
+
+Failed deliveries are retried with backoff and given up after
+NOTIFY_MAX_ATTEMPTS. Delivery is at least once, a sender that dies between
+sending and committing resends that batch once its claim goes stale.
+"""
+import os
+import sys
+import uuid
+import smtplib
+import argparse
+from datetime import datetime, timedelta
+from email.message import EmailMessage
+
+from sqlalchemy import and_, or_, func
+
+from auth import db, create_script_app
+from jobs import enqueue, PRIORITY_HIGH
+from metrics import NOTIFICATIONS
+
+EMAIL, SMS = 'email', 'sms'
+PENDING, SENDING, SENT, FAILED = 'pending', 'sending', 'sent', 'failed'
+
+class Notification(db.Model):
+    __tablename__ = 'notifications'
+    __table_args__ = (db.Index('ix_notifications_due', 'status', 'next_attempt_at', 'id'),)
+
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=True, index=True)
+    kind = db.Column(db.String(50), nullable=False)  # booking_confirmed, parking_confirmed, ...
+    channel = db.Column(db.String(10), nullable=False)
+    recipient = db.Column(db.String(120), nullable=False)
+    subject = db.Column(db.String(200), nullable=True)  # Email only
+    body = db.Column(db.Text, nullable=False)
+    status = db.Column(db.String(20), nullable=False, default=PENDING)
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    next_attempt_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    claim_token = db.Column(db.String(32), nullable=True, index=True)
+    claimed_at = db.Column(db.DateTime, nullable=True)
+    last_error = db.Column(db.String(500), nullable=True)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    sent_at = db.Column(db.DateTime, nullable=True)
+
+class Transport:
+    """Delivers notifications of some channels. send() raises when the message was not delivered"""
+
+    name = None
+    channels = ()
+
+    def __init__(self, config):
+        self.config = config
+
+    def open(self):
+        """Set up what a batch shares, e.g. the SMTP connection"""
+
+    def close(self):
+        pass
+
+    def send(self, notification):
+        raise NotImplementedError
+
+def email_message(notification, sender):
+    message = EmailMessage()
+    message['From'] = sender
+    message['To'] = notification.recipient
+    message['Subject'] = notification.subject or ''
+    # Resending after a crash repeats the Message-ID, so mail clients can drop the duplicate
+    message['Message-ID'] = f'<notification-{notification.id}@artify>'
+    message.set_content(notification.body)
+    return message
+
+class FileTransport(Transport):
+    """Writes each message to NOTIFY_OUTBOX_DIR/<channel>/, .eml for email and .txt for SMS"""
+
+    name = 'file'
+    channels = (EMAIL, SMS)
+
+    def send(self, notification):
+        directory = os.path.join(self.config['NOTIFY_OUTBOX_DIR'], notification.channel)
+        os.makedirs(directory, exist_ok=True)
+        if notification.channel == EMAIL:
+            path = os.path.join(directory, f'{notification.id}.eml')
+            data = email_message(notification, self.config['NOTIFY_SENDER']).as_bytes()
+        else:
+            path = os.path.join(directory, f'{notification.id}.txt')
+            data = f'To: {notification.recipient}\n\n{notification.body}\n'.encode('utf-8')
+        # Named by id, a resent message replaces the file instead of adding another
+        tmp_path = f'{path}.{os.getpid()}.tmp'
+        with open(tmp_path, 'wb') as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+
+class SMTPTransport(Transport):
+    """Email over one SMTP connection per batch"""
+
+    name = 'smtp'
+    channels = (EMAIL,)
+
+    def open(self):
+        self.smtp = smtplib.SMTP(self.config['NOTIFY_SMTP_HOST'], self.config['NOTIFY_SMTP_PORT'],
+                                 timeout=self.config['NOTIFY_SMTP_TIMEOUT'])
+        if self.config.get('NOTIFY_SMTP_STARTTLS'):
+            self.smtp.starttls()
+        if self.config.get('NOTIFY_SMTP_USER'):
+            self.smtp.login(self.config['NOTIFY_SMTP_USER'], self.config.get('NOTIFY_SMTP_PASSWORD', ''))
+
+    def close(self):
+        try:
+            self.smtp.quit()
+        except smtplib.SMTPException:
+            self.smtp.close()
+
+    def send(self, notification):
+        self.smtp.send_message(email_message(notification, self.config['NOTIFY_SENDER']))
+
+TRANSPORTS = {
+    'file': FileTransport,
+    'smtp': SMTPTransport
+}
+
+_settings = {}
+
+def configure(config, instance_path):
+    """Fill in the NOTIFY_* defaults, shared by the site and the scripts that send"""
+    config.setdefault('NOTIFY_TRANSPORTS', {EMAIL: 'file', SMS: 'file'})
+    config.setdefault('NOTIFY_OUTBOX_DIR', os.path.join(instance_path, 'outbox'))
+    config.setdefault('NOTIFY_SENDER', 'Artify <no-reply@artify.local>')
+    config.setdefault('NOTIFY_BASE_URL', 'http://localhost:5000')
+    config.setdefault('NOTIFY_SMTP_HOST', 'localhost')
+    config.setdefault('NOTIFY_SMTP_PORT', 1025)
+    config.setdefault('NOTIFY_SMTP_TIMEOUT', 10)
+    config.setdefault('NOTIFY_MAX_ATTEMPTS', 8)
+    config.setdefault('NOTIFY_BATCH_SIZE', 100)
+    config.setdefault('NOTIFY_CLAIM_SECONDS', 300)
+    _settings.update(base_url=config['NOTIFY_BASE_URL'].rstrip('/'), config=config)
+
+def _link(path):
+    return f"{_settings.get('base_url', '')}{path}"
+
+def queue_notification(kind, channel, recipient, body, subject=None, user_id=None):
+    """Add a notification to the caller's transaction, it is sent once that commits"""
+    if not recipient:
+        return None
+    notification = Notification(kind=kind, channel=channel, recipient=recipient, subject=subject,
+                                body=body, user_id=user_id, status=PENDING)
+    db.session.add(notification)
+    return notification
+
+def send_soon():
+    """Wake the sender after a commit instead of waiting for its next cron run"""
+    enqueue('notifications.send', priority=PRIORITY_HIGH, unique_key='notifications.send')
+
+def booking_confirmed(booking, user):
+    queue_notification('booking_confirmed', EMAIL, user.email, user_id=user.id,
+                       subject=f'Your visit to {booking.monument} on {booking.visit_date}',
+                       body=(f'Hello {user.name},\n\n'
+                             f'Your booking #{booking.id} is confirmed.\n\n'
+                             f'Monument: {booking.monument}\n'
+                             f'Date: {booking.visit_date}\n'
+                             f'Time slot: {booking.time_slot}\n'
+                             f'Visitors: {booking.visitor_count or 1}\n'
+                             f'Amount paid: Rs. {booking.final_amount:.2f}\n\n'
+                             f'Show your ticket at the entrance: {_link(f"/tickets/booking/{booking.id}.png")}\n'))
+
+def parking_confirmed(reservation, user):
+    queue_notification('parking_confirmed', EMAIL, user.email, user_id=user.id,
+                       subject=f'Your parking at {reservation.monument} on {reservation.reservation_date}',
+                       body=(f'Hello {reservation.driver_name},\n\n'
+                             f'Your parking reservation #{reservation.id} is confirmed.\n\n'
+                             f'Monument: {reservation.monument}\n'
+                             f'Date: {reservation.reservation_date}\n'
+                             f'Vehicle: {reservation.vehicle_number} ({reservation.vehicle_type})\n'
+                             f'Duration: {reservation.duration} hours\n'
+                             f'Amount paid: Rs. {reservation.amount:.2f}\n\n'
+                             f'Show your ticket at the gate: {_link(f"/tickets/parking/{reservation.id}.png")}\n'))
+    queue_notification('parking_confirmed', SMS, reservation.phone, user_id=user.id,
+                       body=(f'Artify: parking #{reservation.id} at {reservation.monument} on '
+                             f'{reservation.reservation_date} for {reservation.vehicle_number} is confirmed.'))
+
+def group_confirmed(order, user, bookings, reservations):
+    queue_notification('group_confirmed', EMAIL, user.email, user_id=user.id,
+                       subject=f'Your group order {order.reference}',
+                       body=(f'Hello {user.name},\n\n'
+                             f'Your group order {order.reference} is confirmed: {bookings} booking(s) '
+                             f'and {reservations} parking reservation(s), Rs. {order.total_amount:.2f} in total.\n\n'
+                             f'Group ticket: {_link(f"/tickets/group/{order.id}.png")}\n'))
+
+def cancelled(record, user, what, refund=None):
+    """Tell the visitor a booking or reservation was cancelled, e.g. by a monument closure"""
+    refund_text = f'Rs. {refund.amount:.2f} will be refunded to your {refund.payment_method or "original payment method"}.' \
+        if refund else 'Nothing was charged.'
+    queue_notification('cancelled', EMAIL, user.email, user_id=user.id,
+                       subject=f'Your {what} #{record.id} at {record.monument} is cancelled',
+                       body=(f'Hello {user.name},\n\n'
+                             f'Your {what} #{record.id} at {record.monument} has been cancelled.\n'
+                             f'{refund_text}\n'))
+
+def waitlist_offer(entry, user, expires_at):
+    queue_notification('waitlist_offer', EMAIL, user.email, user_id=user.id,
+                       subject=f'Places are free at {entry.monument} on {entry.date}',
+                       body=(f'Hello {user.name},\n\n'
+                             f'{entry.visitor_count} place(s) for {entry.monument} on {entry.date}, '
+                             f'{entry.time_slot}, are held for you until '
+                             f'{expires_at.isoformat(" ", "minutes")} UTC.\n\n'
+                             f'Accept and pay: {_link(f"/waitlist/{entry.id}/accept")}\n'))
+
+def _claim_batch(batch_size, now):
+    """Take up to `batch_size` due notifications for this sender, stale claims included"""
+    stale = now - timedelta(seconds=_settings['config']['NOTIFY_CLAIM_SECONDS'])
+    due = or_(and_(Notification.status == PENDING, Notification.next_attempt_at <= now),
+              and_(Notification.status == SENDING, Notification.claimed_at < stale))
+    ids = db.session.query(Notification.id).filter(due).order_by(Notification.id).limit(batch_size).subquery()
+    token = uuid.uuid4().hex
+    # `due` again in the UPDATE, a row another sender claimed meanwhile no longer matches
+    Notification.query.filter(Notification.id.in_(db.session.query(ids.c.id)), due).update(
+        {Notification.status: SENDING, Notification.claim_token: token, Notification.claimed_at: now},
+        synchronize_session=False)
+    db.session.commit()
+    return Notification.query.filter_by(claim_token=token).order_by(Notification.id).all()
+
+def _transport(channel, transports, config):
+    if channel not in transports:
+        name = config['NOTIFY_TRANSPORTS'].get(channel)
+        transport_class = TRANSPORTS.get(name)
+        if transport_class is None or channel not in transport_class.channels:
+            raise RuntimeError(f"No transport configured for {channel} notifications")
+        transport = transport_class(config)
+        transport.open()
+        transports[channel] = transport
+    return transports[channel]
+
+def _deliver(batch, now):
+    config = _settings['config']
+    transports = {}
+    sent = failed = 0
+    try:
+        for notification in batch:
+            notification.attempts += 1
+            notification.claim_token = None
+            try:
+                _transport(notification.channel, transports, config).send(notification)
+            except Exception as e:
+                notification.last_error = str(e)[:500]
+                if notification.attempts >= config['NOTIFY_MAX_ATTEMPTS']:
+                    notification.status = FAILED
+                    failed += 1
+                else:
+                    notification.status = PENDING
+                    notification.next_attempt_at = now + timedelta(seconds=min(3600, 30 * 2 ** notification.attempts))
+                NOTIFICATIONS.inc(notification.channel, 'error')
+                continue
+            notification.status = SENT
+            notification.sent_at = datetime.utcnow()
+            sent += 1
+            NOTIFICATIONS.inc(notification.channel, SENT)
+    finally:
+        for transport in transports.values():
+            try:
+                transport.close()
+            except Exception as e:
+                print(f"Error closing {transport.name} transport: {str(e)}")
+        db.session.commit()
+    return sent, failed
+
+def deliver_pending(batch_size=None, now=None):
+    """Send every due notification, a batch at a time. Returns (sent, given up)"""
+    batch_size = batch_size or _settings['config']['NOTIFY_BATCH_SIZE']
+    sent = failed = 0
+    while True:
+        batch = _claim_batch(batch_size, now or datetime.utcnow())
+        if not batch:
+            return sent, failed
+        batch_sent, batch_failed = _deliver(batch, now or datetime.utcnow())
+        sent += batch_sent
+        failed += batch_failed
+        if len(batch) < batch_size:
+            return sent, failed
+
+def outbox_stats():
+    return {status: count for status, count in
+            db.session.query(Notification.status, func.count(Notification.id)).group_by(Notification.status)}
+
+def init_notifications(app):
+    configure(app.config, app.instance_path)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Send queued notifications')
+    parser.add_argument('command', choices=['send', 'stats'])
+    parser.add_argument('--batch-size', type=int)
+    args = parser.parse_args(argv)
+
+    app = create_script_app()
+    configure(app.config, app.instance_path)
+    with app.app_context():
+        db.create_all()
+        if args.command == 'stats':
+            print(outbox_stats())
+            return 0
+        sent, failed = deliver_pending(args.batch_size)
+    print(f"Sent {sent} notifications, gave up on {failed}")
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -9,7 +9,10 @@ if parent_dir not in sys.path:
 
 from flask_sqlalchemy import SQLAlchemy
 from datetime import datetime
-from auth import db, User
+from sqlalchemy import select
+from sqlalchemy.exc import IntegrityError
+from auth import db, User, CANCELLED_STATUSES
+from serializers import Serializer
 
 class ParkingSlot(db.Model):
     __tablename__ = 'parking_slots'
@@ -21,8 +24,17 @@ class ParkingSlot(db.Model):
     is_available = db.Column(db.Boolean, default=True)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
 
+# Reservations that hold their slot for the day
+ACTIVE_RESERVATION = db.text(f"payment_status NOT IN ({', '.join(repr(status) for status in CANCELLED_STATUSES)})")
+
 class ParkingReservation(db.Model):
     __tablename__ = 'parking_reservations'
+    __table_args__ = (
+        db.Index('ix_parking_reservations_user_created', 'user_id', 'created_at', 'id'),
+        # One active reservation per slot and day, whoever inserts second gets an IntegrityError
+        db.Index('uq_parking_reservations_slot_day', 'slot_id', 'reservation_date', unique=True,
+                 sqlite_where=ACTIVE_RESERVATION, postgresql_where=ACTIVE_RESERVATION),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
@@ -40,27 +52,25 @@ class ParkingReservation(db.Model):
     qr_code = db.Column(db.Text)  # Store QR code as base64 string
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    cancelled_at = db.Column(db.DateTime, nullable=True)
+    group_id = db.Column(db.Integer, db.ForeignKey('group_orders.id'), nullable=True, index=True)
 
     user = db.relationship('User', backref='parking_reservations')
     slot = db.relationship('ParkingSlot', backref='reservations')
 
     def to_dict(self):
-        return {
-            'id': self.id,
-            'user_id': self.user_id,
-            'monument': self.monument,
-            'vehicle_type': self.vehicle_type,
-            'vehicle_number': self.vehicle_number,
-            'driver_name': self.driver_name,
-            'phone': self.phone,
-            'reservation_date': self.reservation_date.strftime('%Y-%m-%d'),
-            'duration': self.duration,
-            'amount': self.amount,
-            'payment_status': self.payment_status,
-            'payment_method': self.payment_method,
-            'created_at': self.created_at.strftime('%Y-%m-%d %H:%M:%S'),
-            'updated_at': self.updated_at.strftime('%Y-%m-%d %H:%M:%S')
-        }
+        return reservation_serializer(self)
+
+reservation_serializer = Serializer(ParkingReservation, [
+    'id', 'user_id', 'monument', 'vehicle_type', 'vehicle_number', 'driver_name',
+    'phone', 'reservation_date', 'duration', 'amount', 'payment_status',
+    'payment_method', 'created_at', 'updated_at', 'cancelled_at', 'group_id'
+])
+
+# Shape the slot pickers expect
+parking_slot_serializer = Serializer(ParkingSlot, [
+    ('id', 'id'), ('number', 'slot_number'), ('type', 'vehicle_type'), ('available', 'is_available')
+])
 
 def init_parking_slots():
     """Initialize exactly 30 parking slots for each monument"""
@@ -97,9 +107,13 @@ def init_parking_slots():
         print(f"Error initializing parking slots: {str(e)}")
         return False
 
-def get_available_slots(monument, date, vehicle_type=None):
-    """Get available parking slots for a monument on a specific date"""
-    query = ParkingSlot.query.filter_by(
+def get_available_slots(monument, date, vehicle_type=None, columns=None):
+    """Get available parking slots for a monument on a specific date
+
+    Pass `columns` to select just those instead of loading ParkingSlot objects.
+    """
+    query = db.session.query(*columns) if columns else ParkingSlot.query
+    query = query.filter_by(
         monument=monument,
         is_available=True
     )
@@ -107,17 +121,32 @@ def get_available_slots(monument, date, vehicle_type=None):
     if vehicle_type:
         query = query.filter_by(vehicle_type=vehicle_type)
     
-    # Check reservations for the date
-    reserved_slots = ParkingReservation.query.filter_by(
-        monument=monument,
-        reservation_date=date
-    ).with_entities(ParkingReservation.slot_id).all()
-    
-    reserved_slot_ids = [r[0] for r in reserved_slots]
+    # Exclude slots reserved for the date in the same query, cancelled reservations free theirs
+    reserved_slot_ids = select(ParkingReservation.slot_id).where(
+        ParkingReservation.monument == monument,
+        ParkingReservation.reservation_date == date,
+        ParkingReservation.payment_status.notin_(CANCELLED_STATUSES)
+    )
     available_slots = query.filter(~ParkingSlot.id.in_(reserved_slot_ids)).all()
     
     return available_slots
 
+def claim_parking_space(reservation, spares=()):
+    """Insert `reservation` on its slot, or on the next of `spares` while the slot is taken.
+
+    Runs in a SAVEPOINT per attempt, so a lost race costs only that insert and
+    not the caller's transaction. Returns False once no slot is left.
+    """
+    while True:
+        try:
+            with db.session.begin_nested():
+                db.session.add(reservation)
+            return True
+        except IntegrityError:
+            if not spares:
+                return False
+            reservation.slot_id = spares.pop(0)
+
 def create_parking_reservation(user_id, monument, slot_id, vehicle_type, reservation_date, amount):
     """Create a new parking reservation"""
     try:
@@ -130,9 +159,10 @@ def create_parking_reservation(user_id, monument, slot_id, vehicle_type, reserva
             raise Exception("Parking slot is not available")
         
         # Check if the slot is already reserved for the date
-        existing_reservation = ParkingReservation.query.filter_by(
-            slot_id=slot_id,
-            reservation_date=reservation_date
+        existing_reservation = ParkingReservation.query.filter(
+            ParkingReservation.slot_id == slot_id,
+            ParkingReservation.reservation_date == reservation_date,
+            ParkingReservation.payment_status.notin_(CANCELLED_STATUSES)
         ).first()
         
         if existing_reservation:
@@ -0,0 +1,206 @@
+"""Occupancy-driven ticket and parking prices.
+
+A ticket costs the monument's base fee for Indian visitors times a multiplier
+read off PRICING_TICKET_CURVE at the slot's occupancy (TimeSlot.booked over
+capacity). Parking is priced per hour the same way from the share of a
+vehicle type's slots reserved for the day. Curves are lists of
+(occupancy, multiplier) points joined by straight lines, so quiet slots can
+be cheaper and the last places dearer, which nudges visitors off the peak.
+
+Prices for a (monument, date) are computed together in one query and cached.
+Committing a booking, reservation or time slot change drops the affected
+entries, and PRICING_CACHE_TTL bounds how stale another worker's copy can get,
+so quoting on the request path is a dictionary lookup.
+"""
+import time
+import threading
+from bisect import bisect_right
+from datetime import datetime
+
+from flask import request, jsonify
+from sqlalchemy import event, func
+from sqlalchemy.orm import Session
+
+from auth import db, Booking, TimeSlot, CANCELLED_STATUSES
+from parking import ParkingSlot, ParkingReservation
+from monuments import MONUMENTS_DATA
+from ratelimit import rate_limit
+from querytrace import query_budget
+
+DEFAULT_TICKET_CURVE = [(0.0, 0.9), (0.5, 1.0), (0.8, 1.2), (1.0, 1.5)]
+DEFAULT_PARKING_CURVE = [(0.0, 1.0), (0.6, 1.0), (0.9, 1.5), (1.0, 2.0)]
+DEFAULT_PARKING_RATES = {'2wheeler': 25, '4wheeler': 25, 'bus': 25}
+GUIDE_FEE = 300
+STUDENT_DISCOUNT = 0.30  # Off each student's ticket
+
+def parse_entry_fee(entry_fee):
+    """'₹25 for Indians, ₹50 for Foreigners' -> 25, anything else (like 'Free') -> 0"""
+    try:
+        return int(entry_fee.split('for Indians')[0].replace('₹', '').strip())
+    except (ValueError, AttributeError):
+        return 0
+
+BASE_TICKET_FEES = {key: parse_entry_fee(data.get('entry_fee')) for key, data in MONUMENTS_DATA.items()}
+
+class Curve:
+    """Piecewise-linear multiplier over occupancy in [0, 1]"""
+
+    def __init__(self, points):
+        points = sorted(points)
+        self.xs = [x for x, _ in points]
+        self.ys = [y for _, y in points]
+
+    def __call__(self, occupancy):
+        occupancy = min(max(occupancy, 0.0), 1.0)
+        i = bisect_right(self.xs, occupancy)
+        if i == 0:
+            return self.ys[0]
+        if i == len(self.xs):
+            return self.ys[-1]
+        x0, x1 = self.xs[i - 1], self.xs[i]
+        y0, y1 = self.ys[i - 1], self.ys[i]
+        return y0 + (y1 - y0) * (occupancy - x0) / (x1 - x0)
+
+class PriceCache:
+    """(kind, monument, date) -> prices, each entry loaded as a whole and expiring after `ttl`"""
+
+    def __init__(self, ttl):
+        self.ttl = ttl
+        self._entries = {}
+        self._lock = threading.Lock()
+
+    def get(self, key, loader):
+        entry = self._entries.get(key)
+        now = time.monotonic()
+        if entry is not None and entry[0] > now:
+            return entry[1]
+        prices = loader(*key[1:])
+        with self._lock:
+            self._entries[key] = (now + self.ttl, prices)
+        return prices
+
+    def invalidate(self, keys):
+        with self._lock:
+            for key in keys:
+                self._entries.pop(key, None)
+
+_settings = {
+    'ticket_curve': Curve(DEFAULT_TICKET_CURVE),
+    'parking_curve': Curve(DEFAULT_PARKING_CURVE),
+    'parking_rates': dict(DEFAULT_PARKING_RATES)
+}
+_cache = PriceCache(60)
+_parking_capacity = {}
+
+def load_ticket_prices(monument, date):
+    """Price of every time slot of a monument on a date, plus a 'default' for slots not created yet"""
+    base = BASE_TICKET_FEES.get(monument, 0)
+    curve = _settings['ticket_curve']
+    prices = {'default': round(base * curve(0.0))}
+    slots = db.session.query(TimeSlot.time_slot, TimeSlot.booked, TimeSlot.capacity).filter_by(
+        monument=monument, date=date)
+    for time_slot, booked, capacity in slots:
+        occupancy = (booked or 0) / capacity if capacity else 1.0
+        prices[time_slot] = round(base * curve(occupancy))
+    return prices
+
+def parking_capacity(monument):
+    """Slots per vehicle type, they only change when init_parking_slots runs"""
+    capacity = _parking_capacity.get(monument)
+    if capacity is None:
+        capacity = _parking_capacity[monument] = dict(
+            db.session.query(ParkingSlot.vehicle_type, func.count(ParkingSlot.id))
+            .filter_by(monument=monument, is_available=True)
+            .group_by(ParkingSlot.vehicle_type)
+            .all())
+    return capacity
+
+def load_parking_rates(monument, date):
+    """Hourly parking rate per vehicle type for a monument on a date"""
+    reserved = dict(
+        db.session.query(ParkingReservation.vehicle_type, func.count(ParkingReservation.id))
+        .filter_by(monument=monument, reservation_date=date)
+        .filter(ParkingReservation.payment_status.notin_(CANCELLED_STATUSES))
+        .group_by(ParkingReservation.vehicle_type)
+        .all())
+    capacity = parking_capacity(monument)
+    curve = _settings['parking_curve']
+    rates = {}
+    for vehicle_type, base in _settings['parking_rates'].items():
+        slots = capacity.get(vehicle_type)
+        occupancy = reserved.get(vehicle_type, 0) / slots if slots else 0.0
+        rates[vehicle_type] = round(base * curve(occupancy))
+    return rates
+
+def ticket_prices(monument, date):
+    return _cache.get(('tickets', monument, date), load_ticket_prices)
+
+def parking_rates(monument, date):
+    return _cache.get(('parking', monument, date), load_parking_rates)
+
+def quote_ticket(monument, date, time_slot):
+    """Current price of one ticket in a slot, in rupees"""
+    prices = ticket_prices(monument, date)
+    return prices.get(time_slot, prices['default'])
+
+def quote_parking(monument, date, vehicle_type):
+    """Current hourly parking rate for a vehicle type, in rupees"""
+    rates = parking_rates(monument, date)
+    return rates.get(vehicle_type, rates.get('4wheeler', DEFAULT_PARKING_RATES['4wheeler']))
+
+def ticket_total(price, visitor_count, student_count=0, need_guide=False):
+    """What a booking costs at `price` per visitor, with the student discount and guide fee"""
+    total = price * visitor_count - price * STUDENT_DISCOUNT * student_count
+    if need_guide:
+        total += GUIDE_FEE
+    return round(total, 2)
+
+@event.listens_for(Session, 'after_flush')
+def _collect_price_changes(session, flush_context):
+    keys = session.info.setdefault('stale_prices', set())
+    for obj in list(session.new) + list(session.dirty) + list(session.deleted):
+        if isinstance(obj, (Booking, TimeSlot)):
+            keys.add(('tickets', obj.monument, obj.visit_date if isinstance(obj, Booking) else obj.date))
+        elif isinstance(obj, ParkingReservation):
+            keys.add(('parking', obj.monument, obj.reservation_date))
+
+@event.listens_for(Session, 'after_commit')
+def _drop_stale_prices(session):
+    keys = session.info.pop('stale_prices', None)
+    if keys:
+        _cache.invalidate(keys)
+
+@event.listens_for(Session, 'after_rollback')
+def _forget_price_changes(session):
+    session.info.pop('stale_prices', None)
+
+def init_pricing(app):
+    global _cache
+    app.config.setdefault('PRICING_TICKET_CURVE', DEFAULT_TICKET_CURVE)
+    app.config.setdefault('PRICING_PARKING_CURVE', DEFAULT_PARKING_CURVE)
+    app.config.setdefault('PRICING_PARKING_RATES', DEFAULT_PARKING_RATES)
+    app.config.setdefault('PRICING_CACHE_TTL', 60)
+    _settings.update(
+        ticket_curve=Curve(app.config['PRICING_TICKET_CURVE']),
+        parking_curve=Curve(app.config['PRICING_PARKING_CURVE']),
+        parking_rates=dict(app.config['PRICING_PARKING_RATES'])
+    )
+    _cache = PriceCache(app.config['PRICING_CACHE_TTL'])
+
+    @app.route('/api/pricing')
+    @rate_limit('slots')
+    @query_budget(3)
+    def current_prices():
+        monument = request.args.get('monument')
+        if not monument:
+            return jsonify({'error': 'Missing required parameters'}), 400
+        try:
+            date = datetime.strptime(request.args.get('date', ''), '%Y-%m-%d').date()
+        except ValueError:
+            return jsonify({'error': 'Invalid date format'}), 400
+        return jsonify({
+            'monument': monument,
+            'date': date.isoformat(),
+            'tickets': ticket_prices(monument, date),
+            'parking_hourly': parking_rates(monument, date)
+        })
@@ -0,0 +1,242 @@
+"""Opt-in sampling profiler for slow requests.
+
+Enable with PROFILER_ENABLED = True. Each profiled request gets its stack
+sampled from a background thread while it runs; the samples and the SQL it
+executed are kept when the request was picked by PROFILER_SAMPLE_RATE or ran
+longer than PROFILER_SLOW_THRESHOLD seconds.
+
+Browse captured profiles with:
+
+    python profiler.py list [--endpoint process_payment]
+    python profiler.py show <id>
+    python profiler.py hot [--endpoint booking] [--limit 20]
+"""
+import os
+import sys
+import json
+import time
+import uuid
+import random
+import argparse
+import threading
+from collections import Counter
+from datetime import datetime
+
+from flask import request, g, has_app_context
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+MAX_STACK_DEPTH = 64
+MAX_SQL_STATEMENTS = 500
+
+class StackSampler:
+    """Background thread sampling the stacks of threads that are serving a request"""
+
+    def __init__(self, interval):
+        self.interval = interval
+        self._active = {}
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def start(self, thread_id):
+        samples = Counter()
+        with self._lock:
+            self._active[thread_id] = samples
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name='artify-profiler', daemon=True)
+                self._thread.start()
+        return samples
+
+    def stop(self, thread_id):
+        with self._lock:
+            return self._active.pop(thread_id, Counter())
+
+    def _run(self):
+        while True:
+            time.sleep(self.interval)
+            with self._lock:
+                if not self._active:
+                    continue
+                frames = sys._current_frames()
+                for thread_id, samples in self._active.items():
+                    frame = frames.get(thread_id)
+                    if frame is not None:
+                        samples[collapse_stack(frame)] += 1
+
+def collapse_stack(frame):
+    """Collapse a frame into 'file:function:line;...' from the outermost call inwards"""
+    stack = []
+    while frame is not None and len(stack) < MAX_STACK_DEPTH:
+        code = frame.f_code
+        stack.append(f'{os.path.basename(code.co_filename)}:{code.co_name}:{frame.f_lineno}')
+        frame = frame.f_back
+    return ';'.join(reversed(stack))
+
+class ProfileStore:
+    """Append-only JSON lines file, rotated by size like logging's RotatingFileHandler"""
+
+    def __init__(self, directory, max_bytes=10 * 1024 * 1024, backup_count=5):
+        self.directory = directory
+        self.path = os.path.join(directory, 'profiles.jsonl')
+        self.max_bytes = max_bytes
+        self.backup_count = backup_count
+        self._lock = threading.Lock()
+        if not os.path.exists(directory):
+            os.makedirs(directory)
+
+    def write(self, record):
+        line = json.dumps(record) + '\n'
+        with self._lock:
+            if os.path.exists(self.path) and os.path.getsize(self.path) + len(line) > self.max_bytes:
+                self._rotate()
+            with open(self.path, 'a') as f:
+                f.write(line)
+
+    def _rotate(self):
+        for i in range(self.backup_count - 1, 0, -1):
+            source = f'{self.path}.{i}'
+            if os.path.exists(source):
+                os.replace(source, f'{self.path}.{i + 1}')
+        if self.backup_count > 0:
+            os.replace(self.path, f'{self.path}.1')
+        else:
+            os.remove(self.path)
+
+    def records(self):
+        """Yield every stored profile, oldest file first"""
+        paths = [f'{self.path}.{i}' for i in range(self.backup_count, 0, -1)] + [self.path]
+        for path in paths:
+            if not os.path.exists(path):
+                continue
+            with open(path) as f:
+                for line in f:
+                    try:
+                        yield json.loads(line)
+                    except ValueError:
+                        continue
+
+@event.listens_for(Engine, 'before_cursor_execute')
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if has_app_context() and g.get('profile_sql') is not None:
+        conn.info.setdefault('profiler_start', []).append(time.perf_counter())
+
+@event.listens_for(Engine, 'after_cursor_execute')
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if not (has_app_context() and g.get('profile_sql') is not None and conn.info.get('profiler_start')):
+        return
+    elapsed = time.perf_counter() - conn.info['profiler_start'].pop()
+    if len(g.profile_sql) < MAX_SQL_STATEMENTS:
+        g.profile_sql.append({'statement': statement, 'duration_ms': round(elapsed * 1000, 3)})
+
+def init_profiler(app):
+    """Install the profiling hooks when PROFILER_ENABLED is set"""
+    app.config.setdefault('PROFILER_ENABLED', False)
+    app.config.setdefault('PROFILER_SAMPLE_RATE', 0.01)
+    app.config.setdefault('PROFILER_SLOW_THRESHOLD', 1.0)
+    app.config.setdefault('PROFILER_INTERVAL', 0.005)
+    app.config.setdefault('PROFILER_DIR', os.path.join(app.instance_path, 'profiles'))
+    app.config.setdefault('PROFILER_MAX_BYTES', 10 * 1024 * 1024)
+    app.config.setdefault('PROFILER_BACKUP_COUNT', 5)
+
+    if not app.config['PROFILER_ENABLED']:
+        return None
+
+    sampler = StackSampler(app.config['PROFILER_INTERVAL'])
+    store = ProfileStore(app.config['PROFILER_DIR'],
+                         app.config['PROFILER_MAX_BYTES'],
+                         app.config['PROFILER_BACKUP_COUNT'])
+
+    @app.before_request
+    def start_profile():
+        g.profile_start = time.perf_counter()
+        g.profile_sampled = random.random() < app.config['PROFILER_SAMPLE_RATE']
+        g.profile_sql = []
+        sampler.start(threading.get_ident())
+
+    @app.teardown_request
+    def finish_profile(exc):
+        if 'profile_start' not in g:
+            return
+        duration = time.perf_counter() - g.profile_start
+        samples = sampler.stop(threading.get_ident())
+        slow = duration >= app.config['PROFILER_SLOW_THRESHOLD']
+        if not (slow or g.profile_sampled):
+            return
+        try:
+            store.write({
+                'id': uuid.uuid4().hex[:12],
+                'timestamp': datetime.utcnow().strftime('%Y-%m-%d %H:%M:%S'),
+                'endpoint': request.endpoint or 'unmatched',
+                'method': request.method,
+                'path': request.path,
+                'error': str(exc) if exc else None,
+                'duration_ms': round(duration * 1000, 3),
+                'reason': 'slow' if slow else 'sampled',
+                'interval_ms': app.config['PROFILER_INTERVAL'] * 1000,
+                'samples': dict(samples),
+                'sql': g.profile_sql
+            })
+        except OSError as e:
+            print(f"Error writing profile: {str(e)}")
+
+    return store
+
+def hot_frames(records, limit=20):
+    """Aggregate samples into (self, total) counts per frame across records"""
+    self_counts = Counter()
+    total_counts = Counter()
+    for record in records:
+        for stack, count in record['samples'].items():
+            frames = stack.split(';')
+            self_counts[frames[-1]] += count
+            for frame in set(frames):
+                total_counts[frame] += count
+    return [(frame, self_counts[frame], total) for frame, total in total_counts.most_common(limit)]
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Browse captured request profiles')
+    parser.add_argument('--dir', default=os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                                      'instance', 'profiles'))
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    list_parser = subparsers.add_parser('list', help='list captured profiles')
+    list_parser.add_argument('--endpoint')
+
+    show_parser = subparsers.add_parser('show', help='show one profile')
+    show_parser.add_argument('id')
+
+    hot_parser = subparsers.add_parser('hot', help='aggregate the hottest frames')
+    hot_parser.add_argument('--endpoint')
+    hot_parser.add_argument('--limit', type=int, default=20)
+
+    args = parser.parse_args(argv)
+    store = ProfileStore(args.dir)
+    records = store.records()
+    if getattr(args, 'endpoint', None):
+        records = (r for r in records if r['endpoint'] == args.endpoint)
+
+    if args.command == 'list':
+        for record in records:
+            print(f"{record['id']}  {record['timestamp']}  {record['method']:<6} {record['path']:<32} "
+                  f"{record['duration_ms']:>10.1f} ms  {len(record['sql']):>4} sql  {record['reason']}")
+    elif args.command == 'show':
+        record = next((r for r in records if r['id'] == args.id), None)
+        if record is None:
+            print(f"Profile {args.id} not found")
+            return 1
+        print(f"{record['method']} {record['path']} ({record['endpoint']}) "
+              f"{record['duration_ms']} ms, {record['reason']}")
+        print("\nHot frames:")
+        for frame, self_count, total in hot_frames([record], limit=15):
+            print(f"  {self_count:>6} {total:>6}  {frame}")
+        print(f"\nSQL ({len(record['sql'])} statements):")
+        for query in record['sql']:
+            print(f"  {query['duration_ms']:>8.2f} ms  {' '.join(query['statement'].split())}")
+    else:
+        print(f"{'self':>6} {'total':>6}  frame")
+        for frame, self_count, total in hot_frames(records, args.limit):
+            print(f"{self_count:>6} {total:>6}  {frame}")
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,88 @@
+import re
+from collections import Counter
+
+from flask import request, g, has_app_context, current_app
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+_IN_LIST = re.compile(r'\((\s*\?\s*,)+\s*\?\s*\)')
+_LITERAL = re.compile(r"'(?:[^']|'')*'|\b\d+(?:\.\d+)?\b")
+_WHITESPACE = re.compile(r'\s+')
+
+class QueryBudgetExceeded(Exception):
+    """Raised in test mode when a route runs more SQL than it declared"""
+
+class NPlusOneDetected(Exception):
+    """Raised in test mode when a request repeats the same query shape too often"""
+
+def query_shape(statement):
+    """Normalize a statement so queries that differ only by parameters compare equal"""
+    shape = _WHITESPACE.sub(' ', statement).strip()
+    shape = _LITERAL.sub('?', shape)
+    return _IN_LIST.sub('(?)', shape)
+
+@event.listens_for(Engine, 'before_cursor_execute')
+def _trace_statement(conn, cursor, statement, parameters, context, executemany):
+    if has_app_context() and g.get('query_trace') is not None:
+        g.query_trace.append(query_shape(statement))
+
+def query_budget(max_queries):
+    """Declare the most SQL statements a view may run per request"""
+    def decorator(view):
+        # functools.wraps copies this attribute onto any decorator stacked above
+        view.query_budget = max_queries
+        return view
+    return decorator
+
+def repeated_shapes(trace, threshold):
+    """Query shapes that ran at least `threshold` times, most repeated first"""
+    return [(shape, count) for shape, count in Counter(trace).most_common() if count >= threshold]
+
+def check_request(trace, endpoint, budget, threshold):
+    """Return a list of problems found in one request's query trace"""
+    problems = []
+    if budget is not None and len(trace) > budget:
+        problems.append((QueryBudgetExceeded,
+                         f'{endpoint} ran {len(trace)} queries, budget is {budget}'))
+    for shape, count in repeated_shapes(trace, threshold):
+        problems.append((NPlusOneDetected,
+                         f'{endpoint} repeated a query {count} times (possible N+1): {shape}'))
+    return problems
+
+def init_query_tracer(app):
+    """Trace SQL per request and flag budget overruns and N+1 patterns.
+
+    Problems are printed as warnings. With TESTING and QUERYTRACE_STRICT set
+    (the default in tests) they raise instead, so a route that regresses into
+    an N+1 fails the test that exercises it.
+    """
+    app.config.setdefault('QUERYTRACE_ENABLED', True)
+    app.config.setdefault('QUERYTRACE_NPLUSONE_THRESHOLD', 5)
+    app.config.setdefault('QUERYTRACE_STRICT', True)
+
+    @app.before_request
+    def start_query_trace():
+        if current_app.config['QUERYTRACE_ENABLED']:
+            g.query_trace = []
+
+    @app.after_request
+    def check_query_trace(response):
+        trace = g.get('query_trace')
+        if trace is None:
+            return response
+        g.query_trace = None
+
+        view = current_app.view_functions.get(request.endpoint)
+        budget = getattr(view, 'query_budget', None)
+        problems = check_request(trace, request.endpoint or 'unmatched', budget,
+                                 current_app.config['QUERYTRACE_NPLUSONE_THRESHOLD'])
+
+        if current_app.debug or current_app.testing:
+            response.headers['X-Query-Count'] = str(len(trace))
+
+        if problems and current_app.testing and current_app.config['QUERYTRACE_STRICT']:
+            error_type, message = problems[0]
+            raise error_type('; '.join(message for _, message in problems))
+        for _, message in problems:
+            print(f"Query trace warning: {message}")
+        return response
@@ -0,0 +1,226 @@
+import os
+import time
+import sqlite3
+import threading
+from functools import wraps
+
+from flask import request, session, jsonify, current_app
+
+# Named rate limit policies. Each scope maps to (tokens per second, bucket size).
+# 'user' buckets are keyed on the logged in user, 'ip' on the client address and
+# 'route' is one bucket shared by every caller of the endpoint.
+DEFAULT_POLICIES = {
+    'slots': {
+        'user': (5, 20),
+        'ip': (10, 40),
+        'route': (200, 400)
+    },
+    'booking': {
+        'user': (1, 10),
+        'ip': (2, 20),
+        'route': (50, 100)
+    },
+    'payment': {
+        'user': (0.5, 5),
+        'ip': (1, 10),
+        'route': (25, 50)
+    },
+    'speech': {
+        'user': (0.2, 3),
+        'ip': (0.5, 5),
+        'route': (4, 8)
+    },
+    'history': {
+        'user': (2, 20),
+        'ip': (5, 40),
+        'route': (100, 200)
+    }
+}
+
+class MemoryStore:
+    """Token buckets held in process memory, guarded by a single lock"""
+
+    def __init__(self, max_keys=100000):
+        self.max_keys = max_keys
+        self._buckets = {}
+        self._lock = threading.Lock()
+
+    def consume(self, limits, cost=1):
+        """Take `cost` tokens from every bucket in `limits` or from none of them.
+
+        `limits` is a list of (key, rate, capacity). Returns (allowed, retry_after).
+        """
+        now = time.monotonic()
+        with self._lock:
+            updated = []
+            retry_after = 0.0
+            for key, rate, capacity in limits:
+                tokens, last = self._buckets.get(key, (capacity, now))
+                tokens = min(capacity, tokens + (now - last) * rate)
+                if tokens < cost:
+                    retry_after = max(retry_after, (cost - tokens) / rate)
+                updated.append((key, tokens))
+
+            if retry_after:
+                for key, tokens in updated:
+                    self._buckets[key] = (tokens, now)
+                return False, retry_after
+
+            for key, tokens in updated:
+                self._buckets[key] = (tokens - cost, now)
+
+            if len(self._buckets) > self.max_keys:
+                self._prune(now)
+            return True, 0.0
+
+    def _prune(self, now):
+        # Buckets idle for a minute are refilled anyway, dropping them loses nothing
+        stale = [key for key, (_, last) in self._buckets.items() if now - last > 60]
+        for key in stale:
+            del self._buckets[key]
+
+    def reset(self):
+        with self._lock:
+            self._buckets.clear()
+
+class SQLiteStore:
+    """Token buckets in a SQLite file so every worker process shares the same limits"""
+
+    def __init__(self, path):
+        self.path = path
+        self._local = threading.local()
+        conn = self._connect()
+        conn.execute(
+            'CREATE TABLE IF NOT EXISTS rate_limit_buckets ('
+            'key TEXT PRIMARY KEY, tokens REAL NOT NULL, updated REAL NOT NULL)'
+        )
+        conn.commit()
+
+    def _connect(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            self._local.conn = conn
+        return conn
+
+    def consume(self, limits, cost=1):
+        # Wall clock time because the buckets are shared between processes
+        now = time.time()
+        conn = self._connect()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            updated = []
+            retry_after = 0.0
+            for key, rate, capacity in limits:
+                row = conn.execute(
+                    'SELECT tokens, updated FROM rate_limit_buckets WHERE key = ?', (key,)
+                ).fetchone()
+                tokens, last = row if row else (capacity, now)
+                tokens = min(capacity, tokens + max(0.0, now - last) * rate)
+                if tokens < cost:
+                    retry_after = max(retry_after, (cost - tokens) / rate)
+                updated.append((key, tokens))
+
+            allowed = not retry_after
+            conn.executemany(
+                'INSERT OR REPLACE INTO rate_limit_buckets (key, tokens, updated) VALUES (?, ?, ?)',
+                [(key, tokens - cost if allowed else tokens, now) for key, tokens in updated]
+            )
+            conn.execute('COMMIT')
+            return allowed, retry_after
+        except Exception:
+            conn.execute('ROLLBACK')
+            raise
+
+    def reset(self):
+        conn = self._connect()
+        conn.execute('DELETE FROM rate_limit_buckets')
+
+_store = None
+
+def check_policies(overrides):
+    """Raise ValueError for a bucket that could never refill, before a request divides by its rate"""
+    for name in set(DEFAULT_POLICIES) | set(overrides):
+        policy = dict(DEFAULT_POLICIES.get(name, {}), **overrides.get(name, {}))
+        for scope, (rate, capacity) in policy.items():
+            if rate <= 0 or capacity <= 0:
+                raise ValueError(f"Rate limit {name}.{scope} needs a positive rate and capacity, "
+                                 f"got {rate} and {capacity}")
+
+def init_rate_limiter(app):
+    """Configure the rate limit store for the app.
+
+    RATELIMIT_STORAGE is 'memory' (default, per process) or 'sqlite' to share
+    buckets between workers through RATELIMIT_SQLITE_PATH.
+    """
+    global _store
+    app.config.setdefault('RATELIMIT_ENABLED', True)
+    app.config.setdefault('RATELIMIT_STORAGE', 'memory')
+    app.config.setdefault('RATELIMIT_POLICIES', {})
+    check_policies(app.config['RATELIMIT_POLICIES'])
+
+    if app.config['RATELIMIT_STORAGE'] == 'sqlite':
+        path = app.config.get('RATELIMIT_SQLITE_PATH') or os.path.join(app.instance_path, 'ratelimit.db')
+        _store = SQLiteStore(path)
+    else:
+        _store = MemoryStore()
+    return _store
+
+def get_policy(name):
+    """Return the policy for `name`, with any overrides from app config applied"""
+    policy = dict(DEFAULT_POLICIES.get(name, {}))
+    policy.update(current_app.config.get('RATELIMIT_POLICIES', {}).get(name, {}))
+    return policy
+
+def client_ip():
+    # Only trust the first X-Forwarded-For hop when running behind our own proxy
+    if current_app.config.get('RATELIMIT_TRUST_PROXY'):
+        forwarded = request.headers.get('X-Forwarded-For', '')
+        if forwarded:
+            return forwarded.split(',')[0].strip()
+    return request.remote_addr or 'unknown'
+
+def bucket_limits(name, policy):
+    """Build the (key, rate, capacity) list for the current request"""
+    limits = []
+    if 'user' in policy and 'user_id' in session:
+        rate, capacity = policy['user']
+        limits.append((f'{name}:user:{session["user_id"]}', rate, capacity))
+    if 'ip' in policy:
+        rate, capacity = policy['ip']
+        limits.append((f'{name}:ip:{client_ip()}', rate, capacity))
+    if 'route' in policy:
+        rate, capacity = policy['route']
+        limits.append((f'{name}:route:{request.endpoint}', rate, capacity))
+    return limits
+
+def rate_limit(name, cost=1):
+    """Reject the request with 429 before the view runs once any bucket is empty"""
+    def decorator(view):
+        @wraps(view)
+        def wrapped(*args, **kwargs):
+            if _store is None or not current_app.config.get('RATELIMIT_ENABLED', True):
+                return view(*args, **kwargs)
+
+            limits = bucket_limits(name, get_policy(name))
+            try:
+                allowed, retry_after = _store.consume(limits, cost)
+            except sqlite3.Error as e:
+                # Fail open, a broken limiter store must not take the site down
+                print(f"Rate limiter error: {str(e)}")
+                return view(*args, **kwargs)
+
+            if not allowed:
+                response = jsonify({
+                    'success': False,
+                    'error': 'Too many requests. Please try again later.'
+                })
+                response.status_code = 429
+                response.headers['Retry-After'] = str(max(1, int(retry_after + 0.999)))
+                return response
+
+            return view(*args, **kwargs)
+        return wrapped
+    return decorator
@@ -0,0 +1,377 @@
+"""Admin reporting from incrementally maintained rollups.
+
+Every flush that adds, changes or deletes a booking or parking reservation
+applies the difference it makes to one row per (monument, date, time slot)
+in booking_rollups, or per (monument, date, vehicle type) in parking_rollups,
+inside the same transaction. Reports read those rows only, so their cost
+depends on the date range asked for, not on how many bookings exist.
+
+Recompute the rollups from the source tables (after a restore or a manual
+fix in the database) with:
+
+    python reporting.py rebuild
+"""
+import io
+import csv
+import sys
+import argparse
+from datetime import datetime, timedelta
+from functools import wraps
+
+from flask import Response, request, session, jsonify
+from sqlalchemy import event, func, inspect, and_
+from sqlalchemy.orm import Session
+
+from auth import db, create_script_app, User, Booking, TimeSlot, CANCELLED_STATUSES
+from parking import ParkingSlot, ParkingReservation
+from querytrace import query_budget
+from archive import with_archive
+
+MAX_REPORT_DAYS = 366
+
+class BookingRollup(db.Model):
+    __tablename__ = 'booking_rollups'
+    __table_args__ = (db.UniqueConstraint('date', 'monument', 'time_slot'),)
+
+    id = db.Column(db.Integer, primary_key=True)
+    monument = db.Column(db.String(100), nullable=False)
+    date = db.Column(db.Date, nullable=False)
+    time_slot = db.Column(db.String(20), nullable=False)
+    bookings = db.Column(db.Integer, nullable=False, default=0)
+    visitors = db.Column(db.Integer, nullable=False, default=0)
+    students = db.Column(db.Integer, nullable=False, default=0)
+    paid_bookings = db.Column(db.Integer, nullable=False, default=0)
+    revenue = db.Column(db.Float, nullable=False, default=0.0)
+    cancelled = db.Column(db.Integer, nullable=False, default=0)
+    refunded = db.Column(db.Float, nullable=False, default=0.0)
+
+class ParkingRollup(db.Model):
+    __tablename__ = 'parking_rollups'
+    __table_args__ = (db.UniqueConstraint('date', 'monument', 'vehicle_type'),)
+
+    id = db.Column(db.Integer, primary_key=True)
+    monument = db.Column(db.String(100), nullable=False)
+    date = db.Column(db.Date, nullable=False)
+    vehicle_type = db.Column(db.String(20), nullable=False)
+    reservations = db.Column(db.Integer, nullable=False, default=0)
+    hours = db.Column(db.Integer, nullable=False, default=0)
+    paid_reservations = db.Column(db.Integer, nullable=False, default=0)
+    revenue = db.Column(db.Float, nullable=False, default=0.0)
+    cancelled = db.Column(db.Integer, nullable=False, default=0)
+    refunded = db.Column(db.Float, nullable=False, default=0.0)
+
+# Cancelled bookings and reservations only count towards `cancelled` and `refunded`
+
+def booking_contribution(values):
+    paid = values['payment_status'] == 'completed'
+    active = values['payment_status'] not in CANCELLED_STATUSES
+    key = (values['monument'], values['visit_date'], values['time_slot'])
+    return key, {
+        'bookings': 1 if active else 0,
+        'visitors': (values['visitor_count'] or 1) if active else 0,
+        'students': (values['student_count'] or 0) if active else 0,
+        'paid_bookings': 1 if paid else 0,
+        'revenue': (values['final_amount'] or 0.0) if paid else 0.0,
+        'cancelled': 0 if active else 1,
+        'refunded': (values['final_amount'] or 0.0) if values['payment_status'] == 'refunded' else 0.0
+    }
+
+def parking_contribution(values):
+    paid = values['payment_status'] == 'completed'
+    active = values['payment_status'] not in CANCELLED_STATUSES
+    key = (values['monument'], values['reservation_date'], values['vehicle_type'])
+    return key, {
+        'reservations': 1 if active else 0,
+        'hours': (values['duration'] or 0) if active else 0,
+        'paid_reservations': 1 if paid else 0,
+        'revenue': (values['amount'] or 0.0) if paid else 0.0,
+        'cancelled': 0 if active else 1,
+        'refunded': (values['amount'] or 0.0) if values['payment_status'] == 'refunded' else 0.0
+    }
+
+# Source model -> (rollup model, columns the contribution reads, contribution function)
+ROLLUPS = {
+    Booking: (BookingRollup, ('monument', 'visit_date', 'time_slot', 'visitor_count', 'student_count',
+                              'payment_status', 'final_amount'), booking_contribution),
+    ParkingReservation: (ParkingRollup, ('monument', 'reservation_date', 'vehicle_type', 'duration',
+                                         'payment_status', 'amount'), parking_contribution)
+}
+
+def _load_previous_value(target, value, oldvalue, initiator):
+    pass
+
+# Setting an expired attribute normally skips loading the value it replaces,
+# which the subtracting half of a delta needs
+for model, (_, columns, _) in ROLLUPS.items():
+    for name in columns:
+        event.listen(getattr(model, name), 'set', _load_previous_value, active_history=True)
+
+ROLLUP_KEYS = {
+    BookingRollup: ('monument', 'date', 'time_slot'),
+    ParkingRollup: ('monument', 'date', 'vehicle_type')
+}
+
+def _values(obj, columns, previous=False):
+    """Column values of `obj`, as they were loaded from the database when `previous` is set"""
+    if not previous:
+        return {name: getattr(obj, name) for name in columns}
+    attrs = inspect(obj).attrs
+    values = {}
+    for name in columns:
+        history = attrs[name].history
+        if history.deleted:
+            values[name] = history.deleted[0]
+        elif history.unchanged:
+            values[name] = history.unchanged[0]
+        else:
+            values[name] = getattr(obj, name)
+    return values
+
+def _add(deltas, rollup, key, counts, sign):
+    entry = deltas.setdefault((rollup, key), dict.fromkeys(counts, 0))
+    for name, value in counts.items():
+        entry[name] += sign * value
+
+def _upsert(connection, rollup, key, counts):
+    if connection.dialect.name == 'postgresql':
+        from sqlalchemy.dialects.postgresql import insert
+    else:
+        from sqlalchemy.dialects.sqlite import insert
+    table = rollup.__table__
+    key_columns = ROLLUP_KEYS[rollup]
+    statement = insert(table).values(**dict(zip(key_columns, key)), **counts)
+    statement = statement.on_conflict_do_update(
+        index_elements=[table.c[name] for name in key_columns],
+        set_={name: table.c[name] + statement.excluded[name] for name in counts}
+    )
+    connection.execute(statement)
+
+@event.listens_for(Session, 'after_flush')
+def update_rollups(session, flush_context):
+    """Fold the flushed bookings and reservations into the rollups, in the same transaction"""
+    deltas = {}
+    for obj in session.new:
+        spec = ROLLUPS.get(type(obj))
+        if spec:
+            rollup, columns, contribution = spec
+            _add(deltas, rollup, *contribution(_values(obj, columns)), 1)
+    for obj in session.dirty:
+        spec = ROLLUPS.get(type(obj))
+        if spec and session.is_modified(obj, include_collections=False):
+            rollup, columns, contribution = spec
+            _add(deltas, rollup, *contribution(_values(obj, columns, previous=True)), -1)
+            _add(deltas, rollup, *contribution(_values(obj, columns)), 1)
+    for obj in session.deleted:
+        spec = ROLLUPS.get(type(obj))
+        if spec:
+            rollup, columns, contribution = spec
+            _add(deltas, rollup, *contribution(_values(obj, columns, previous=True)), -1)
+
+    if not deltas:
+        return
+    connection = session.connection()
+    for (rollup, key), counts in deltas.items():
+        if any(counts.values()):
+            _upsert(connection, rollup, key, counts)
+
+def rebuild_rollups():
+    """Recompute both rollup tables from bookings and parking reservations, archived ones included"""
+    bookings = with_archive(Booking.__table__).c
+    paid = bookings.payment_status == 'completed'
+    active = bookings.payment_status.notin_(CANCELLED_STATUSES)
+    refunded = bookings.payment_status == 'refunded'
+    booking_rows = (db.session.query(
+            bookings.monument, bookings.visit_date, bookings.time_slot,
+            func.sum(db.case((active, 1), else_=0)),
+            func.coalesce(func.sum(db.case((active, bookings.visitor_count), else_=0)), 0),
+            func.coalesce(func.sum(db.case((active, bookings.student_count), else_=0)), 0),
+            func.sum(db.case((paid, 1), else_=0)),
+            func.coalesce(func.sum(db.case((paid, bookings.final_amount), else_=0.0)), 0.0),
+            func.sum(db.case((active, 0), else_=1)),
+            func.coalesce(func.sum(db.case((refunded, bookings.final_amount), else_=0.0)), 0.0))
+        .group_by(bookings.monument, bookings.visit_date, bookings.time_slot)
+        .all())
+
+    reservations = with_archive(ParkingReservation.__table__).c
+    paid = reservations.payment_status == 'completed'
+    active = reservations.payment_status.notin_(CANCELLED_STATUSES)
+    refunded = reservations.payment_status == 'refunded'
+    parking_rows = (db.session.query(
+            reservations.monument, reservations.reservation_date, reservations.vehicle_type,
+            func.sum(db.case((active, 1), else_=0)),
+            func.coalesce(func.sum(db.case((active, reservations.duration), else_=0)), 0),
+            func.sum(db.case((paid, 1), else_=0)),
+            func.coalesce(func.sum(db.case((paid, reservations.amount), else_=0.0)), 0.0),
+            func.sum(db.case((active, 0), else_=1)),
+            func.coalesce(func.sum(db.case((refunded, reservations.amount), else_=0.0)), 0.0))
+        .group_by(reservations.monument, reservations.reservation_date, reservations.vehicle_type)
+        .all())
+
+    # Bulk statements, these tables can hold a row for every slot of every day
+    db.session.execute(BookingRollup.__table__.delete())
+    db.session.execute(ParkingRollup.__table__.delete())
+    if booking_rows:
+        db.session.execute(BookingRollup.__table__.insert(), [
+            dict(monument=row[0], date=row[1], time_slot=row[2], bookings=row[3], visitors=row[4],
+                 students=row[5], paid_bookings=row[6], revenue=row[7], cancelled=row[8], refunded=row[9])
+            for row in booking_rows
+        ])
+    if parking_rows:
+        db.session.execute(ParkingRollup.__table__.insert(), [
+            dict(monument=row[0], date=row[1], vehicle_type=row[2], reservations=row[3], hours=row[4],
+                 paid_reservations=row[5], revenue=row[6], cancelled=row[7], refunded=row[8])
+            for row in parking_rows
+        ])
+    db.session.commit()
+    return len(booking_rows), len(parking_rows)
+
+def admin_required(view):
+    """Only let signed-in admins through, everyone else gets a 403"""
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        user_id = session.get('user_id')
+        is_admin = user_id is not None and db.session.query(User.is_admin).filter_by(id=user_id).scalar()
+        if not is_admin:
+            return jsonify({'error': 'Admin access required'}), 403
+        return view(*args, **kwargs)
+    return wrapper
+
+def report_range():
+    """(start, end, monument) from the query string, the last 7 days by default"""
+    end = datetime.strptime(request.args['end'], '%Y-%m-%d').date() if request.args.get('end') \
+        else datetime.utcnow().date()
+    start = datetime.strptime(request.args['start'], '%Y-%m-%d').date() if request.args.get('start') \
+        else end - timedelta(days=6)
+    if start > end or (end - start).days >= MAX_REPORT_DAYS:
+        raise ValueError(f'Reports cover 1 to {MAX_REPORT_DAYS} days')
+    return start, end, request.args.get('monument')
+
+def booking_report(start, end, monument=None):
+    """Per (monument, date, slot) footfall and revenue, with the slot's capacity when known"""
+    slot_match = and_(TimeSlot.monument == BookingRollup.monument,
+                      TimeSlot.date == BookingRollup.date,
+                      TimeSlot.time_slot == BookingRollup.time_slot)
+    query = (db.session.query(BookingRollup, TimeSlot.capacity)
+             .outerjoin(TimeSlot, slot_match)
+             .filter(BookingRollup.date.between(start, end), BookingRollup.bookings + BookingRollup.cancelled > 0))
+    if monument:
+        query = query.filter(BookingRollup.monument == monument)
+    rows = []
+    for rollup, capacity in query.order_by(BookingRollup.date, BookingRollup.monument, BookingRollup.time_slot):
+        rows.append({
+            'date': rollup.date.isoformat(),
+            'monument': rollup.monument,
+            'time_slot': rollup.time_slot,
+            'bookings': rollup.bookings,
+            'visitors': rollup.visitors,
+            'students': rollup.students,
+            'paid_bookings': rollup.paid_bookings,
+            'revenue': round(rollup.revenue, 2),
+            'cancelled': rollup.cancelled,
+            'refunded': round(rollup.refunded, 2),
+            'capacity': capacity,
+            'occupancy': round(rollup.visitors / capacity, 3) if capacity else None
+        })
+    return rows
+
+def parking_report(start, end, monument=None):
+    """Per (monument, date, vehicle type) reservations and revenue against the slots on offer"""
+    query = (db.session.query(ParkingRollup)
+             .filter(ParkingRollup.date.between(start, end), ParkingRollup.reservations + ParkingRollup.cancelled > 0))
+    if monument:
+        query = query.filter(ParkingRollup.monument == monument)
+    # A few dozen rows however many reservations exist
+    capacity = dict(((row[0], row[1]), row[2]) for row in db.session.query(
+        ParkingSlot.monument, ParkingSlot.vehicle_type, func.count(ParkingSlot.id))
+        .group_by(ParkingSlot.monument, ParkingSlot.vehicle_type))
+    rows = []
+    for rollup in query.order_by(ParkingRollup.date, ParkingRollup.monument, ParkingRollup.vehicle_type):
+        slots = capacity.get((rollup.monument, rollup.vehicle_type))
+        rows.append({
+            'date': rollup.date.isoformat(),
+            'monument': rollup.monument,
+            'vehicle_type': rollup.vehicle_type,
+            'reservations': rollup.reservations,
+            'hours': rollup.hours,
+            'paid_reservations': rollup.paid_reservations,
+            'revenue': round(rollup.revenue, 2),
+            'cancelled': rollup.cancelled,
+            'refunded': round(rollup.refunded, 2),
+            'slots': slots,
+            'utilization': round(rollup.reservations / slots, 3) if slots else None
+        })
+    return rows
+
+def summary_report(start, end, monument=None):
+    """Totals per monument over the range, summed from the rollups in SQL"""
+    bookings = (db.session.query(
+            BookingRollup.monument, func.sum(BookingRollup.bookings), func.sum(BookingRollup.visitors),
+            func.sum(BookingRollup.students), func.sum(BookingRollup.revenue))
+        .filter(BookingRollup.date.between(start, end))
+        .group_by(BookingRollup.monument))
+    parking = (db.session.query(
+            ParkingRollup.monument, func.sum(ParkingRollup.reservations), func.sum(ParkingRollup.revenue))
+        .filter(ParkingRollup.date.between(start, end))
+        .group_by(ParkingRollup.monument))
+    if monument:
+        bookings = bookings.filter(BookingRollup.monument == monument)
+        parking = parking.filter(ParkingRollup.monument == monument)
+
+    totals = {}
+    empty = {'bookings': 0, 'visitors': 0, 'students': 0, 'ticket_revenue': 0.0,
+             'parking_reservations': 0, 'parking_revenue': 0.0}
+    for name, count, visitors, students, revenue in bookings:
+        totals.setdefault(name, dict(empty)).update(
+            bookings=count, visitors=visitors, students=students, ticket_revenue=round(revenue, 2))
+    for name, count, revenue in parking:
+        totals.setdefault(name, dict(empty)).update(parking_reservations=count, parking_revenue=round(revenue, 2))
+    return [dict(monument=name, **values) for name, values in sorted(totals.items())]
+
+def report_response(rows, name, start, end):
+    """JSON by default, CSV with ?format=csv"""
+    if request.args.get('format') != 'csv':
+        return jsonify({'start': start.isoformat(), 'end': end.isoformat(), 'rows': rows})
+    output = io.StringIO()
+    if rows:
+        writer = csv.DictWriter(output, fieldnames=list(rows[0]))
+        writer.writeheader()
+        writer.writerows(rows)
+    return Response(output.getvalue(), mimetype='text/csv', headers={
+        'Content-Disposition': f'attachment; filename={name}_{start.isoformat()}_{end.isoformat()}.csv'
+    })
+
+REPORTS = {
+    'bookings': booking_report,
+    'parking': parking_report,
+    'summary': summary_report
+}
+
+def init_reporting(app):
+    @app.route('/admin/reports/<name>')
+    @query_budget(3)
+    @admin_required
+    def admin_report(name):
+        report = REPORTS.get(name)
+        if report is None:
+            return jsonify({'error': 'Unknown report'}), 404
+        try:
+            start, end, monument = report_range()
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        return report_response(report(start, end, monument), name, start, end)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Maintain the reporting rollups')
+    parser.add_argument('command', choices=['rebuild'])
+    parser.parse_args(argv)
+
+    app = create_script_app()
+
+    with app.app_context():
+        db.create_all()
+        bookings, parking = rebuild_rollups()
+    print(f"Rebuilt {bookings} booking and {parking} parking rollup rows")
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
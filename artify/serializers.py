@@ -0,0 +1,188 @@
+"""Model serialization.
+
+A Serializer is compiled once per model into a plain function that builds the
+output dict with direct attribute reads, dates formatted without strftime.
+The same function accepts ORM objects and the rows of a column-projection
+query (SQLAlchemy rows expose columns as attributes), so list endpoints can
+select just `serializer.columns` and skip building ORM objects altogether:
+
+    rows = db.session.query(*timeslot_serializer.columns).filter_by(...).all()
+    return jsonify(timeslot_serializer.many(rows))
+
+init_serialization() swaps Flask's JSON provider for orjson when installed.
+Compare the paths with:
+
+    python serializers.py --benchmark 20000
+"""
+import sys
+import time
+import argparse
+from datetime import date, datetime
+
+from flask.json.provider import DefaultJSONProvider
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+def _date(value):
+    return value.isoformat() if value is not None else None
+
+def _datetime(value):
+    # Same text as strftime('%Y-%m-%d %H:%M:%S') for the naive UTC timestamps we store
+    return value.isoformat(' ', 'seconds') if value is not None else None
+
+class Serializer:
+    """Compiled model -> dict conversion.
+
+    `fields` lists column attributes, or (output name, attribute) pairs to
+    rename one. `computed` maps output names to functions of the object,
+    and `requires` names the extra columns those functions read, so that
+    projection queries select them too.
+    """
+
+    def __init__(self, model, fields, computed=None, requires=()):
+        self.model = model
+        self.fields = [field if isinstance(field, tuple) else (field, field) for field in fields]
+        self.computed = dict(computed or {})
+        attributes = [attribute for _, attribute in self.fields]
+        attributes += [name for name in requires if name not in attributes]
+        self.columns = [getattr(model, attribute) for attribute in attributes]
+        self._serialize = self._compile()
+
+    def _compile(self):
+        columns = self.model.__table__.columns
+        namespace = {'_date': _date, '_datetime': _datetime}
+        items = []
+        for name, attribute in self.fields:
+            python_type = None
+            try:
+                python_type = columns[attribute].type.python_type
+            except (KeyError, NotImplementedError):
+                pass
+            if python_type is datetime:
+                items.append(f'{name!r}: _datetime(obj.{attribute})')
+            elif python_type is date:
+                items.append(f'{name!r}: _date(obj.{attribute})')
+            else:
+                items.append(f'{name!r}: obj.{attribute}')
+        for index, (name, function) in enumerate(self.computed.items()):
+            namespace[f'_computed_{index}'] = function
+            items.append(f'{name!r}: _computed_{index}(obj)')
+
+        source = 'def serialize(obj):\n    return {' + ', '.join(items) + '}\n'
+        exec(compile(source, f'<serializer {self.model.__name__}>', 'exec'), namespace)
+        return namespace['serialize']
+
+    def __call__(self, obj):
+        return self._serialize(obj)
+
+    def many(self, objs):
+        return list(map(self._serialize, objs))
+
+class OrjsonProvider(DefaultJSONProvider):
+    """Flask JSON provider backed by orjson, with the default provider's output.
+
+    Dates still go through Flask's own formatting and keys are sorted
+    unless sort_keys is turned off, so responses decode to the same values.
+    Non-ASCII text is sent as UTF-8 rather than \\u escapes.
+    """
+
+    def _options(self, **kwargs):
+        options = orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_NON_STR_KEYS
+        if kwargs.get('sort_keys', self.sort_keys):
+            options |= orjson.OPT_SORT_KEYS
+        if kwargs.get('indent'):
+            options |= orjson.OPT_INDENT_2
+        return options
+
+    def dumps(self, obj, **kwargs):
+        return orjson.dumps(obj, default=self.default, option=self._options(**kwargs)).decode('utf-8')
+
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        indent = self.compact is False or (self.compact is None and self._app.debug)
+        body = orjson.dumps(obj, default=self.default, option=self._options(indent=indent))
+        return self._app.response_class(body + b'\n', mimetype=self.mimetype)
+
+def init_serialization(app):
+    """Use orjson for jsonify and request.get_json when it is installed"""
+    app.config.setdefault('JSON_ORJSON', True)
+    if orjson is not None and app.config['JSON_ORJSON']:
+        app.json_provider_class = OrjsonProvider
+        app.json = OrjsonProvider(app)
+    return app.json
+
+def benchmark(count):
+    """Serialize `count` bookings via to_dict-by-hand, the compiled serializer and both JSON encoders"""
+    import json
+    from flask import Flask
+    from auth import Booking, booking_serializer
+
+    now = datetime.utcnow()
+    bookings = [Booking(id=i, user_id=i % 50, monument='Taj Mahal', visit_date=now.date(),
+                        time_slot='10:00-11:00', visitors=[{'name': 'Visitor', 'age': 30}],
+                        qr_code='{}', payment_status='completed', payment_method='card',
+                        need_guide=False, need_parking=True, base_amount=100.0, final_amount=250.0,
+                        created_at=now, updated_at=now, nationality='Indian', id_number='1234',
+                        camera_required=False, is_student=False, student_id=None,
+                        student_discount_applied=False, visitor_count=2, student_count=0,
+                        cancelled_at=None, group_id=None)
+                for i in range(count)]
+
+    def by_hand(b):
+        return {
+            'id': b.id, 'user_id': b.user_id, 'monument': b.monument,
+            'visit_date': b.visit_date.strftime('%Y-%m-%d'), 'time_slot': b.time_slot,
+            'visitors': b.visitors, 'qr_code': b.qr_code, 'payment_status': b.payment_status,
+            'payment_method': b.payment_method, 'need_guide': b.need_guide,
+            'need_parking': b.need_parking, 'base_amount': b.base_amount,
+            'final_amount': b.final_amount,
+            'created_at': b.created_at.strftime('%Y-%m-%d %H:%M:%S'),
+            'updated_at': b.updated_at.strftime('%Y-%m-%d %H:%M:%S'),
+            'nationality': b.nationality, 'id_number': b.id_number,
+            'camera_required': b.camera_required, 'is_student': b.is_student,
+            'student_id': b.student_id, 'student_discount_applied': b.student_discount_applied,
+            'visitor_count': b.visitor_count, 'student_count': b.student_count,
+            'cancelled_at': b.cancelled_at.strftime('%Y-%m-%d %H:%M:%S') if b.cancelled_at else None,
+            'group_id': b.group_id
+        }
+
+    results = {}
+
+    def run(name, function):
+        start = time.perf_counter()
+        output = function()
+        results[name] = time.perf_counter() - start
+        return output
+
+    dicts = run('to_dict by hand', lambda: [by_hand(b) for b in bookings])
+    compiled = run('compiled serializer', lambda: booking_serializer.many(bookings))
+    assert dicts == compiled
+
+    app = Flask(__name__)
+    default = DefaultJSONProvider(app)
+    run('json (Flask default)', lambda: default.dumps(compiled))
+    if orjson is not None:
+        fast = OrjsonProvider(app)
+        encoded = run('orjson', lambda: fast.dumps(compiled))
+        assert json.loads(encoded) == json.loads(default.dumps(compiled))
+    return results
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Serialization microbenchmark')
+    parser.add_argument('--benchmark', type=int, default=20000, metavar='N', help='number of bookings')
+    args = parser.parse_args(argv)
+
+    for name, elapsed in benchmark(args.benchmark).items():
+        print(f"{name:<22} {elapsed * 1000:8.1f} ms  {args.benchmark / elapsed:12,.0f} per second")
+    if orjson is None:
+        print("orjson is not installed, skipped it")
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
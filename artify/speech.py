@@ -0,0 +1,119 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+
+from metrics import timer, SPEECH_SECONDS
+from speech_backends import (
+    RECOGNIZERS, SYNTHESIZERS, SpeechUnavailable, SpeechNotUnderstood
+)
+
+class SpeechBusy(Exception):
+    """Raised when the recognition pool and its queue are both full"""
+
+class BoundedExecutor:
+    """Thread pool that refuses work instead of queueing without limit"""
+
+    def __init__(self, max_workers, max_queue):
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='artify-speech')
+        self._slots = threading.BoundedSemaphore(max_workers + max_queue)
+
+    def submit(self, fn, *args, **kwargs):
+        if not self._slots.acquire(blocking=False):
+            raise SpeechBusy("Voice service is busy, please try again")
+        try:
+            future = self._pool.submit(fn, *args, **kwargs)
+        except Exception:
+            self._slots.release()
+            raise
+        future.add_done_callback(lambda _: self._slots.release())
+        return future
+
+_executor = None
+_timeout = 15
+_recognizer = None
+_synthesizer = None
+
+def _load_backend(registry, name, config, kind):
+    backend_class = registry.get(name)
+    if backend_class is None:
+        print(f"Unknown speech {kind} '{name}', choose one of {', '.join(registry)}")
+        return None
+    backend = backend_class(config)
+    if not backend.available():
+        print(f"Speech {kind} '{name}' is not installed, voice features will be disabled")
+        return None
+    try:
+        backend.warm()
+    except Exception as e:
+        print(f"Error warming speech {kind} '{name}': {str(e)}")
+        return None
+    return backend
+
+def init_speech(app):
+    """Pick the speech backends from config, warm them and create the recognition pool.
+
+    SPEECH_RECOGNIZER is one of google, sphinx, vosk or stub and
+    SPEECH_SYNTHESIZER one of gtts, espeak or stub. The offline engines keep
+    voice latency bounded by our own CPUs instead of a remote service.
+    """
+    global _executor, _timeout, _recognizer, _synthesizer
+    app.config.setdefault('SPEECH_RECOGNIZER', 'google')
+    app.config.setdefault('SPEECH_SYNTHESIZER', 'gtts')
+    app.config.setdefault('SPEECH_WORKERS', 2)
+    app.config.setdefault('SPEECH_QUEUE', 8)
+    app.config.setdefault('SPEECH_TIMEOUT', 15)
+
+    _timeout = app.config['SPEECH_TIMEOUT']
+    _executor = BoundedExecutor(app.config['SPEECH_WORKERS'], app.config['SPEECH_QUEUE'])
+    _recognizer = _load_backend(RECOGNIZERS, app.config['SPEECH_RECOGNIZER'], app.config, 'recognizer')
+    _synthesizer = _load_backend(SYNTHESIZERS, app.config['SPEECH_SYNTHESIZER'], app.config, 'synthesizer')
+
+def recognition_enabled():
+    return _recognizer is not None and _synthesizer is not None
+
+def synthesis_enabled():
+    return _synthesizer is not None
+
+def _recognize(audio_bytes, lang):
+    with timer(SPEECH_SECONDS, 'recognize'):
+        return _recognizer.recognize(audio_bytes, lang)
+
+def recognize_audio(audio_bytes, lang='en'):
+    """Turn an uploaded WAV held in memory into lower case text on the speech pool.
+
+    The request gives up after SPEECH_TIMEOUT seconds, but a recognition that
+    has already started cannot be interrupted from here: it keeps its pool
+    worker and queue slot until the backend returns. The backends bound their
+    own run time with the same timeout (Google through its operation timeout,
+    Vosk between audio chunks); Sphinx cannot be stopped, so with it a slow
+    recognition holds its worker for as long as it takes.
+    """
+    future = _executor.submit(_recognize, audio_bytes, lang)
+    try:
+        return future.result(timeout=_timeout)
+    except FutureTimeoutError:
+        # Only drops the task if it is still queued
+        future.cancel()
+        raise SpeechUnavailable("Speech recognition timed out")
+
+def synthesize_stream(text, lang='en', slow=False):
+    """Return (mimetype, generator of audio chunks) for `text`.
+
+    The first chunk is produced before returning so a synthesis failure can
+    still be reported as an error response instead of a truncated stream.
+    """
+    chunks = _synthesizer.stream(text, lang=lang, slow=slow)
+    with timer(SPEECH_SECONDS, 'synthesize_first_chunk'):
+        first = next(chunks, b'')
+
+    def generate():
+        yield first
+        yield from chunks
+
+    return _synthesizer.mimetype, generate()
+
+def voice_id(slow=False):
+    """Identify the active voice so cached audio is never reused across engines"""
+    return f'{_synthesizer.name}{":slow" if slow else ""}'
+
+def synthesizer_mimetype():
+    return _synthesizer.mimetype
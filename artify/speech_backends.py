@@ -0,0 +1,251 @@
+import io
+import json
+import time
+import wave
+import shutil
+import subprocess
+
+class SpeechUnavailable(Exception):
+    """Raised when the recognition or synthesis engine cannot be used"""
+
+class SpeechNotUnderstood(Exception):
+    """Raised when the audio contains no recognizable speech"""
+
+class Recognizer:
+    """Speech-to-text backend. Subclasses turn WAV bytes into lower case text"""
+
+    name = None
+
+    def available(self):
+        return True
+
+    def warm(self):
+        """Load models up front so the first voice request is not the slow one"""
+
+    def recognize(self, audio_bytes, lang='en'):
+        raise NotImplementedError
+
+class Synthesizer:
+    """Text-to-speech backend. Subclasses yield audio chunks of `mimetype`"""
+
+    name = None
+    mimetype = 'audio/mpeg'
+
+    def available(self):
+        return True
+
+    def warm(self):
+        """Load voices up front so the first request is not the slow one"""
+
+    def stream(self, text, lang='en', slow=False):
+        raise NotImplementedError
+
+class GoogleRecognizer(Recognizer):
+    """Google Web Speech API through speech_recognition, needs network access"""
+
+    name = 'google'
+
+    def __init__(self, config):
+        self.timeout = config.get('SPEECH_TIMEOUT')
+        try:
+            import speech_recognition
+            self.sr = speech_recognition
+        except ImportError:
+            self.sr = None
+
+    def available(self):
+        return self.sr is not None
+
+    def recognize(self, audio_bytes, lang='en'):
+        sr = self.sr
+        recognizer = sr.Recognizer()
+        # Bounds the request to Google, so a hung call frees its pool worker
+        recognizer.operation_timeout = self.timeout
+        # sr.AudioFile reads any file-like object, so the upload never touches disk
+        with sr.AudioFile(io.BytesIO(audio_bytes)) as source:
+            audio_data = recognizer.record(source)
+        try:
+            return recognizer.recognize_google(audio_data, language=lang).lower()
+        except sr.UnknownValueError:
+            raise SpeechNotUnderstood("Could not understand audio")
+        except sr.RequestError as e:
+            raise SpeechUnavailable(f"Could not request results: {str(e)}")
+
+class SphinxRecognizer(GoogleRecognizer):
+    """Offline CMU Sphinx through speech_recognition, needs pocketsphinx"""
+
+    name = 'sphinx'
+
+    def available(self):
+        if self.sr is None:
+            return False
+        try:
+            import pocketsphinx  # noqa: F401
+            return True
+        except ImportError:
+            return False
+
+    def recognize(self, audio_bytes, lang='en'):
+        sr = self.sr
+        recognizer = sr.Recognizer()
+        with sr.AudioFile(io.BytesIO(audio_bytes)) as source:
+            audio_data = recognizer.record(source)
+        try:
+            return recognizer.recognize_sphinx(audio_data).lower()
+        except sr.UnknownValueError:
+            raise SpeechNotUnderstood("Could not understand audio")
+        except sr.RequestError as e:
+            raise SpeechUnavailable(f"Sphinx error: {str(e)}")
+
+class VoskRecognizer(Recognizer):
+    """Offline Kaldi models through vosk. Expects 16-bit mono PCM WAV"""
+
+    name = 'vosk'
+
+    def __init__(self, config):
+        self.model_path = config.get('VOSK_MODEL_PATH')
+        self.timeout = config.get('SPEECH_TIMEOUT')
+        self.model = None
+        try:
+            import vosk
+            self.vosk = vosk
+        except ImportError:
+            self.vosk = None
+
+    def available(self):
+        return self.vosk is not None and bool(self.model_path)
+
+    def warm(self):
+        if self.model is None:
+            self.vosk.SetLogLevel(-1)
+            self.model = self.vosk.Model(self.model_path)
+
+    def recognize(self, audio_bytes, lang='en'):
+        self.warm()
+        try:
+            wav = wave.open(io.BytesIO(audio_bytes), 'rb')
+        except (wave.Error, EOFError) as e:
+            raise SpeechNotUnderstood(f"Unsupported audio format: {str(e)}")
+        with wav:
+            if wav.getnchannels() != 1 or wav.getsampwidth() != 2:
+                raise SpeechNotUnderstood("Audio must be 16-bit mono WAV")
+            recognizer = self.vosk.KaldiRecognizer(self.model, wav.getframerate())
+            deadline = time.monotonic() + self.timeout if self.timeout else None
+            while True:
+                frames = wav.readframes(4000)
+                if not frames:
+                    break
+                if deadline is not None and time.monotonic() > deadline:
+                    raise SpeechUnavailable("Speech recognition timed out")
+                recognizer.AcceptWaveform(frames)
+        text = json.loads(recognizer.FinalResult()).get('text', '')
+        if not text:
+            raise SpeechNotUnderstood("Could not understand audio")
+        return text.lower()
+
+class StubRecognizer(Recognizer):
+    """Deterministic recognizer for tests.
+
+    Audio starting with b'STUB:' is recognized as the UTF-8 text that follows,
+    anything else as SPEECH_STUB_TEXT.
+    """
+
+    name = 'stub'
+
+    def __init__(self, config):
+        self.default_text = config.get('SPEECH_STUB_TEXT', 'help')
+
+    def recognize(self, audio_bytes, lang='en'):
+        if audio_bytes.startswith(b'STUB:'):
+            text = audio_bytes[5:].decode('utf-8', 'replace').strip()
+        else:
+            text = self.default_text
+        if not text:
+            raise SpeechNotUnderstood("Could not understand audio")
+        return text.lower()
+
+class GTTSSynthesizer(Synthesizer):
+    """Google Translate TTS through gTTS, needs network access"""
+
+    name = 'gtts'
+    mimetype = 'audio/mpeg'
+
+    def __init__(self, config):
+        try:
+            from gtts import gTTS
+            self.gTTS = gTTS
+        except ImportError:
+            self.gTTS = None
+
+    def available(self):
+        return self.gTTS is not None
+
+    def stream(self, text, lang='en', slow=False):
+        try:
+            yield from self.gTTS(text=text, lang=lang, slow=slow).stream()
+        except Exception as e:
+            raise SpeechUnavailable(f"Could not synthesize speech: {str(e)}")
+
+class EspeakSynthesizer(Synthesizer):
+    """Offline espeak-ng, streams WAV from the subprocess as it is produced"""
+
+    name = 'espeak'
+    mimetype = 'audio/wav'
+
+    def __init__(self, config):
+        self.binary = config.get('ESPEAK_BINARY') or shutil.which('espeak-ng') or shutil.which('espeak')
+        self.voices = config.get('ESPEAK_VOICES', {})
+
+    def available(self):
+        return bool(self.binary)
+
+    def stream(self, text, lang='en', slow=False):
+        command = [self.binary, '--stdout', '-v', self.voices.get(lang, lang), '-s', '130' if slow else '165']
+        try:
+            process = subprocess.Popen(command, stdin=subprocess.PIPE, stdout=subprocess.PIPE,
+                                       stderr=subprocess.DEVNULL)
+        except OSError as e:
+            raise SpeechUnavailable(f"Could not start espeak: {str(e)}")
+        try:
+            process.stdin.write(text.encode('utf-8'))
+            process.stdin.close()
+            while True:
+                chunk = process.stdout.read(8192)
+                if not chunk:
+                    break
+                yield chunk
+        finally:
+            process.stdout.close()
+            if process.wait() != 0:
+                raise SpeechUnavailable("espeak failed to synthesize speech")
+
+class StubSynthesizer(Synthesizer):
+    """Deterministic synthesizer for tests, returns silence sized to the text"""
+
+    name = 'stub'
+    mimetype = 'audio/wav'
+
+    def __init__(self, config):
+        pass
+
+    def stream(self, text, lang='en', slow=False):
+        buffer = io.BytesIO()
+        with wave.open(buffer, 'wb') as wav:
+            wav.setnchannels(1)
+            wav.setsampwidth(2)
+            wav.setframerate(8000)
+            wav.writeframes(b'\x00\x00' * 400 * max(1, len(text.split())))
+        yield buffer.getvalue()
+
+RECOGNIZERS = {
+    'google': GoogleRecognizer,
+    'sphinx': SphinxRecognizer,
+    'vosk': VoskRecognizer,
+    'stub': StubRecognizer
+}
+
+SYNTHESIZERS = {
+    'gtts': GTTSSynthesizer,
+    'espeak': EspeakSynthesizer,
+    'stub': StubSynthesizer
+}
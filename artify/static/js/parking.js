@@ -0,0 +1,401 @@
+// Set minimum date to today
+const dateInput = document.getElementById('date');
+const today = new Date().toISOString().split('T')[0];
+dateInput.min = today;
+
+// Hourly rate for the selected monument, date and vehicle type, set by refreshRate()
+let hourlyRate = 25;
+
+async function refreshRate() {
+    const monument = document.getElementById('monument').value;
+    const date = document.getElementById('date').value;
+    const vehicleType = document.getElementById('vehicle_type').value;
+
+    if (monument && date) {
+        try {
+            const response = await fetch(`/api/pricing?monument=${encodeURIComponent(monument)}&date=${date}`);
+            if (response.ok) {
+                const prices = await response.json();
+                hourlyRate = prices.parking_hourly[vehicleType] || prices.parking_hourly['4wheeler'] || hourlyRate;
+            }
+        } catch (error) {
+            console.error('Error fetching parking rates:', error);
+        }
+    }
+    updatePrice();
+}
+
+function updatePrice() {
+    const duration = parseInt(document.getElementById('duration').value) || 2;
+    const totalPrice = duration * hourlyRate;
+
+    document.getElementById('hourlyRate').textContent = hourlyRate;
+    document.getElementById('durationDisplay').textContent = duration;
+    document.getElementById('totalPrice').textContent = totalPrice;
+    document.getElementById('total_amount').value = totalPrice;
+}
+
+async function updateParkingSlots() {
+    const monument = document.getElementById('monument').value;
+    const date = document.getElementById('date').value;
+    const vehicleType = document.getElementById('vehicle_type').value;
+
+    if (!monument || !date || !vehicleType) return;
+
+    const slotsContainer = document.getElementById('parkingSlots');
+    slotsContainer.innerHTML = '';
+
+    // Generate 10 slots for the selected vehicle type
+    for (let i = 1; i <= 10; i++) {
+        const slotDiv = document.createElement('div');
+        slotDiv.className = 'parking-slot available';
+        slotDiv.onclick = () => selectParkingSlot(i, slotDiv);
+
+        let icon = 'fa-car';
+        if (vehicleType === 'bike') {
+            icon = 'fa-motorcycle';
+        } else if (vehicleType === 'bus') {
+            icon = 'fa-bus';
+        }
+
+        slotDiv.innerHTML = `
+            <i class="fas ${icon}"></i>
+            <div class="slot-number">Slot ${i}</div>
+        `;
+
+        slotsContainer.appendChild(slotDiv);
+    }
+}
+
+function selectParkingSlot(slotNumber, element) {
+    if (element.classList.contains('occupied')) return;
+
+    document.querySelectorAll('.parking-slot').forEach(slot => {
+        slot.classList.remove('selected');
+    });
+
+    element.classList.add('selected');
+    document.getElementById('selected_slot').value = slotNumber;
+}
+
+// Add styles for new elements
+const style = document.createElement('style');
+style.textContent = `
+    .no-slots {
+        text-align: center;
+        padding: 1rem;
+        color: rgba(255, 255, 255, 0.8);
+        font-style: italic;
+    }
+
+    .error-message {
+        text-align: center;
+        padding: 1rem;
+        color: #ff4444;
+        font-style: italic;
+    }
+
+    .slot-type {
+        font-size: 0.8rem;
+        opacity: 0.8;
+        margin-top: 0.3rem;
+    }
+
+    .parking-slot i {
+        font-size: 1.5rem;
+        margin-bottom: 0.5rem;
+    }
+`;
+document.head.appendChild(style);
+
+document.addEventListener('DOMContentLoaded', () => {
+    updatePrice();
+    refreshRate();
+
+    // Set minimum date to today
+    const dateInput = document.getElementById('date');
+    const today = new Date().toISOString().split('T')[0];
+    dateInput.min = today;
+    dateInput.value = today;
+
+    // Initialize vehicle type change handler
+    const vehicleTypeSelect = document.getElementById('vehicle_type');
+    vehicleTypeSelect.addEventListener('change', () => {
+        updateParkingSlots();
+        refreshRate();
+    });
+
+    // The rate depends on how full the monument's parking is that day
+    dateInput.addEventListener('change', refreshRate);
+    document.getElementById('monument').addEventListener('change', refreshRate);
+
+    // Initialize duration change handler
+    const durationInput = document.getElementById('duration');
+    durationInput.addEventListener('input', updatePrice);
+
+    // Show initial parking slots if vehicle type is selected
+    if (vehicleTypeSelect.value) {
+        updateParkingSlots();
+    }
+});
+
+const translations = {
+    'en': {
+        'nav-home': 'Home',
+        'nav-book': 'Book Now',
+        'nav-parking': 'Parking',
+        'nav-logout': 'Logout',
+        'parking-title': 'Parking Booking',
+        'parking-subtitle': 'Book your parking spot for your monument visit',
+        'select-monument': 'Select Monument',
+        'select-date': 'Select Date',
+        'select-time': 'Select Time Slot',
+        'choose-time': 'Choose a time slot',
+        'time-9': '9:00 AM',
+        'time-10': '10:00 AM',
+        'time-11': '11:00 AM',
+        'time-12': '12:00 PM',
+        'time-13': '1:00 PM',
+        'vehicle-type': 'Vehicle Type',
+        'choose-vehicle': 'Choose vehicle type',
+        'vehicle-car': 'Car',
+        'vehicle-bike': 'Bike',
+        'vehicle-bus': 'Bus',
+        'vehicle-number': 'Vehicle Number',
+        'vehicle-number-placeholder': 'Enter vehicle number',
+        'driver-name': 'Driver\'s Name',
+        'driver-name-placeholder': 'Enter driver\'s name',
+        'phone': 'Phone Number',
+        'phone-placeholder': 'Enter phone number',
+        'book-parking': 'Proceed to Payment',
+        'select-parking-slot': 'Select Parking Slot',
+        'parking-charges': 'Parking Charges',
+        'hourly-rate': 'Hourly rate:',
+        'duration': 'Duration:',
+        'hours': 'hours',
+        'total': 'Total:',
+        'no-slots': 'No parking slots available for the selected date',
+        'error-loading': 'Error loading parking slots. Please try again.',
+        'slot': 'Slot',
+        'available': 'Available',
+        'occupied': 'Occupied',
+        'select-slot': 'Select a parking slot',
+        'parking-rates': 'Parking Rates',
+        'parking-rates-2w': '2-wheeler: ₹30/4hrs',
+        'parking-rates-4w': '4-wheeler: ₹50/4hrs',
+        'parking-rates-bus': 'Bus: ₹100/4hrs'
+    },
+    'hi': {
+        'nav-home': 'होम',
+        'nav-book': 'बुक करें',
+        'nav-parking': 'पार्किंग',
+        'nav-logout': 'लॉग आउट',
+        'parking-title': 'पार्किंग बुकिंग',
+        'parking-subtitle': 'अपनी स्मारक यात्रा के लिए पार्किंग स्पॉट बुक करें',
+        'select-monument': 'स्मारक चुनें',
+        'select-date': 'दिनांक चुनें',
+        'select-time': 'समय स्लॉट चुनें',
+        'choose-time': 'समय स्लॉट चुनें',
+        'time-9': 'सुबह 9:00',
+        'time-10': 'सुबह 10:00',
+        'time-11': 'सुबह 11:00',
+        'time-12': 'दोपहर 12:00',
+        'time-13': 'दोपहर 1:00',
+        'vehicle-type': 'वाहन प्रकार',
+        'choose-vehicle': 'वाहन प्रकार चुनें',
+        'vehicle-car': 'कार',
+        'vehicle-bike': 'बाइक',
+        'vehicle-bus': 'बस',
+        'vehicle-number': 'वाहन संख्या',
+        'vehicle-number-placeholder': 'वाहन संख्या दर्ज करें',
+        'driver-name': 'चालकाचे नाव',
+        'driver-name-placeholder': 'चालकाचे नाव टाका',
+        'phone': 'फोन नंबर',
+        'phone-placeholder': 'फोन नंबर टाका',
+        'book-parking': 'भुगतान के लिए आगे बढ़ें',
+        'select-parking-slot': 'पार्किंग स्लॉट चुनें',
+        'parking-charges': 'पार्किंग शुल्क',
+        'hourly-rate': 'आधार दर:',
+        'duration': 'अवधि:',
+        'hours': 'घंटे',
+        'total': 'कुल:',
+        'no-slots': 'चयनित तिथि के लिए कोई पार्किंग स्लॉट उपलब्ध नहीं है',
+        'error-loading': 'पार्किंग स्लॉट लोड करने में त्रुटि। कृपया पुनः प्रयास करें।',
+        'slot': 'स्लॉट',
+        'available': 'उपलब्ध',
+        'occupied': 'कब्जा किया हुआ',
+        'select-slot': 'पार्किंग स्लॉट चुनें',
+        'parking-rates': 'पार्किंग दरें',
+        'parking-rates-2w': 'दोपहिया: ₹30/4 घंटे',
+        'parking-rates-4w': 'चार पहिया: ₹50/4 घंटे',
+        'parking-rates-bus': 'बस: ₹100/4 घंटे'
+    },
+    'fr': {
+        'parking-title': 'Réservation de Stationnement',
+        'parking-subtitle': 'Réservez votre place de stationnement pour votre visite du monument',
+        'select-monument': 'Sélectionner le Monument',
+        'monument-placeholder': 'Choisir un monument',
+        'choose-monument': 'Choisir un monument',
+        'monument-red-fort': 'Fort Rouge',
+        'monument-qutub': 'Qutub Minar',
+        'monument-india-gate': 'Porte de l\'Inde',
+        'monument-taj': 'Taj Mahal',
+        'monument-lotus': 'Temple du Lotus',
+        'monument-jama': 'Mosquée Jama',
+        'select-date': 'Sélectionner la Date',
+        'select-time': 'Sélectionner l\'Horaire',
+        'choose-time': 'Choisir un horaire',
+        'time-9': '9:00 AM',
+        'time-10': '10:00 AM',
+        'time-11': '11:00 AM',
+        'time-12': '12:00 PM',
+        'time-13': '1:00 PM',
+        'vehicle-type': 'Type de Véhicule',
+        'choose-vehicle': 'Choisir le type de véhicule',
+        'vehicle-car': 'Voiture',
+        'vehicle-bike': 'Moto',
+        'vehicle-bus': 'Bus',
+        'vehicle-number': 'Numéro de Véhicule',
+        'vehicle-number-placeholder': 'Entrez le numéro de véhicule',
+        'driver-name': 'Nom du Conducteur',
+        'driver-name-placeholder': 'Entrez le nom du conducteur',
+        'phone': 'Numéro de Téléphone',
+        'phone-placeholder': 'Entrez le numéro de téléphone',
+        'book-parking': 'Réserver le Stationnement',
+        'select-parking-slot': 'Sélectionner une Place de Stationnement',
+        'parking-charges': 'Frais de Stationnement',
+        'hourly-rate': 'Tarif de base:',
+        'duration': 'Durée:',
+        'hours': 'heures',
+        'total': 'Total:',
+        'no-slots': 'Aucune place de stationnement disponible pour la date sélectionnée',
+        'error-loading': 'Erreur lors du chargement des places de stationnement. Veuillez réessayer.',
+        'slot': 'Place',
+        'available': 'Disponible',
+        'occupied': 'Occupée',
+        'select-slot': 'Sélectionner une place de stationnement',
+        'parking-rates': 'Tarifs de Stationnement',
+        'parking-rates-2w': '2-roues : ₹30/4h',
+        'parking-rates-4w': '4-roues : ₹50/4h',
+        'parking-rates-bus': 'Bus : ₹100/4h'
+    },
+    'zh': {
+        'parking-title': '停车预订',
+        'parking-subtitle': '为您的纪念碑参观预订停车位',
+        'select-monument': '选择纪念碑',
+        'monument-placeholder': '选择纪念碑',
+        'choose-monument': '选择纪念碑',
+        'monument-red-fort': '红堡',
+        'monument-qutub': '库杜布塔',
+        'monument-india-gate': '印度门',
+        'monument-taj': '泰姬陵',
+        'monument-lotus': '莲花寺',
+        'monument-jama': '贾玛清真寺',
+        'select-date': '选择日期',
+        'select-time': '选择时间段',
+        'choose-time': '选择时间段',
+        'time-9': '上午9:00',
+        'time-10': '上午10:00',
+        'time-11': '上午11:00',
+        'time-12': '下午12:00',
+        'time-13': '下午1:00',
+        'vehicle-type': '车辆类型',
+        'choose-vehicle': '选择车辆类型',
+        'vehicle-car': '汽车',
+        'vehicle-bike': '摩托车',
+        'vehicle-bus': '公共汽车',
+        'vehicle-number': '车牌号码',
+        'vehicle-number-placeholder': '输入车牌号码',
+        'driver-name': '司机姓名',
+        'driver-name-placeholder': '输入司机姓名',
+        'phone': '电话号码',
+        'phone-placeholder': '输入电话号码',
+        'book-parking': '预订停车位',
+        'select-parking-slot': '选择停车位',
+        'parking-charges': '停车费用',
+        'hourly-rate': '基本费率：',
+        'duration': '时长：',
+        'hours': '小时',
+        'total': '总计：',
+        'no-slots': '所选日期没有可用的停车位',
+        'error-loading': '加载停车位时出错。请重试。',
+        'slot': '车位',
+        'available': '可用',
+        'occupied': '已占用',
+        'select-slot': '选择停车位',
+        'parking-rates': '停车费率',
+        'parking-rates-2w': '两轮车：₹30/4小时',
+        'parking-rates-4w': '四轮车：₹50/4小时',
+        'parking-rates-bus': '公共汽车：₹100/4小时'
+    },
+    'mr': {
+        'parking-title': 'पार्किंग बुकिंग',
+        'parking-subtitle': 'आपल्या स्मारक भेटीसाठी पार्किंग स्पॉट बुक करा',
+        'select-monument': 'स्मारक निवडा',
+        'monument-placeholder': 'स्मारक निवडा',
+        'choose-monument': 'स्मारक निवडा',
+        'monument-red-fort': 'लाल किल्ला',
+        'monument-qutub': 'कुतुब मिनार',
+        'monument-india-gate': 'इंडिया गेट',
+        'monument-taj': 'ताज महल',
+        'monument-lotus': 'लोटस टेम्पल',
+        'monument-jama': 'जामा मशीद',
+        'select-date': 'दिनांक निवडा',
+        'select-time': 'वेळ स्लॉट निवडा',
+        'choose-time': 'वेळ स्लॉट निवडा',
+        'time-9': 'सकाळी 9:00',
+        'time-10': 'सकाळी 10:00',
+        'time-11': 'सकाळी 11:00',
+        'time-12': 'दुपारी 12:00',
+        'time-13': 'दुपारी 1:00',
+        'vehicle-type': 'वाहन प्रकार',
+        'choose-vehicle': 'वाहन प्रकार निवडा',
+        'vehicle-car': 'कार',
+        'vehicle-bike': 'बाईक',
+        'vehicle-bus': 'बस',
+        'vehicle-number': 'वाहन क्रमांक',
+        'vehicle-number-placeholder': 'वाहन क्रमांक टाका',
+        'driver-name': 'चालकाचे नाव',
+        'driver-name-placeholder': 'चालकाचे नाव टाका',
+        'phone': 'फोन नंबर',
+        'phone-placeholder': 'फोन नंबर टाका',
+        'book-parking': 'पार्किंग बुक करा',
+        'select-parking-slot': 'पार्किंग स्लॉट निवडा',
+        'parking-charges': 'पार्किंग शुल्क',
+        'hourly-rate': 'बेस रेट:',
+        'duration': 'कालावधी:',
+        'hours': 'तास',
+        'total': 'एकूण:',
+        'no-slots': 'निवडलेल्या तारखेसाठी पार्किंग स्लॉट उपलब्ध नाही',
+        'error-loading': 'पार्किंग स्लॉट लोड करण्यात त्रुटी. कृपया पुन्हा प्रयत्न करा.',
+        'slot': 'स्लॉट',
+        'available': 'उपलब्ध',
+        'occupied': 'व्यापलेले',
+        'select-slot': 'पार्किंग स्लॉट निवडा',
+        'parking-rates': 'पार्किंग दर',
+        'parking-rates-2w': 'दुपहिया: ₹30/4 तास',
+        'parking-rates-4w': 'चारपहिया: ₹50/4 तास',
+        'parking-rates-bus': 'बस: ₹100/4 तास'
+    }
+};
+
+function changeLanguage(lang) {
+    const elements = document.querySelectorAll('[data-translate]');
+    elements.forEach(element => {
+        const key = element.getAttribute('data-translate');
+        if (translations[lang] && translations[lang][key]) {
+            if (element.tagName === 'INPUT' || element.tagName === 'TEXTAREA') {
+                element.placeholder = translations[lang][key];
+            } else {
+                element.textContent = translations[lang][key];
+            }
+        }
+    });
+    localStorage.setItem('selectedLanguage', lang);
+}
+
+document.addEventListener('DOMContentLoaded', () => {
+    const savedLanguage = localStorage.getItem('selectedLanguage') || 'en';
+    document.getElementById('language').value = savedLanguage;
+    changeLanguage(savedLanguage);
+});
@@ -0,0 +1,164 @@
+function selectPaymentMethod(method) {
+    // Hide all payment forms
+    document.querySelectorAll('.payment-form').forEach(form => {
+        form.classList.remove('active');
+    });
+
+    // Remove selected class from all payment methods
+    document.querySelectorAll('.payment-method').forEach(pm => {
+        pm.classList.remove('selected');
+    });
+
+    // Show selected payment form and highlight the method
+    const selectedForm = document.getElementById(`${method}-form`);
+    if (selectedForm) {
+        selectedForm.classList.add('active');
+        selectedForm.closest('.payment-method').classList.add('selected');
+    }
+}
+
+function selectUPIApp(app) {
+    const upiInput = document.getElementById('upi-id');
+    if (!upiInput) return;
+
+    switch(app) {
+        case 'googlepay':
+            upiInput.value = '@okgooglepay';
+            break;
+        case 'phonepe':
+            upiInput.value = '@phonepe';
+            break;
+        case 'paytm':
+            upiInput.value = '@paytm';
+            break;
+    }
+}
+
+// Format card number input
+const cardNumberInput = document.getElementById('card-number');
+if (cardNumberInput) {
+    cardNumberInput.addEventListener('input', function(e) {
+        let value = e.target.value.replace(/\s+/g, '').replace(/[^0-9]/gi, '');
+        let formattedValue = value.match(/.{1,4}/g)?.join(' ') || value;
+        e.target.value = formattedValue.substring(0, 19);
+    });
+}
+
+// Format expiry date input
+const expiryInput = document.getElementById('expiry');
+if (expiryInput) {
+    expiryInput.addEventListener('input', function(e) {
+        let value = e.target.value.replace(/\s+/g, '').replace(/[^0-9]/gi, '');
+        if (value.length > 2) {
+            value = value.substring(0, 2) + '/' + value.substring(2, 4);
+        }
+        e.target.value = value;
+    });
+}
+
+// Add form submission handlers
+['card-payment-form', 'upi-payment-form', 'netbanking-payment-form'].forEach(formId => {
+    const form = document.getElementById(formId);
+    if (!form) return;
+
+    form.addEventListener('submit', function(e) {
+        e.preventDefault();
+
+        // Show loading state
+        const submitBtn = this.querySelector('.submit-btn');
+        const originalText = submitBtn.textContent;
+        submitBtn.textContent = 'Processing...';
+        submitBtn.disabled = true;
+
+        // Get form data
+        const formData = new FormData(this);
+        const paymentData = {
+            payment_method: formData.get('payment_method'),
+            booking_data: JSON.parse(formData.get('booking_data')),
+            time_slot: formData.get('time_slot'),
+            id_number: formData.get('id_number'),
+            camera_required: formData.get('camera_required'),
+            is_student: formData.get('is_student'),
+            // Add payment-specific data based on payment method
+            ...(formData.get('payment_method') === 'card' ? {
+                card_number: formData.get('card_number'),
+                expiry: formData.get('expiry'),
+                cvv: formData.get('cvv'),
+                card_name: formData.get('card_name')
+            } : {}),
+            ...(formData.get('payment_method') === 'upi' ? {
+                upi_id: formData.get('upi_id')
+            } : {}),
+            ...(formData.get('payment_method') === 'netbanking' ? {
+                bank: formData.get('bank')
+            } : {})
+        };
+
+        // Submit payment
+        fetch('/process_payment', {
+            method: 'POST',
+            headers: {
+                'Content-Type': 'application/json',
+            },
+            body: JSON.stringify(paymentData)
+        })
+        .then(response => {
+            if (!response.ok) {
+                throw new Error('Network response was not ok');
+            }
+            return response.json();
+        })
+        .then(data => {
+            if (data.success) {
+                // Show success message
+                const successDiv = document.createElement('div');
+                successDiv.className = 'success-message';
+                successDiv.textContent = 'Payment successful! Redirecting...';
+                form.appendChild(successDiv);
+
+                // Redirect to confirmation page
+                setTimeout(() => {
+                    window.location.href = data.redirect_url;
+                }, 1500);
+            } else if (data.waitlist_url && confirm(`${data.error}. Join the waitlist? We will hold your places and let you know when they free up.`)) {
+                return fetch(data.waitlist_url, {
+                    method: 'POST',
+                    headers: {
+                        'Content-Type': 'application/json',
+                    },
+                    body: JSON.stringify({ time_slot: paymentData.time_slot })
+                })
+                .then(response => response.json())
+                .then(result => {
+                    if (!result.success) {
+                        throw new Error(result.error || 'Could not join the waitlist');
+                    }
+                    const successDiv = document.createElement('div');
+                    successDiv.className = 'success-message';
+                    successDiv.textContent = `You are number ${result.waitlist.position || 1} on the waitlist.`;
+                    form.appendChild(successDiv);
+                    submitBtn.textContent = originalText;
+                    submitBtn.disabled = false;
+                });
+            } else {
+                throw new Error(data.error || 'Payment failed. Please try again.');
+            }
+        })
+        .catch(error => {
+            // Show error message
+            const errorDiv = document.createElement('div');
+            errorDiv.className = 'error-message';
+            errorDiv.textContent = error.message;
+            form.appendChild(errorDiv);
+
+            // Reset button state
+            submitBtn.textContent = originalText;
+            submitBtn.disabled = false;
+        });
+    });
+});
+
+// Initialize the first payment method as selected
+window.addEventListener('DOMContentLoaded', function() {
+    selectPaymentMethod('card');
+});
@@ -0,0 +1,106 @@
+"""Tasks run by the job workers, and the cron schedule they follow.
+
+Each task takes its job's payload as keyword arguments and runs inside an
+app context on the site's database. Raising marks the attempt failed, the
+queue retries it with backoff.
+"""
+import os
+from datetime import datetime, timedelta
+
+from flask import current_app
+
+from auth import db, TimeSlot, TIME_SLOTS
+from jobs import task, get_queue
+from monuments import MONUMENTS_DATA
+from tickets import TICKET_MODELS, TicketStore, live_digests
+from archive import run_archival
+from reporting import rebuild_rollups
+from waitlist import promote
+from tts_cache import speech_script_app, default_texts, pregenerate
+from notifications import configure as configure_notifications, deliver_pending
+from speech import synthesis_enabled
+
+# name -> (cron expression, task, payload), local server time
+SCHEDULE = {
+    'slot-inventory': ('15 0 * * *', 'slots.generate', {'days': 30}),
+    'archive': ('0 3 * * *', 'archive.run', {'retention_days': 90}),
+    'ticket-gc': ('30 3 * * 0', 'tickets.gc', {}),
+    'rollups': ('0 4 * * 0', 'reporting.rebuild', {}),
+    'waitlist': ('*/5 * * * *', 'waitlist.promote', {}),
+    'notifications': ('* * * * *', 'notifications.send', {}),
+    'prune-jobs': ('45 4 * * *', 'jobs.prune', {'days': 7})
+}
+
+def _ticket_store():
+    return TicketStore(current_app.config.get('TICKET_CACHE_DIR')
+                       or os.path.join(current_app.instance_path, 'tickets'))
+
+@task('tickets.render', max_attempts=3, backoff=5.0)
+def render_ticket(kind, ticket_id):
+    """Render a new ticket's QR images ahead of its confirmation page asking for them"""
+    record = db.session.get(TICKET_MODELS[kind], ticket_id)
+    if record is None or not record.qr_code:
+        return
+    store = _ticket_store()
+    for fmt in ('png', 'svg'):
+        store.get(kind, record.qr_code, fmt)
+
+@task('tickets.gc', max_attempts=2)
+def collect_ticket_garbage(grace=3600):
+    removed = _ticket_store().collect_garbage(live_digests(), grace=grace)
+    print(f"Removed {len(removed)} orphaned ticket images")
+
+@task('slots.generate', max_attempts=3)
+def generate_slot_inventory(days=30):
+    """Create the time slots of every monument for the next `days` days, where missing"""
+    start = datetime.now().date()
+    end = start + timedelta(days=days - 1)
+    existing = {(monument, date) for monument, date in
+                db.session.query(TimeSlot.monument, TimeSlot.date)
+                .filter(TimeSlot.date.between(start, end))
+                .distinct()}
+    created = 0
+    for monument in MONUMENTS_DATA:
+        for offset in range(days):
+            date = start + timedelta(days=offset)
+            if (monument, date) in existing:
+                continue
+            db.session.add_all([TimeSlot(monument=monument, date=date, time_slot=slot) for slot in TIME_SLOTS])
+            created += 1
+    db.session.commit()
+    print(f"Created time slots for {created} monument days")
+
+@task('archive.run', max_attempts=3, backoff=300.0)
+def archive(retention_days=90, batch_size=500):
+    for table, count in run_archival(retention_days, batch_size).items():
+        print(f"Archived {count} rows from {table}")
+
+@task('reporting.rebuild', max_attempts=3, backoff=300.0)
+def rebuild_reports():
+    bookings, parking = rebuild_rollups()
+    print(f"Rebuilt {bookings} booking and {parking} parking rollup rows")
+
+@task('waitlist.promote', max_attempts=1)
+def promote_waitlist():
+    # The next run comes in five minutes, no point retrying this one
+    promote()
+
+@task('notifications.send', max_attempts=1)
+def send_notifications():
+    # Failed messages are retried by the outbox itself, and cron runs this every minute anyway
+    configure_notifications(current_app.config, current_app.instance_path)
+    sent, failed = deliver_pending()
+    print(f"Sent {sent} notifications, gave up on {failed}")
+
+@task('jobs.prune', max_attempts=1)
+def prune_jobs(days=7):
+    print(f"Pruned {get_queue().prune(days * 86400)} finished jobs")
+
+@task('tts.pregenerate', max_attempts=3, backoff=60.0)
+def pregenerate_speech(lang='en'):
+    """Synthesize the site's fixed texts into the audio cache, e.g. after a deploy"""
+    speech_script_app()
+    if not synthesis_enabled():
+        raise RuntimeError('No speech synthesizer is available')
+    generated, skipped = pregenerate(default_texts(), lang)
+    print(f"Generated {generated} clips, {skipped} already cached")
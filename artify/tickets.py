@@ -0,0 +1,232 @@
+"""QR ticket images.
+
+Bookings, parking reservations and group orders keep the QR payload (the JSON
+encoded in the code) in their qr_code column. The images are rendered on first request,
+stored on disk under a name derived from the payload hash and served from
+/tickets/<kind>/<id>.<png|svg>. ticket_url() puts that hash in the query
+string, so a given URL always returns the same bytes and can be cached
+forever. Clean up files no ticket refers to anymore with:
+
+    python tickets.py gc
+"""
+import io
+import os
+import sys
+import json
+import time
+import uuid
+import hashlib
+import argparse
+
+import qrcode
+import qrcode.image.svg
+from flask import Response, request, session, url_for, abort
+
+from auth import db, create_script_app, Booking, GroupOrder
+from parking import ParkingReservation
+from archive import find_booking, find_reservation
+from metrics import timer, QR_RENDER_SECONDS
+from querytrace import query_budget
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+# Written by earlier versions, nothing links to these files anymore
+LEGACY_DIRS = [
+    os.path.join(BASE_DIR, 'static', 'qr_codes'),
+    os.path.join(BASE_DIR, 'static', 'qrcodes')
+]
+
+TICKET_MODELS = {
+    'booking': Booking,
+    'parking': ParkingReservation,
+    'group': GroupOrder
+}
+# Lookups for the image route, which also serves tickets that have been archived
+TICKET_FINDERS = {
+    'booking': find_booking,
+    'parking': find_reservation,
+    'group': lambda ticket_id: db.session.get(GroupOrder, ticket_id)
+}
+FORMATS = {
+    'png': 'image/png',
+    'svg': 'image/svg+xml'
+}
+# Matches the QR settings each confirmation used before images moved out of the page
+QR_OPTIONS = {
+    'booking': {'box_size': 10, 'border': 4},
+    'parking': {'box_size': 10, 'border': 5},
+    'group': {'box_size': 8, 'border': 4}
+}
+
+def booking_payload(booking, name, email):
+    """QR payload of a booking, read from its row"""
+    return json.dumps({
+        'booking_id': booking.id,
+        'monument': booking.monument,
+        'date': booking.visit_date.strftime('%Y-%m-%d'),
+        'time_slot': booking.time_slot,
+        'name': name,
+        'email': email,
+        'visitors': booking.visitors or [],
+        'is_student': bool(booking.is_student),
+        'need_guide': bool(booking.need_guide),
+        'need_parking': bool(booking.need_parking),
+        'id_number': booking.id_number,
+        'camera_required': bool(booking.camera_required)
+    })
+
+def parking_payload(reservation):
+    """QR payload of a parking reservation, read from its row"""
+    return json.dumps({
+        'type': 'parking',
+        'id': str(uuid.uuid4()),
+        'monument': reservation.monument,
+        'date': reservation.reservation_date.strftime('%Y-%m-%d'),
+        'slot': reservation.slot_id,
+        'vehicle': reservation.vehicle_number
+    })
+
+def payload_digest(payload):
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+def render(kind, payload, fmt):
+    """Encode `payload` as a QR code image in `fmt`, returns the file's bytes"""
+    buffered = io.BytesIO()
+    with timer(QR_RENDER_SECONDS, kind):
+        qr = qrcode.QRCode(error_correction=qrcode.constants.ERROR_CORRECT_L, **QR_OPTIONS[kind])
+        qr.add_data(payload)
+        qr.make(fit=True)
+        if fmt == 'svg':
+            qr.make_image(image_factory=qrcode.image.svg.SvgPathImage).save(buffered)
+        else:
+            qr.make_image(fill_color="black", back_color="white").save(buffered, format="PNG")
+    return buffered.getvalue()
+
+class TicketStore:
+    """Rendered QR images on disk, named <kind>-<payload sha256>.<format>"""
+
+    def __init__(self, directory):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, kind, digest, fmt):
+        return os.path.join(self.directory, f'{kind}-{digest}.{fmt}')
+
+    def get(self, kind, payload, fmt):
+        digest = payload_digest(payload)
+        path = self._path(kind, digest, fmt)
+        try:
+            with open(path, 'rb') as f:
+                return f.read()
+        except OSError:
+            pass
+        data = render(kind, payload, fmt)
+        # Concurrent renders of the same ticket produce identical files, the last rename wins
+        tmp_path = f'{path}.{os.getpid()}.tmp'
+        with open(tmp_path, 'wb') as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+        return data
+
+    def collect_garbage(self, live_digests, grace=3600, dry_run=False):
+        """Remove rendered images whose ticket is gone and legacy QR files.
+
+        Files younger than `grace` seconds are kept, they may belong to a
+        ticket committed after `live_digests` was read. Returns the paths
+        removed (or that would be removed on a dry run).
+        """
+        cutoff = time.time() - grace
+        removed = []
+        candidates = []
+        for file_name in os.listdir(self.directory):
+            kind, _, rest = file_name.partition('-')
+            digest = rest.split('.', 1)[0]
+            if file_name.endswith('.tmp') or kind not in TICKET_MODELS or (kind, digest) not in live_digests:
+                candidates.append(os.path.join(self.directory, file_name))
+        for directory in LEGACY_DIRS:
+            if os.path.isdir(directory):
+                candidates.extend(os.path.join(directory, file_name) for file_name in os.listdir(directory))
+
+        for path in candidates:
+            try:
+                if not os.path.isfile(path) or os.path.getmtime(path) > cutoff:
+                    continue
+                if not dry_run:
+                    os.remove(path)
+            except OSError:
+                continue
+            removed.append(path)
+        return removed
+
+_store = None
+
+def live_digests(batch_size=1000):
+    """(kind, payload digest) for every ticket in the database, read in batches"""
+    digests = set()
+    for kind, model in TICKET_MODELS.items():
+        query = db.session.query(model.qr_code).filter(model.qr_code.isnot(None))
+        for (payload,) in query.yield_per(batch_size):
+            digests.add((kind, payload_digest(payload)))
+    return digests
+
+def ticket_url(kind, record, fmt='png', download=False):
+    """Versioned URL of a ticket's QR image, None when it has no QR payload yet"""
+    if not record.qr_code:
+        return None
+    params = {'v': payload_digest(record.qr_code)[:16]}
+    if download:
+        params['download'] = 1
+    return url_for('ticket_image', kind=kind, ticket_id=record.id, fmt=fmt, **params)
+
+def init_tickets(app):
+    global _store
+    app.config.setdefault('TICKET_CACHE_DIR', os.path.join(app.instance_path, 'tickets'))
+    _store = TicketStore(app.config['TICKET_CACHE_DIR'])
+    app.jinja_env.globals.update(ticket_url=ticket_url)
+
+    @app.route('/tickets/<kind>/<int:ticket_id>.<fmt>')
+    @query_budget(2)  # A second lookup for archived tickets
+    def ticket_image(kind, ticket_id, fmt):
+        finder = TICKET_FINDERS.get(kind)
+        if finder is None or fmt not in FORMATS:
+            abort(404)
+        record = finder(ticket_id)
+        # Tickets carry personal details, only their owner gets to see them
+        if record is None or not record.qr_code or record.user_id != session.get('user_id'):
+            abort(404)
+
+        digest = payload_digest(record.qr_code)
+        response = Response(_store.get(kind, record.qr_code, fmt), mimetype=FORMATS[fmt])
+        response.set_etag(f'{digest[:32]}-{fmt}')
+        response.cache_control.private = True
+        if request.args.get('v') == digest[:16]:
+            response.cache_control.max_age = 31536000
+            response.cache_control.immutable = True
+        else:
+            response.cache_control.no_cache = True
+        if request.args.get('download'):
+            response.headers['Content-Disposition'] = f'attachment; filename={kind}_ticket_{ticket_id}.{fmt}'
+        return response.make_conditional(request)
+
+    return _store
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Manage rendered QR ticket images')
+    parser.add_argument('command', choices=['gc'])
+    parser.add_argument('--dir', help='ticket image directory, defaults to instance/tickets')
+    parser.add_argument('--grace', type=int, default=3600, help='keep files younger than this many seconds')
+    parser.add_argument('--dry-run', action='store_true')
+    args = parser.parse_args(argv)
+
+    app = create_script_app()
+
+    store = TicketStore(args.dir or os.path.join(app.instance_path, 'tickets'))
+    with app.app_context():
+        digests = live_digests()
+    removed = store.collect_garbage(digests, grace=args.grace, dry_run=args.dry_run)
+    for path in removed:
+        print(('would remove ' if args.dry_run else 'removed ') + os.path.relpath(path, BASE_DIR))
+    print(f"{len(digests)} live tickets, {len(removed)} orphaned files")
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,233 @@
+"""Content-addressed cache of synthesized speech.
+
+Audio is keyed by the whitespace-normalized text, language and voice, kept on
+disk under TTS_CACHE_DIR and evicted least recently used first once the cache
+grows past TTS_CACHE_MAX_BYTES. Pre-generate the monument histories and the
+fixed voice command replies at deploy time with:
+
+    python tts_cache.py pregenerate
+"""
+import os
+import sys
+import time
+import uuid
+import hashlib
+import argparse
+import threading
+
+from flask import Flask, Response, send_file, stream_with_context
+
+from speech import init_speech, synthesis_enabled, synthesize_stream, synthesizer_mimetype, voice_id
+
+EXTENSIONS = {
+    'audio/mpeg': 'mp3',
+    'audio/wav': 'wav'
+}
+MIMETYPES = {extension: mimetype for mimetype, extension in EXTENSIONS.items()}
+
+def normalize_text(text):
+    """Collapse whitespace so the template's indented history text and the DOM text agree"""
+    return ' '.join(text.split())
+
+def cache_key(text, lang, voice):
+    return hashlib.sha256(f'{voice}\x00{lang}\x00{normalize_text(text)}'.encode('utf-8')).hexdigest()
+
+class AudioCache:
+    """Size-bounded LRU of audio files. Recency is the file's mtime, touched on every hit"""
+
+    def __init__(self, directory, max_bytes):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._index = {}
+        self._size = 0
+        if not os.path.exists(directory):
+            os.makedirs(directory)
+        self._scan()
+
+    def _scan(self):
+        for root, _, files in os.walk(self.directory):
+            for file_name in files:
+                key, _, extension = file_name.partition('.')
+                if extension not in MIMETYPES:
+                    continue
+                path = os.path.join(root, file_name)
+                stat = os.stat(path)
+                self._index[key] = [path, stat.st_size, stat.st_mtime]
+                self._size += stat.st_size
+
+    def _path(self, key, mimetype):
+        return os.path.join(self.directory, key[:2], f'{key}.{EXTENSIONS.get(mimetype, "bin")}')
+
+    def get(self, key):
+        """Return (path, mimetype) for a cached entry and mark it recently used"""
+        with self._lock:
+            entry = self._index.get(key)
+            if entry is None:
+                return None
+            path = entry[0]
+            now = time.time()
+            try:
+                os.utime(path, (now, now))
+            except OSError:
+                # Removed by another worker's eviction
+                self._size -= entry[1]
+                del self._index[key]
+                return None
+            entry[2] = now
+        return path, MIMETYPES[path.rsplit('.', 1)[1]]
+
+    def put(self, key, mimetype, data):
+        self._store(key, mimetype, [data])
+
+    def tee(self, key, mimetype, chunks):
+        """Yield `chunks` to the client while writing them into the cache.
+
+        The file only becomes visible once the whole stream was written, so a
+        client disconnecting midway never leaves truncated audio behind.
+        """
+        path = self._path(key, mimetype)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f'{path}.{uuid.uuid4().hex}.tmp'
+        size = 0
+        complete = False
+        try:
+            with open(tmp_path, 'wb') as f:
+                for chunk in chunks:
+                    f.write(chunk)
+                    size += len(chunk)
+                    yield chunk
+            complete = True
+        finally:
+            if complete and size:
+                os.replace(tmp_path, path)
+                self._add(key, path, size)
+            elif os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+    def _store(self, key, mimetype, chunks):
+        for _ in self.tee(key, mimetype, chunks):
+            pass
+
+    def _add(self, key, path, size):
+        with self._lock:
+            old = self._index.get(key)
+            if old:
+                self._size -= old[1]
+            self._index[key] = [path, size, time.time()]
+            self._size += size
+            if self._size > self.max_bytes:
+                self._evict()
+
+    def _evict(self):
+        # Drop the least recently used entries until we are 10% under the limit
+        target = self.max_bytes * 0.9
+        for key, (path, size, _) in sorted(self._index.items(), key=lambda item: item[1][2]):
+            if self._size <= target:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+            self._size -= size
+            del self._index[key]
+
+    def stats(self):
+        with self._lock:
+            return {'entries': len(self._index), 'bytes': self._size, 'max_bytes': self.max_bytes}
+
+_cache = None
+
+def init_tts_cache(app):
+    global _cache
+    app.config.setdefault('TTS_CACHE_DIR', os.path.join(app.instance_path, 'tts_cache'))
+    app.config.setdefault('TTS_CACHE_MAX_BYTES', 256 * 1024 * 1024)
+    _cache = AudioCache(app.config['TTS_CACHE_DIR'], app.config['TTS_CACHE_MAX_BYTES'])
+    return _cache
+
+def speech_response(text, lang='en', slow=False, download_name=None, headers=None):
+    """Serve speech for `text`, from the cache when possible.
+
+    Hits are sent with conditional=True, so browsers get ETags and Range
+    support for seeking in long monument histories. Misses stream from the
+    synthesizer and fill the cache on the way out.
+    """
+    text = normalize_text(text)
+    key = cache_key(text, lang, voice_id(slow))
+    headers = dict(headers or {})
+
+    hit = _cache.get(key) if _cache else None
+    if hit:
+        path, mimetype = hit
+        response = send_file(path, mimetype=mimetype, conditional=True, max_age=86400,
+                             as_attachment=download_name is not None,
+                             download_name=f'{download_name}.{EXTENSIONS[mimetype]}' if download_name else None)
+        response.headers.update(headers)
+        response.headers['X-TTS-Cache'] = 'hit'
+        return response
+
+    mimetype, chunks = synthesize_stream(text, lang=lang, slow=slow)
+    if _cache:
+        chunks = _cache.tee(key, mimetype, chunks)
+    if download_name:
+        headers['Content-Disposition'] = f'attachment; filename={download_name}.{EXTENSIONS.get(mimetype, "bin")}'
+    headers['X-TTS-Cache'] = 'miss'
+    return Response(stream_with_context(chunks), mimetype=mimetype, headers=headers)
+
+def pregenerate(texts, lang='en'):
+    """Synthesize every text that is not cached yet, returns (generated, skipped)"""
+    generated = skipped = 0
+    voice = voice_id()
+    for text in texts:
+        text = normalize_text(text)
+        key = cache_key(text, lang, voice)
+        if _cache.get(key):
+            skipped += 1
+            continue
+        mimetype, chunks = synthesize_stream(text, lang=lang)
+        _cache._store(key, mimetype, chunks)
+        generated += 1
+    return generated, skipped
+
+def speech_script_app(cache_dir=None):
+    """A bare app carrying the same speech settings as the site, without touching the database"""
+    app = Flask(__name__)
+    app.instance_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'instance')
+    app.config['SPEECH_SYNTHESIZER'] = os.environ.get('ARTIFY_SPEECH_SYNTHESIZER', 'gtts')
+    app.config['SPEECH_RECOGNIZER'] = 'stub'
+    if cache_dir:
+        app.config['TTS_CACHE_DIR'] = cache_dir
+    init_speech(app)
+    return app, init_tts_cache(app)
+
+def default_texts():
+    """Everything the site reads out: the monument histories and the voice command replies"""
+    from monuments import MONUMENTS_DATA
+    from voice_commands import COMMAND_RESPONSES
+
+    return [monument['history'] for monument in MONUMENTS_DATA.values()] + COMMAND_RESPONSES
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Manage the text-to-speech audio cache')
+    parser.add_argument('command', choices=['pregenerate', 'stats'])
+    parser.add_argument('--dir', help='cache directory, defaults to instance/tts_cache')
+    parser.add_argument('--lang', default='en')
+    args = parser.parse_args(argv)
+
+    _, cache = speech_script_app(args.dir)
+
+    if args.command == 'stats':
+        print(cache.stats())
+        return 0
+
+    if not synthesis_enabled():
+        print("No speech synthesizer is available")
+        return 1
+
+    generated, skipped = pregenerate(default_texts(), args.lang)
+    print(f"Generated {generated} clips with {synthesizer_mimetype()}, {skipped} already cached")
+    print(cache.stats())
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
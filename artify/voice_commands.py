@@ -0,0 +1,204 @@
+"""Voice command intent matching.
+
+Each language's grammar is compiled once into a token trie. Matching scans the
+utterance for the longest phrase, so "I need parking" is not swallowed by the
+shorter "parking". "Select <monument>" is matched against catalog names and
+aliases, exactly first and then fuzzily.
+
+Reply texts stay in English whatever language the command was given in, the
+voice control script keys its actions off them. /process_speech speaks them
+in the request's language.
+
+    python voice_commands.py --benchmark 20000
+"""
+import re
+import sys
+import time
+import random
+import argparse
+from difflib import get_close_matches
+from functools import lru_cache
+
+from monuments import MONUMENTS_DATA, MONUMENT_ALIASES
+
+# Intent -> trigger phrases, per language. Earlier intents win ties between equally long phrases
+GRAMMARS = {
+    'en': {
+        'need_parking': ['need parking', 'reserve parking', 'add parking'],
+        'select': ['select', 'choose', 'pick'],
+        'home': ['home', 'go home', 'home page'],
+        'booking': ['booking', 'book now', 'book tickets', 'book a ticket'],
+        'parking': ['parking', 'park my car'],
+        'logout': ['logout', 'log out', 'sign out'],
+        'student': ['student', 'i am a student'],
+        'guide': ['guide', 'need a guide', 'tour guide'],
+        'help': ['help', 'what can i say']
+    },
+    'hi': {
+        'need_parking': ['पार्किंग चाहिए', 'पार्किंग बुक करें', 'parking chahiye'],
+        'select': ['चुनें', 'चुनो', 'चयन करें', 'chuno'],
+        'home': ['होम', 'मुख्य पृष्ठ', 'ghar'],
+        'booking': ['बुकिंग', 'टिकट बुक करें', 'booking karo'],
+        'parking': ['पार्किंग', 'parking'],
+        'logout': ['लॉगआउट', 'लॉग आउट', 'बाहर निकलें'],
+        'student': ['छात्र', 'विद्यार्थी', 'main student hoon'],
+        'guide': ['गाइड', 'मार्गदर्शक', 'guide chahiye'],
+        'help': ['मदद', 'सहायता', 'madad']
+    }
+}
+
+RESPONSES = {
+    'home': 'Navigating to home page',
+    'booking': 'Opening booking form',
+    'parking': 'Opening parking reservation',
+    'logout': 'Logging out',
+    'student': 'Student discount will be applied',
+    'guide': 'Tour guide service added',
+    'need_parking': 'Parking will be reserved',
+    'help': 'You can say home, book now, parking, logout, or select a monument'
+}
+
+UNRECOGNIZED_RESPONSE = 'Command not recognized. Try saying "help" for available commands'
+
+# Fixed spoken replies, pre-generated into the TTS cache at deploy time
+COMMAND_RESPONSES = list(RESPONSES.values()) + [UNRECOGNIZED_RESPONSE]
+
+FUZZY_CUTOFF = 0.75
+
+_PUNCTUATION = re.compile(r'[!"#$%&()*+,./:;<=>?@\[\\\]^_`{|}~।॥-]+')
+
+def tokenize(text):
+    return _PUNCTUATION.sub(' ', text.lower()).split()
+
+class IntentMatcher:
+    """Token trie over one language's grammar plus a monument alias index"""
+
+    def __init__(self, grammar, monuments, aliases):
+        self.priority = {intent: rank for rank, intent in enumerate(grammar)}
+        self.trie = {}
+        for intent, phrases in grammar.items():
+            for phrase in phrases:
+                node = self.trie
+                for token in tokenize(phrase):
+                    node = node.setdefault(token, {})
+                node.setdefault(None, intent)
+
+        self.monument_index = {}
+        for key, data in monuments.items():
+            names = [key, data.get('name', key)] + aliases.get(key, [])
+            for name in names:
+                self.monument_index.setdefault(' '.join(tokenize(name)), key)
+            # 'Red Fort (Lal Qila)' should also match on 'red fort' alone
+            self.monument_index.setdefault(' '.join(tokenize(data.get('name', key).split('(')[0])), key)
+        self.monument_names = list(self.monument_index)
+
+    def _phrases(self, tokens):
+        """Yield (start, end, intent) for every grammar phrase found in `tokens`"""
+        for start in range(len(tokens)):
+            node = self.trie
+            for end in range(start, len(tokens)):
+                node = node.get(tokens[end])
+                if node is None:
+                    break
+                if None in node:
+                    yield start, end + 1, node[None]
+
+    def find_monument(self, tokens):
+        if not tokens:
+            return None
+        return self._find_monument(' '.join(tokens))
+
+    @lru_cache(maxsize=4096)
+    def _find_monument(self, phrase):
+        key = self.monument_index.get(phrase)
+        if key:
+            return key
+        # Try every contiguous span so trailing filler ("red fort please") still matches
+        tokens = phrase.split()
+        for length in range(len(tokens), 0, -1):
+            for start in range(len(tokens) - length + 1):
+                key = self.monument_index.get(' '.join(tokens[start:start + length]))
+                if key:
+                    return key
+        close = get_close_matches(phrase, self.monument_names, n=1, cutoff=FUZZY_CUTOFF)
+        return self.monument_index[close[0]] if close else None
+
+    def match(self, text):
+        """Return (intent, monument) for an utterance, intent is None when nothing matched"""
+        tokens = tokenize(text)
+        best = None
+        for start, end, intent in self._phrases(tokens):
+            if intent == 'select':
+                # Hindi puts the verb last ("लाल किला चुनें"), so also look before the phrase
+                monument = self.find_monument(tokens[end:]) or self.find_monument(tokens[:start])
+                if monument:
+                    return 'select', monument
+                continue
+            rank = (end - start, -start, -self.priority[intent])
+            if best is None or rank > best[0]:
+                best = (rank, intent)
+        return (best[1], None) if best else (None, None)
+
+_matchers = {}
+
+def get_matcher(lang='en'):
+    """Compiled matcher for `lang`, falling back to English for unknown languages"""
+    lang = lang if lang in GRAMMARS else 'en'
+    matcher = _matchers.get(lang)
+    if matcher is None:
+        matcher = _matchers[lang] = IntentMatcher(GRAMMARS[lang], MONUMENTS_DATA, MONUMENT_ALIASES)
+    return matcher
+
+def process_command(text, lang='en'):
+    """Process voice commands and return appropriate response"""
+    intent, monument = get_matcher(lang).match(text)
+    if intent == 'select':
+        return f'Selected {monument}'
+    return RESPONSES.get(intent, UNRECOGNIZED_RESPONSE)
+
+def sample_utterances(lang, count, seed=42):
+    """Build realistic utterances from the grammar, catalog names and filler words"""
+    rng = random.Random(seed)
+    grammar = GRAMMARS[lang]
+    fillers = ['please', 'now', 'i want to', 'can you', 'ok', 'hey artify']
+    names = [name for key in MONUMENTS_DATA for name in [key.lower()] + MONUMENT_ALIASES.get(key, [])]
+    utterances = []
+    for _ in range(count):
+        intent = rng.choice(list(grammar))
+        phrase = rng.choice(grammar[intent])
+        if intent == 'select':
+            name = rng.choice(names)
+            if rng.random() < 0.3 and len(name) > 4:
+                # Simulate a recognition slip
+                i = rng.randrange(len(name))
+                name = name[:i] + name[i + 1:]
+            phrase = f'{phrase} {name}'
+        utterances.append(f'{rng.choice(fillers)} {phrase}' if rng.random() < 0.5 else phrase)
+    return utterances
+
+def benchmark(count, lang='en'):
+    utterances = sample_utterances(lang, count)
+    matcher = get_matcher(lang)
+    start = time.perf_counter()
+    for utterance in utterances:
+        matcher.match(utterance)
+    elapsed = time.perf_counter() - start
+    return count / elapsed, elapsed
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Voice command intent matcher')
+    parser.add_argument('--benchmark', type=int, metavar='N', help='match N generated utterances')
+    parser.add_argument('--lang', default='en', choices=sorted(GRAMMARS))
+    parser.add_argument('text', nargs='*', help='utterance to match')
+    args = parser.parse_args(argv)
+
+    if args.benchmark:
+        throughput, elapsed = benchmark(args.benchmark, args.lang)
+        print(f"Matched {args.benchmark} utterances in {elapsed:.3f}s ({throughput:,.0f} per second)")
+    if args.text:
+        text = ' '.join(args.text)
+        print(get_matcher(args.lang).match(text), '->', process_command(text, args.lang))
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,291 @@
+"""Per-slot waitlist with automatic promotion.
+
+When process_payment finds a time slot full, the visitor can join that slot's
+waitlist instead of retrying. Entries are served first come, first served: a
+background promoter checks every WAITLIST_PROMOTE_INTERVAL seconds (and right
+away when woken with wake_promoter()) for slots with free places, holds the
+places for the oldest waiting entry by taking them in TimeSlot.booked, and
+emails the visitor. The offer stays open for WAITLIST_OFFER_MINUTES; paying
+for it turns the held places into the booking, letting it lapse hands them to
+the next entry.
+
+A slot's queue does not skip ahead: if the first entry needs more places than
+are free, later, smaller entries wait too, so a large group is never starved.
+
+Every state change is a conditional UPDATE, so several processes may run the
+promoter at once without double offers. Run one pass from cron with
+
+    python waitlist.py promote
+"""
+import sys
+import argparse
+import threading
+from datetime import datetime, timedelta
+
+from flask import request, session, jsonify, redirect, url_for, flash
+from sqlalchemy import func
+
+from auth import db, create_script_app, User, reserve_slot_capacity, release_slot_capacity
+from metrics import WAITLIST_OFFERS
+from notifications import waitlist_offer, send_soon
+from querytrace import query_budget
+from ratelimit import rate_limit
+
+WAITING, OFFERED, ACCEPTED, EXPIRED, CANCELLED = 'waiting', 'offered', 'accepted', 'expired', 'cancelled'
+
+class WaitlistEntry(db.Model):
+    __tablename__ = 'waitlist_entries'
+    __table_args__ = (db.Index('ix_waitlist_queue', 'monument', 'date', 'time_slot', 'status', 'id'),)
+
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False, index=True)
+    monument = db.Column(db.String(100), nullable=False)
+    date = db.Column(db.Date, nullable=False)
+    time_slot = db.Column(db.String(20), nullable=False)
+    visitor_count = db.Column(db.Integer, nullable=False, default=1)
+    details = db.Column(db.JSON, nullable=True)  # booking_details from the session, restored on accept
+    status = db.Column(db.String(20), nullable=False, default=WAITING, index=True)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    offered_at = db.Column(db.DateTime, nullable=True)
+    offer_expires_at = db.Column(db.DateTime, nullable=True)
+
+    def position(self):
+        """1-based place in the slot's queue, None once the entry has left it"""
+        if self.status != WAITING:
+            return None
+        ahead = db.session.query(func.count(WaitlistEntry.id)).filter(
+            WaitlistEntry.monument == self.monument,
+            WaitlistEntry.date == self.date,
+            WaitlistEntry.time_slot == self.time_slot,
+            WaitlistEntry.status == WAITING,
+            WaitlistEntry.id < self.id
+        ).scalar()
+        return ahead + 1
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'monument': self.monument,
+            'date': self.date.isoformat(),
+            'time_slot': self.time_slot,
+            'visitor_count': self.visitor_count,
+            'status': self.status,
+            'position': self.position(),
+            'offer_expires_at': self.offer_expires_at.isoformat(' ', 'seconds') if self.offer_expires_at else None,
+            'accept_url': f'/waitlist/{self.id}/accept' if self.status == OFFERED else None
+        }
+
+_settings = {'offer_minutes': 30}
+_wakeup = threading.Event()
+
+def _set_status(entry_id, old, new, **values):
+    """Move an entry from `old` to `new` status, False if someone else moved it first"""
+    return bool(WaitlistEntry.query.filter_by(id=entry_id, status=old).update(
+        dict(values, status=new), synchronize_session=False))
+
+def join_waitlist(user_id, monument, date, time_slot, visitor_count, details=None):
+    """Queue a user for a slot, reusing their open entry for it if they have one"""
+    entry = WaitlistEntry.query.filter(
+        WaitlistEntry.user_id == user_id,
+        WaitlistEntry.monument == monument,
+        WaitlistEntry.date == date,
+        WaitlistEntry.time_slot == time_slot,
+        WaitlistEntry.status.in_([WAITING, OFFERED])
+    ).first()
+    if entry is None:
+        entry = WaitlistEntry(user_id=user_id, monument=monument, date=date, time_slot=time_slot,
+                              visitor_count=visitor_count, details=details)
+        db.session.add(entry)
+        db.session.commit()
+        wake_promoter()
+    return entry
+
+def cancel_entry(entry):
+    """Leave the waitlist, handing back places held by an open offer"""
+    if _set_status(entry.id, WAITING, CANCELLED):
+        db.session.commit()
+        return True
+    if _set_status(entry.id, OFFERED, CANCELLED):
+        release_slot_capacity(entry.monument, entry.date, entry.time_slot, entry.visitor_count)
+        db.session.commit()
+        wake_promoter()
+        return True
+    return False
+
+def claim_offer(entry_id, user_id, monument, date, time_slot, count):
+    """Turn a user's open offer into `count` booked places, False if there is no such offer.
+
+    Places held beyond `count` go back to the slot. Runs inside the caller's
+    transaction, so a failed payment rolls the claim back too.
+    """
+    entry = WaitlistEntry.query.get(entry_id)
+    if (entry is None or entry.user_id != user_id or entry.visitor_count < count
+            or (entry.monument, entry.date, entry.time_slot) != (monument, date, time_slot)):
+        return False
+    # An expired offer's places may already be on their way to the next entry
+    claimed = WaitlistEntry.query.filter(
+        WaitlistEntry.id == entry.id,
+        WaitlistEntry.status == OFFERED,
+        WaitlistEntry.offer_expires_at >= datetime.utcnow()
+    ).update({WaitlistEntry.status: ACCEPTED}, synchronize_session=False)
+    if not claimed:
+        return False
+    if entry.visitor_count > count:
+        release_slot_capacity(monument, date, time_slot, entry.visitor_count - count)
+    WAITLIST_OFFERS.inc(ACCEPTED)
+    return True
+
+def expire_offers(now=None):
+    """Return the places of offers nobody paid for in time, and drop entries for past days"""
+    now = now or datetime.utcnow()
+    expired = 0
+    for entry in WaitlistEntry.query.filter(WaitlistEntry.status == OFFERED,
+                                            WaitlistEntry.offer_expires_at < now).all():
+        if _set_status(entry.id, OFFERED, EXPIRED):
+            release_slot_capacity(entry.monument, entry.date, entry.time_slot, entry.visitor_count)
+            expired += 1
+    WaitlistEntry.query.filter(WaitlistEntry.status == WAITING, WaitlistEntry.date < now.date()).update(
+        {WaitlistEntry.status: EXPIRED}, synchronize_session=False)
+    db.session.commit()
+    if expired:
+        WAITLIST_OFFERS.inc(EXPIRED, amount=expired)
+    return expired
+
+def promote(now=None):
+    """Offer freed places to the head of every slot's queue, returns the offers made"""
+    now = now or datetime.utcnow()
+    expire_offers(now)
+    queues = (db.session.query(WaitlistEntry.monument, WaitlistEntry.date, WaitlistEntry.time_slot)
+              .filter(WaitlistEntry.status == WAITING)
+              .distinct()
+              .all())
+    offers = []
+    for monument, date, time_slot in queues:
+        waiting = (WaitlistEntry.query
+                   .filter_by(monument=monument, date=date, time_slot=time_slot, status=WAITING)
+                   .order_by(WaitlistEntry.id))
+        for entry in waiting:
+            # Stops at the first entry that does not fit, the queue is strictly FIFO
+            if not reserve_slot_capacity(monument, date, time_slot, entry.visitor_count):
+                break
+            expires = now + timedelta(minutes=_settings['offer_minutes'])
+            if _set_status(entry.id, WAITING, OFFERED, offered_at=now, offer_expires_at=expires):
+                # The offer email commits with the held places
+                waitlist_offer(entry, db.session.get(User, entry.user_id), expires)
+                db.session.commit()
+                offers.append(entry)
+            else:
+                # Cancelled or offered by another promoter meanwhile
+                release_slot_capacity(monument, date, time_slot, entry.visitor_count)
+                db.session.commit()
+    if offers:
+        WAITLIST_OFFERS.inc(OFFERED, amount=len(offers))
+        send_soon()
+    return offers
+
+def wake_promoter():
+    """Run the promoter now instead of at its next interval, e.g. after places were freed"""
+    _wakeup.set()
+
+def _run_promoter(app, interval):
+    while True:
+        _wakeup.wait(interval)
+        _wakeup.clear()
+        with app.app_context():
+            try:
+                promote()
+            except Exception as e:
+                db.session.rollback()
+                app.logger.error(f"Waitlist promotion failed: {str(e)}")
+            finally:
+                db.session.remove()
+
+def init_waitlist(app):
+    app.config.setdefault('WAITLIST_OFFER_MINUTES', 30)
+    app.config.setdefault('WAITLIST_PROMOTE_INTERVAL', 30)
+    app.config.setdefault('WAITLIST_PROMOTER_ENABLED', True)
+    _settings['offer_minutes'] = app.config['WAITLIST_OFFER_MINUTES']
+
+    if app.config['WAITLIST_PROMOTER_ENABLED']:
+        threading.Thread(target=_run_promoter, args=(app, app.config['WAITLIST_PROMOTE_INTERVAL']),
+                         name='artify-waitlist', daemon=True).start()
+
+    @app.route('/waitlist', methods=['POST'])
+    @rate_limit('payment')
+    @query_budget(5)
+    def join_waitlist_route():
+        # cancellations imports this module for WaitlistEntry
+        from cancellations import is_closed
+        if 'user_id' not in session:
+            return jsonify({'success': False, 'error': 'Please login to continue'})
+        details = session.get('booking_details')
+        if not details:
+            return jsonify({'success': False, 'error': 'No booking in progress'})
+        data = request.get_json(silent=True) or {}
+        time_slot = data.get('time_slot') or details.get('time_slot')
+        try:
+            date = datetime.strptime(details['date'], '%Y-%m-%d').date()
+        except (KeyError, ValueError):
+            return jsonify({'success': False, 'error': 'Invalid date format'})
+        if not time_slot:
+            return jsonify({'success': False, 'error': 'Missing time slot'})
+        # A closed day's slots have no capacity, its entries could never be promoted
+        if is_closed(details['monument'], date):
+            return jsonify({'success': False, 'error': f"{details['monument']} is closed on this date"})
+
+        entry = join_waitlist(session['user_id'], details['monument'], date, time_slot,
+                              len(details.get('visitors') or []) + 1, dict(details, time_slot=time_slot))
+        return jsonify({'success': True, 'waitlist': entry.to_dict()})
+
+    @app.route('/api/waitlist')
+    @query_budget(12)
+    def my_waitlist():
+        if 'user_id' not in session:
+            return jsonify({'error': 'Please login to continue'}), 401
+        entries = (WaitlistEntry.query
+                   .filter(WaitlistEntry.user_id == session['user_id'],
+                           WaitlistEntry.status.in_([WAITING, OFFERED]))
+                   .order_by(WaitlistEntry.date, WaitlistEntry.id)
+                   .limit(10)
+                   .all())
+        return jsonify([entry.to_dict() for entry in entries])
+
+    @app.route('/waitlist/<int:entry_id>/accept')
+    def accept_waitlist_offer(entry_id):
+        if 'user_id' not in session:
+            return redirect(url_for('auth'))
+        entry = WaitlistEntry.query.get(entry_id)
+        if (entry is None or entry.user_id != session['user_id'] or entry.status != OFFERED
+                or entry.offer_expires_at < datetime.utcnow()):
+            flash('This waitlist offer is no longer available')
+            return redirect(url_for('booking'))
+        # Back to payment with the booking as it was when the user joined
+        session['booking_details'] = dict(entry.details or {}, waitlist_entry_id=entry.id)
+        return redirect(url_for('payment'))
+
+    @app.route('/waitlist/<int:entry_id>/cancel', methods=['POST'])
+    @query_budget(4)
+    def cancel_waitlist_entry(entry_id):
+        if 'user_id' not in session:
+            return jsonify({'success': False, 'error': 'Please login to continue'})
+        entry = WaitlistEntry.query.get(entry_id)
+        if entry is None or entry.user_id != session['user_id']:
+            return jsonify({'success': False, 'error': 'Waitlist entry not found'}), 404
+        return jsonify({'success': cancel_entry(entry)})
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Offer freed time slot places to waitlisted visitors')
+    parser.add_argument('command', choices=['promote'])
+    parser.add_argument('--offer-minutes', type=int, default=30)
+    args = parser.parse_args(argv)
+
+    app = create_script_app()
+    _settings['offer_minutes'] = args.offer_minutes
+    with app.app_context():
+        db.create_all()
+        offers = promote()
+        print(f"Made {len(offers)} waitlist offers")
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())